@@ -0,0 +1,237 @@
+"""
+Admission control for the Flask routes.
+
+Each route class gets a concurrency limit, a bounded wait queue with a
+deadline, and priority classes (cached videos are admitted before cold builds).
+Clients are capped on concurrent requests. When a request cannot be admitted
+in time it gets a fast 429/503 with Retry-After instead of tying up a worker
+thread until the frontend's 150s timeout.
+
+Limits can be overridden with environment variables, e.g.
+    ADMISSION_SUMMARY_CONCURRENCY=2 ADMISSION_SUMMARY_QUEUE=8 ADMISSION_SUMMARY_WAIT=15
+    ADMISSION_CLIENT_CONCURRENCY=4
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import jsonify, request
+
+import deadline
+import metrics
+
+# Priority classes, lower is admitted first
+PRIORITY_HOT = 0    # video already indexed, only the LLM call (or nothing) left
+PRIORITY_COLD = 1   # needs transcript fetch + index build
+
+
+def _env_number(name, default, cast=int):
+    value = os.environ.get(name)
+    return cast(value) if value else default
+
+
+class RouteLimit:
+    """Concurrency slots for one route class plus its priority wait queue."""
+
+    def __init__(self, name, concurrency, queue_size, max_wait):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.lock = threading.Lock()
+        # Heap of [priority, seq, event, state]; state is 'waiting', 'granted' or 'abandoned'
+        self.waiters = []
+        self.queued = 0
+        self._seq = itertools.count()
+        # EWMA of seconds a slot is held, for Retry-After estimates
+        self.avg_hold = 1.0
+
+    def acquire(self, priority, timeout):
+        """
+        Returns None once a slot is held, or a rejection reason:
+        'queue_full' or 'timeout'.
+        """
+        with self.lock:
+            if self.active < self.concurrency and not self.queued:
+                self.active += 1
+                return None
+            if self.queued >= self.queue_size:
+                return 'queue_full'
+            entry = [priority, next(self._seq), threading.Event(), 'waiting']
+            heapq.heappush(self.waiters, entry)
+            self.queued += 1
+
+        entry[2].wait(timeout)
+
+        with self.lock:
+            if entry[3] == 'granted':
+                return None
+            # Leave the entry in the heap; release() skips abandoned waiters
+            entry[3] = 'abandoned'
+            self.queued -= 1
+            return 'timeout'
+
+    def try_acquire(self):
+        """Takes a slot only if one is free and no request is waiting for it."""
+        with self.lock:
+            if self.active < self.concurrency and not self.queued:
+                self.active += 1
+                return True
+            return False
+
+    def release(self, held_seconds):
+        with self.lock:
+            self.avg_hold = 0.8 * self.avg_hold + 0.2 * held_seconds
+            while self.waiters:
+                entry = heapq.heappop(self.waiters)
+                if entry[3] == 'waiting':
+                    # Hand the slot straight to the next waiter; active stays the same
+                    entry[3] = 'granted'
+                    self.queued -= 1
+                    entry[2].set()
+                    return
+            self.active -= 1
+
+    def retry_after(self):
+        """Rough seconds until a queued request would be admitted."""
+        with self.lock:
+            backlog = self.queued + 1
+        return max(1, math.ceil(self.avg_hold * backlog / max(1, self.concurrency)))
+
+
+class AdmissionController:
+    def __init__(self, client_concurrency=4):
+        self.routes = {}
+        self.client_concurrency = client_concurrency
+        self.client_active = {}
+        self.client_lock = threading.Lock()
+
+    def add_route(self, name, concurrency, queue_size, max_wait):
+        prefix = f"ADMISSION_{name.upper()}_"
+        self.routes[name] = RouteLimit(
+            name,
+            _env_number(prefix + 'CONCURRENCY', concurrency),
+            _env_number(prefix + 'QUEUE', queue_size),
+            _env_number(prefix + 'WAIT', max_wait, float),
+        )
+
+    def _client_enter(self, client):
+        with self.client_lock:
+            active = self.client_active.get(client, 0)
+            if active >= self.client_concurrency:
+                return False
+            self.client_active[client] = active + 1
+            return True
+
+    def _client_exit(self, client):
+        with self.client_lock:
+            active = self.client_active.get(client, 1) - 1
+            if active:
+                self.client_active[client] = active
+            else:
+                self.client_active.pop(client, None)
+
+    def limit(self, route_name, priority=None):
+        """
+        Route decorator. `priority` is an optional zero-argument callable
+        evaluated inside the request, returning a PRIORITY_* class.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                route = self.routes[route_name]
+                client = client_id()
+
+                if not self._client_enter(client):
+                    metrics.inc('vistify_admission_total', labels={'route': route_name, 'result': 'client_limit'})
+                    return _reject(429, "Too many concurrent requests from this client.", 1)
+
+                try:
+                    prio = priority() if priority else PRIORITY_COLD
+                    queued_at = time.perf_counter()
+                    # Never queue past the request's own deadline
+                    reason = route.acquire(prio, deadline.timeout('admission', route.max_wait))
+                    waited = time.perf_counter() - queued_at
+                    metrics.observe('vistify_admission_wait_seconds', waited, {'route': route_name})
+
+                    if reason is not None:
+                        metrics.inc('vistify_admission_total', labels={'route': route_name, 'result': reason})
+                        return _reject(503, "Server is busy, please retry shortly.", route.retry_after())
+
+                    metrics.inc('vistify_admission_total', labels={'route': route_name, 'result': 'admitted'})
+                    start = time.perf_counter()
+                    try:
+                        return view(*args, **kwargs)
+                    finally:
+                        route.release(time.perf_counter() - start)
+                finally:
+                    self._client_exit(client)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def background(self, route_name):
+        """
+        Holds one of a route's slots for speculative work if one is free right
+        now. Yields whether it got one; background work never queues, and
+        never takes a slot a live request is waiting for.
+        """
+        route = self.routes[route_name]
+        admitted = route.try_acquire()
+        metrics.inc('vistify_admission_total', labels={'route': route_name, 'result': 'background' if admitted else 'busy'})
+        if not admitted:
+            yield False
+            return
+        start = time.perf_counter()
+        try:
+            yield True
+        finally:
+            route.release(time.perf_counter() - start)
+
+
+metrics.register('vistify_admission_total', 'counter',
+                 'Admission decisions by route and result.')
+metrics.register('vistify_admission_wait_seconds', 'histogram',
+                 'Time spent in the admission queue.')
+
+
+def client_id():
+    """
+    Client identity for per-client limits. Behind a load balancer, configure
+    waitress' trusted_proxy (TRUSTED_PROXY in run_production.py) so that
+    REMOTE_ADDR is rewritten from X-Forwarded-For; the raw header is never
+    trusted here because clients could rotate it to dodge the limit.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def _reject(status, message, retry_after):
+    resp = jsonify({"error": True, "data": message})
+    resp.status_code = status
+    resp.headers['Retry-After'] = str(retry_after)
+    return resp
+
+
+# Queued requests still hold a waitress thread while they wait, so queues are
+# kept short. With run_production.py's 32 threads the LLM-heavy GET routes can
+# hold at most 18 of them, leaving the rest for /api/ask and /api/transcript.
+controller = AdmissionController(client_concurrency=_env_number('ADMISSION_CLIENT_CONCURRENCY', 4))
+controller.add_route('summary', concurrency=2, queue_size=4, max_wait=15.0)
+controller.add_route('insights', concurrency=2, queue_size=4, max_wait=15.0)
+controller.add_route('entities', concurrency=2, queue_size=4, max_wait=15.0)
+controller.add_route('ask', concurrency=8, queue_size=16, max_wait=20.0)
+# Each batch runs up to ASK_BATCH_CONCURRENCY generations of its own
+controller.add_route('ask_batch', concurrency=2, queue_size=4, max_wait=15.0)
+controller.add_route('transcript', concurrency=4, queue_size=8, max_wait=15.0)
+controller.add_route('mentions', concurrency=4, queue_size=8, max_wait=15.0)
+controller.add_route('chapters', concurrency=4, queue_size=8, max_wait=15.0)
+
+limit = controller.limit
+background = controller.background
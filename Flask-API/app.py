@@ -1,14 +1,32 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
-from youtube_transcript_api import YouTubeTranscriptApi
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import math
 import os
 import traceback
 import json
 import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import metrics
+import admission
+import chapters
+import deadline
+import extractive
+import http_cache
+import intent_router
+import playlist
+import profiler
+import prompt_compression
+from artifact_store import store
+from transcript_fetcher import fetcher as transcript_fetcher
+from columnar import CHUNK_CHARS, FORMAT_VERSION, Chunks, as_columnar
+from tiered_cache import TieredCache
+from live_index import live_indexes, parse_segments
+from snapshot import snapshots
+from warmer import CacheWarmer, LatencyGuard, PopularityTracker
+from prefetch import DEFAULT_RULES, PrefetchEngine, parse_rules
 
 # Try to import config, but handle failure for Vercel deployment
 try:
@@ -22,8 +40,15 @@ except ImportError:
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 CORS(app, resources={r"/*": {"origins": "*"}})
+http_cache.init_app(app)
+profiler.init_app(app, video_id=lambda: request_video_id())
 
-OLLAMA_BASE_URL = "https://ollama.com/api"
+# Overridable so benchmarks and load tests can point at mock_ollama.py
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "https://ollama.com/api")
+
+# Seconds. An LLM call is not started with less than LLM_MIN_SECONDS of the request's deadline left.
+LLM_TIMEOUT = 120.0
+LLM_MIN_SECONDS = float(os.environ.get("LLM_MIN_SECONDS", 2.0))
 
 if not OLLAMA_API_KEY:
     print("WARNING: OLLAMA_API_KEY not found in config.py or environment variables.")
@@ -31,9 +56,29 @@ else:
     print("Ollama Cloud configured. Model:", OLLAMA_MODEL)
 
 
-# In-memory cache
-# { video_id: { 'transcript': [...], 'vectorizer': obj, 'matrix': obj, 'chunks': [...] } }
-CACHE = {}
+# In-memory cache, the front tier in front of artifact_store
+# { video_id: { 'transcript': ColumnarTranscript, 'chunks': Chunks, 'vectorizer': obj, 'matrix': obj } }
+# Indexes idle for CACHE_IDLE_SECONDS are kept zlib-compressed until next used.
+CACHE = TieredCache(idle_seconds=float(os.environ.get("CACHE_IDLE_SECONDS", 600)))
+CACHE.register_metrics()
+
+
+def cached_index(video_id):
+    """The in-memory index for a video, live streams first, or None."""
+    live = live_indexes.get(video_id)
+    if live is not None:
+        return live.index_data()
+    return CACHE.get(video_id)
+
+
+def preload():
+    """
+    Imports the modules deferred for cold start. Long-running servers call this
+    in the background at startup so the first index build does not pay for it.
+    """
+    with metrics.timed('preload'):
+        import sklearn.feature_extraction.text  # noqa: F401
+        import sklearn.metrics.pairwise  # noqa: F401
 
 
 # --- HELPER: OLLAMA CLOUD CALLS ---
@@ -67,131 +112,117 @@ def ollama_generate(prompt, *, model=None, format=None):
     if format is not None:
         payload["format"] = format
 
-    resp = requests.post(
-        f"{OLLAMA_BASE_URL}/generate",
-        headers=headers,
-        json=payload,
-        timeout=120,
-    )
-    resp.raise_for_status()
-    data = resp.json()
+    timeout = deadline.timeout('llm_call', LLM_TIMEOUT, needed=LLM_MIN_SECONDS)
+    with metrics.timed('llm_call'):
+        try:
+            resp = requests.post(
+                f"{OLLAMA_BASE_URL}/generate",
+                headers=headers,
+                json=payload,
+                timeout=timeout,
+            )
+        except requests.Timeout as e:
+            if timeout < LLM_TIMEOUT:
+                # Cut short by the request's deadline rather than the model being stuck
+                raise deadline.DeadlineExceeded('llm_call') from e
+            raise
+        resp.raise_for_status()
+        data = resp.json()
+
+    # Token counts are only present on completed (non-streamed) responses
+    for kind, field in (('prompt', 'prompt_eval_count'), ('eval', 'eval_count')):
+        count = data.get(field)
+        if count is not None:
+            metrics.observe('vistify_llm_tokens', count, {'kind': kind})
+            metrics.inc('vistify_llm_tokens_total', count, {'kind': kind})
+    if data.get('prompt_eval_duration'):
+        prompt_compression.record_prefill(data.get('prompt_eval_count'), data['prompt_eval_duration'] / 1e9)
+
     # For normal text, this is a string.
     # For JSON mode/structured outputs, this can be a dict.
     return data.get("response")
 
 
 # --- HELPER FUNCTIONS ---
+@metrics.timed('transcript_fetch')
 def get_transcript(video_id):
-    """Fetches transcript from YouTube."""
-    try:
-        # Create an instance of the API
-        api = YouTubeTranscriptApi()
-        
-        # Get list of available transcripts
-        transcript_list = api.list(video_id)
-        
-        # Try to find English transcript (manually created or auto-generated)
-        transcript = None
-        
-        # First, try to find manually created English transcript
-        try:
-            transcript = transcript_list.find_transcript(['en'])
-        except:
-            pass
-        
-        # If not found, try auto-generated English
-        if transcript is None:
-            try:
-                transcript = transcript_list.find_generated_transcript(['en'])
-            except:
-                pass
-        
-        # If still not found, use the first available transcript
-        if transcript is None:
-            for t in transcript_list:
-                transcript = t
-                break
-        
-        if transcript is None:
-            print("No transcripts available")
-            return None
-        
-        # Fetch the actual transcript data using the transcript object's fetch method
-        transcript_data = transcript.fetch()
-        
-        # Convert to our format
-        return [
-            {
-                'text': entry.text if hasattr(entry, 'text') else entry['text'],
-                'start': entry.start if hasattr(entry, 'start') else entry['start'],
-                'duration': entry.duration if hasattr(entry, 'duration') else entry['duration']
-            }
-            for entry in transcript_data
-        ]
+    """Fetches transcript from YouTube (see transcript_fetcher for retries and negative caching)."""
+    return transcript_fetcher.fetch(video_id)
 
-    except Exception as e:
-        print(f"Transcript Error: {e}")
-        traceback.print_exc()
-        return None
-         
 
+# How create_rag_index chunks and vectorizes; change it with either, so old
+# snapshots are rebuilt instead of mapped
+INDEX_FORMAT = f"columnar{FORMAT_VERSION}:chars{CHUNK_CHARS}:tfidf-english-1-2"
+snapshots.index_format = INDEX_FORMAT
+
+
+@metrics.timed('index_build')
 def create_rag_index(video_id, transcript_data):
     """
     Creates a simple TF-IDF index for the video.
     Splits transcript into chunks of ~500 characters (REDUCED).
+    transcript_data may be a ColumnarTranscript or a list of caption dicts.
     """
-    chunks = []
-    current_chunk = ""
-    current_start = 0
-
-    for entry in transcript_data:
-        text = entry['text']
-        start = entry['start']
-
-        if not current_chunk:
-            current_start = start
-
-        current_chunk += " " + text
+    # sklearn is most of this module's import time; loading it here keeps cold starts fast
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
-        # CHANGED: Reduced chunk size from 1000 to 500
-        if len(current_chunk) > 500:
-            chunks.append({
-                'text': current_chunk.strip(),
-                'start': current_start
-            })
-            current_chunk = ""
-
-    if current_chunk:
-        chunks.append({'text': current_chunk.strip(), 'start': current_start})
+    transcript = as_columnar(transcript_data)
+    chunks = Chunks.build(transcript, max_chars=CHUNK_CHARS)
 
     # Create TF-IDF Matrix
-    texts = [c['text'] for c in chunks]
     vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))  # ADDED: bigrams
-    matrix = vectorizer.fit_transform(texts)
+    matrix = vectorizer.fit_transform(chunks.texts())
 
     return {
+        'transcript': transcript,
         'chunks': chunks,
         'vectorizer': vectorizer,
         'matrix': matrix
     }
 
 
-def retrieve_context(video_id, query, top_k=5):
-    """Retrieves relevant chunks using TF-IDF cosine similarity."""
-    if video_id not in CACHE:
+@metrics.timed('retrieval')
+def retrieve_context(video_id, query, top_k=5, start=None, end=None):
+    """
+    Retrieves relevant chunks using TF-IDF cosine similarity.
+    start/end (seconds) restrict scoring to the chunks overlapping that range.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    data = cached_index(video_id)
+    if data is None:
         return [], 0.0
 
-    data = CACHE[video_id]
     vectorizer = data['vectorizer']
     matrix = data['matrix']
     chunks = data['chunks']
 
+    # Only score chunks in the requested time range (binary search on chunk starts)
+    lo, hi = 0, len(chunks)
+    if start is not None or end is not None:
+        lo, hi = chunks.range_indices(start, end)
+        if lo == hi:
+            return [], 0.0
+        matrix = matrix[lo:hi]
+
     # Vectorize query
     query_vec = vectorizer.transform([query])
 
     # Calculate similarity
     similarities = cosine_similarity(query_vec, matrix).flatten()
 
+    # A range that fits in the context is returned whole, in order, however it scores
+    if (start is not None or end is not None) and hi - lo <= top_k:
+        return [chunks[lo + i] for i in range(hi - lo)], float(similarities.max())
+
+    return top_chunks(similarities, chunks, top_k, offset=lo)
+
+
+def top_chunks(similarities, chunks, top_k, offset=0):
+    """
+    The top_k chunks by similarity that clear the relevance threshold, and
+    the best score. similarities[i] scores chunks[offset + i].
+    """
     # Get top K indices
     top_indices = similarities.argsort()[-top_k:][::-1]
 
@@ -204,11 +235,29 @@ def retrieve_context(video_id, query, top_k=5):
     # CHANGED: Reduced threshold from 0.1 to 0.05
     for idx in top_indices:
         if similarities[idx] > 0.05:  # Lower threshold
-            results.append(chunks[idx])
+            results.append(chunks[offset + idx])
 
     return results, top_score
 
 
+@metrics.timed('retrieval_batch')
+def retrieve_context_batch(video_id, queries, top_k=5):
+    """
+    retrieve_context for many queries on one video: a single transform and
+    a single similarity product for all of them. Returns one
+    (chunks, top_score) pair per query.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    data = cached_index(video_id)
+    if data is None or not queries:
+        return [([], 0.0) for _ in queries]
+
+    query_vecs = data['vectorizer'].transform(queries)
+    similarities = cosine_similarity(query_vecs, data['matrix'])
+    return [top_chunks(row, data['chunks'], top_k) for row in similarities]
+
+
 def calculate_faithfulness(answer, context_text):
     """
     Calculates a simple faithfulness score based on word overlap (ROUGE-1 like).
@@ -223,40 +272,136 @@ def calculate_faithfulness(answer, context_text):
     return len(overlap) / len(answer_words)
 
 
-# --- ROUTES ---
+def parse_seconds(value):
+    """
+    Parses a timestamp given as seconds (12, "754.5") or clock time
+    ("12:34", "1:02:03"). Returns None for a missing value and raises
+    ValueError for a malformed one.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        seconds = 0.0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + float(part)
+    if not math.isfinite(seconds):
+        raise ValueError(f"Non-finite timestamp: {value}")
+    if seconds < 0:
+        raise ValueError(f"Negative timestamp: {value}")
+    return seconds
+
+
+def parse_time_range(source):
+    """Reads optional 'from'/'to' timestamps from request args or a JSON body."""
+    try:
+        start = parse_seconds(source.get('from'))
+        end = parse_seconds(source.get('to'))
+    except ValueError:
+        raise ValueError("Invalid 'from'/'to' timestamp; use seconds or mm:ss.")
+    if start is not None and end is not None and end < start:
+        raise ValueError("'to' must not be earlier than 'from'.")
+    return start, end
 
-@app.route('/api/summary', methods=['GET'])
-def summary():
-    video_id = request.args.get('v')
-    summary_type = request.args.get('type', 'short')
 
-    if not video_id:
-        return jsonify({"error": True, "data": "Video ID missing"})
+def ensure_index(video_id):
+    """
+    Returns the cached RAG index for a video, building it on a miss.
+    Checks CACHE, then an on-disk snapshot (SNAPSHOT_DIR), then the shared
+    artifact store, so a video is only fetched and indexed once across all
+    worker processes and restarts.
+    Returns None if no transcript could be fetched.
+    """
+    index_data = cached_index(video_id)
+    if index_data is not None:
+        metrics.inc('vistify_cache_requests_total', labels={'result': 'hit'})
+        return index_data
+
+    # Mapped lazily on first access after a restart; no unpickling
+    index_data = snapshots.load(video_id)
+    if index_data is not None:
+        metrics.inc('vistify_cache_requests_total', labels={'result': 'snapshot'})
+        CACHE[video_id] = index_data
+        # A no-op if another process or an earlier run already built it
+        schedule_mention_index(video_id, index_data)
+        return index_data
+
+    metrics.inc('vistify_cache_requests_total', labels={'result': 'miss'})
+
+    def build():
+        # Only the index is needed afterwards, so keep transcripts out of the local LRU
+        transcript = store.get_or_build(
+            f"transcript:v{FORMAT_VERSION}:{video_id}", lambda: as_columnar(get_transcript(video_id)),
+            codec='pickle', front=False,
+        )
+        if not transcript:
+            return None
+        deadline.check('index_build')
+        return create_rag_index(video_id, transcript)
 
-    try:
-        if not OLLAMA_API_KEY:
-            return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
+    # CACHE is the front tier for indexes, so skip the store's own LRU
+    index_data = store.get_or_build(f"index:v{FORMAT_VERSION}:{video_id}", build, codec='pickle', front=False)
+    if index_data is None:
+        return None
+    snapshots.save(video_id, index_data)
+    CACHE[video_id] = index_data
+    schedule_mention_index(video_id, index_data)
+    return index_data
 
-        # 1. Get Transcript
-        if video_id not in CACHE:
-            transcript = get_transcript(video_id)
-            if not transcript:
-                return jsonify({"error": True, "data": "Could not retrieve transcript (no English captions?)"})
 
-            # Build Index immediately for future Q&A
-            index_data = create_rag_index(video_id, transcript)
-            CACHE[video_id] = index_data
+def artifact_key(kind, video_id, variant=''):
+    """
+    Store key of an LLM output. Includes the model, and whether the prompt
+    was compressed, so a config change never serves stale outputs. Live
+    streams add their chunk count, so outputs follow the stream as it grows.
+    """
+    mode = ':compressed' if kind in prompt_compression.enabled_routes() else ''
+    return f"llm:{kind}:{OLLAMA_MODEL}:{video_id}:{variant}{mode}{live_suffix(video_id)}"
 
-        # 2. Generate Summary
-        chunks = CACHE[video_id]['chunks']
-        full_text = " ".join([c['text'] for c in chunks])
 
-        # Truncate if too long
-        if len(full_text) > 50000:
-            full_text = full_text[:50000] + "...(truncated)"
+def live_suffix(video_id):
+    revision = live_indexes.revision(video_id)
+    return f":live{revision}" if revision is not None else ''
 
-        if summary_type == 'short':
-            prompt = f"""Task: Generate a summary of the provided video transcript in EXACTLY 10 numbered points.
+
+def transcript_text(index_data, route, limit=50000, mark_truncation=False):
+    """
+    Transcript text for a whole-video prompt: extractively compressed to the
+    model's token budget if PROMPT_COMPRESSION lists the route, else the
+    first `limit` characters.
+    """
+    if route in prompt_compression.enabled_routes():
+        return prompt_compression.compressed_text(index_data, route, OLLAMA_MODEL, limit)
+
+    # One extra character tells us whether anything was cut
+    full_text = index_data['chunks'].full_text(limit + 1)
+    if len(full_text) > limit:
+        full_text = full_text[:limit] + ("...(truncated)" if mark_truncation else "")
+    return full_text
+
+
+def generate_artifact(kind, video_id, build_prompt, *, variant='', format=None):
+    """
+    Returns a cached LLM output for a video, generating it on a miss.
+    build_prompt is only called on a miss.
+    """
+    key = artifact_key(kind, video_id, variant)
+
+    def build():
+        with metrics.timed('prompt_assembly'):
+            prompt = build_prompt()
+        return ollama_generate(prompt, format=format)
+
+    return store.get_or_build(key, build)
+
+
+def build_summary_prompt(index_data, summary_type):
+    """Builds the /api/summary prompt ('short', 'detailed' or generic)."""
+    full_text = transcript_text(index_data, 'summary', mark_truncation=True)
+
+    if summary_type == 'short':
+        prompt = f"""Task: Generate a summary of the provided video transcript in EXACTLY 10 numbered points.
 
 Instructions:
 1. Format as a strict numbered list (1., 2., 3., ...).
@@ -267,8 +412,8 @@ Instructions:
 Transcript:
 {full_text}
 """
-        elif summary_type == 'detailed':
-            prompt = f"""Task: Provide a detailed, comprehensive summary of the video transcript in a structured, professional format (similar to IEEE/technical report style).
+    elif summary_type == 'detailed':
+        prompt = f"""Task: Provide a detailed, comprehensive summary of the video transcript in a structured, professional format (similar to IEEE/technical report style).
 
 Instructions:
 1. Use Numbered Headings for main sections (e.g., "1. Introduction", "2. Key Concept", "3. Conclusion").
@@ -279,115 +424,305 @@ Instructions:
 Transcript:
 {full_text}
 """
-        else:
-            prompt = f"Summarize this video transcript:\n\n{full_text}"
+    else:
+        prompt = f"Summarize this video transcript:\n\n{full_text}"
+
+    return prompt
+
+
+def build_overview_prompt(chunks):
+    """Builds the short "what is this video about" prompt from the opening chunks."""
+    context_text = format_context(chunks[:3])
+
+    return f"""Based on this video content, provide a brief overview of what the video is about.
+
+CONTEXT:
+{context_text}
+
+INSTRUCTIONS:
+- Summarize the main topic in 2-3 sentences.
+- Be concise and informative.
+"""
+
+
+# Replies to intents that need no lookup at all
+CANNED_REPLIES = {
+    'greeting': "Hi! I'm here to answer questions about this video. What would you like to know?",
+    'acknowledgement': "You're welcome! Ask me anything else about this video.",
+}
+
+NOT_IN_CONTEXT = "I don't have enough information in this part of the video to answer that."
+
+
+def format_context(chunks):
+    return "\n\n".join([f"[Time: {int(c['start'])}s] {c['text']}" for c in chunks])
+
+
+def build_ask_prompt(context_text, question):
+    """Builds the /api/ask prompt for one question over retrieved chunks."""
+    return f"""You are a helpful assistant answering questions about a video based on its transcript.
+
+CONTEXT:
+{context_text}
+
+QUESTION:
+{question}
+
+INSTRUCTIONS:
+- Answer the question using ONLY the provided context.
+- If the answer is not in the context, say "{NOT_IN_CONTEXT}"
+- Be concise and helpful.
+- Use natural language, not bullet points unless listing items.
+"""
+
+
+def build_entities_prompt(index_data):
+    """Builds the JSON-mode prompt for /api/extract-entities."""
+    full_text = transcript_text(index_data, 'entities')
+
+    return f"""Analyze the following video transcript and extract key named entities and facts.
+Return the result as a JSON object with the following keys:
+- "key_facts": {{ "people_mentioned": int, "organizations": int, "locations": int, "dates_mentioned": int, "top_people": [{{ "name": str, "mentions": int }}], "top_organizations": [{{ "name": str, "mentions": int }}], "top_locations": [{{ "name": str, "mentions": int }}] }}
+- "entities": {{ "PERSON": [{{ "text": str }}], "ORG": [{{ "text": str }}], "LOC": [{{ "text": str }}], "DATE": [{{ "text": str }}], "EVENT": [{{ "text": str }}] }}
+- "timeline": [{{ "date": str, "context": str }}]
+- "relationships": [{{ "type": str, "entity1": str, "entity2": str, "context": str }}]
+
+Respond ONLY with a single JSON object, no extra text.
+
+Transcript:
+{full_text}
+"""
+
+
+def build_insights_prompt(index_data):
+    """Builds the HTML suggested-questions/insights prompt for /api/get-insights."""
+    full_text = transcript_text(index_data, 'insights')
+
+    return f"""Generate 5 interesting questions that a user might want to ask about this video, and 3 key insights.
+Format the output as a simple HTML string with:
+<h3>Suggested Questions</h3><ul>...</ul>
+<h3>Key Insights</h3><ul>...</ul>
+
+Use only information from this transcript:
+
+{full_text}
+"""
+
+
+def request_video_id():
+    """The video a request is about, from ?v= or a JSON body's video_id."""
+    video_id = request.args.get('v')
+    if video_id is None:
+        body = request.get_json(silent=True) or {}
+        video_id = body.get('video_id')
+    return video_id
+
+
+def video_priority():
+    """Admission priority: videos that are already indexed go first."""
+    video_id = request_video_id()
+    if video_id in CACHE or video_id in live_indexes or video_id in snapshots:
+        return admission.PRIORITY_HOT
+    return admission.PRIORITY_COLD
+
+
+# --- ROUTES ---
 
-        response_text = ollama_generate(prompt)
+def request_artifact_keys(kind, variant=''):
+    """Artifact keys behind a GET route's response, for ETags (None without ?v=)."""
+    def keys():
+        video_id = request.args.get('v')
+        if not video_id:
+            return None
+        return [artifact_key(kind, video_id, variant(request.args) if callable(variant) else variant)]
+    return keys
+
+
+@app.route('/api/summary', methods=['GET'])
+@deadline.route('summary')
+@http_cache.cached('summary', store, request_artifact_keys('summary', lambda args: args.get('type', 'short')))
+@admission.limit('summary', priority=video_priority)
+def summary():
+    video_id = request.args.get('v')
+    summary_type = request.args.get('type', 'short')
+
+    if not video_id:
+        return jsonify({"error": True, "data": "Video ID missing"})
+
+    try:
+        # 1. Get Transcript (builds the index immediately for future Q&A)
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Could not retrieve transcript (no English captions?)"})
+
+        if not OLLAMA_API_KEY:
+            return degraded_summary(index_data, summary_type, 'llm_unconfigured')
+
+        # 2. Start on the artifacts the frontend asks for next, in parallel with the summary
+        prefetcher.touch('summary', video_id, prefetch_client())
+
+        # 3. Generate Summary, serving an extractive one if the LLM is slower than the SLO
+        cached = store.get(artifact_key('summary', video_id, summary_type))
+        if cached is not None:
+            return jsonify({"error": False, "data": cached})
+        future = summary_generation(video_id, index_data, summary_type)
+        if future is None:
+            return degraded_summary(index_data, summary_type, 'backlog')
+        try:
+            response_text = future.result(timeout=deadline.timeout('summary_slo', SUMMARY_SLO))
+        except FutureTimeout:
+            # The LLM summary keeps generating in the background for the next request
+            return degraded_summary(index_data, summary_type, 'slo')
+        except deadline.DeadlineExceeded:
+            return degraded_summary(index_data, summary_type, 'deadline')
+        except Exception as e:
+            print(f"Summary LLM Error for {video_id}: {e}")
+            return degraded_summary(index_data, summary_type, 'llm_error')
         return jsonify({"error": False, "data": response_text})
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": True, "data": str(e)})
 
 
 @app.route('/api/ask', methods=['POST'])
+@deadline.route('ask')
+@admission.limit('ask', priority=video_priority)
 def ask():
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
         data = request.get_json()
         video_id = data.get('video_id')
         question = data.get('question')
 
+        if data.get('video_ids') or data.get('playlist_id'):
+            return ask_videos(data, start_time)
+
         if not video_id or not question:
             return jsonify({"error": True, "data": "Missing video_id or question"})
 
-        if not OLLAMA_API_KEY:
-            return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
-
-        # 1. Ensure Index Exists
-        if video_id not in CACHE:
-            transcript = get_transcript(video_id)
-            if not transcript:
-                return jsonify({"error": True, "data": "Transcript not found. Please summarize first."})
-            CACHE[video_id] = create_rag_index(video_id, transcript)
-
-        # Handle generic greetings
-        question_lower = question.lower().strip()
-        if question_lower in ['hi', 'hello', 'hey']:
+        try:
+            range_start, range_end = parse_time_range(data)
+        except ValueError as e:
+            return jsonify({"error": True, "data": str(e)})
+        has_range = range_start is not None or range_end is not None
+
+        # Greetings, thanks, timestamp and entity lookups are answered without the LLM
+        intent, _ = intent_router.classify(question)
+        if intent in CANNED_REPLIES:
+            intent_router.record(intent, 'canned')
             return jsonify({
                 "error": False,
-                "data": "Hi! I'm here to answer questions about this video. What would you like to know?",
+                "data": CANNED_REPLIES[intent],
+                "intent": intent,
                 "metrics": {
                     "retrieval_score": 1.0,
                     "faithfulness": 1.0,
-                    "latency": round(time.time() - start_time, 2)
+                    "latency": round(time.perf_counter() - start_time, 2)
                 }
             })
 
-        # Handle "what is this video about" type questions
-        if any(phrase in question_lower for phrase in ['what is this video', 'what is the video', 'video about', 'topic of']):
-            chunks = CACHE[video_id]['chunks'][:3]
-            context_text = "\n\n".join([f"[Time: {int(c['start'])}s] {c['text']}" for c in chunks])
-
-            prompt = f"""Based on this video content, provide a brief overview of what the video is about.
-
-CONTEXT:
-{context_text}
+        # 1. Ensure Index Exists
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found. Please summarize first."})
+
+        routed = None
+        if intent == 'entity':
+            routed = answer_entity(video_id, question, range_start, range_end)
+        if routed is None and intent in ('entity', 'timestamp'):
+            routed = answer_timestamp(video_id, question, range_start, range_end)
+        if routed is not None:
+            routed.update({"error": False, "intent": intent})
+            routed["metrics"]["latency"] = round(time.perf_counter() - start_time, 2)
+            return jsonify(routed)
 
-INSTRUCTIONS:
-- Summarize the main topic in 2-3 sentences.
-- Be concise and informative.
-"""
-            response_text = ollama_generate(prompt)
+        # Handle "what is this video about" type questions
+        if intent == 'overview':
+            chunks = index_data['chunks']
+            if has_range:
+                lo, hi = chunks.range_indices(range_start, range_end)
+                chunks = chunks[lo:hi]
+            variant = f"{range_start}-{range_end}" if has_range else ''
+            response_text = store.get(artifact_key('overview', video_id, variant))
+            if response_text is not None:
+                intent_router.record(intent, 'overview_cached')
+            elif not OLLAMA_API_KEY:
+                return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
+            else:
+                intent_router.record(intent, 'overview_llm')
+                response_text = generate_artifact(
+                    'overview', video_id, lambda: build_overview_prompt(chunks), variant=variant,
+                )
 
             return jsonify({
                 "error": False,
                 "data": response_text,
+                "intent": intent,
                 "metrics": {
                     "retrieval_score": 1.0,
                     "faithfulness": 0.9,
-                    "latency": round(time.time() - start_time, 2)
+                    "latency": round(time.perf_counter() - start_time, 2)
                 }
             })
 
+        if not OLLAMA_API_KEY:
+            return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
+
         # 2. Retrieve Context
-        context_chunks, top_score = retrieve_context(video_id, question, top_k=5)
+        deadline.check('retrieval')
+        context_chunks, top_score = retrieve_context(
+            video_id, question, top_k=5, start=range_start, end=range_end
+        )
 
         if not context_chunks:
+            intent_router.record(intent, 'no_context')
+            if has_range:
+                return jsonify({
+                    "error": False,
+                    "data": "I couldn't find anything about that in the selected part of the video. Try widening the time range.",
+                    "intent": intent,
+                })
             return jsonify({
                 "error": False,
-                "data": "I couldn't find specific information about that in the video. Could you rephrase your question or ask something more specific?"
+                "data": "I couldn't find specific information about that in the video. Could you rephrase your question or ask something more specific?",
+                "intent": intent,
             })
 
         # 3. Generate Answer
-        context_text = "\n\n".join(
-            [f"[Time: {int(c['start'])}s] {c['text']}" for c in context_chunks]
-        )
-
-        prompt = f"""You are a helpful assistant answering questions about a video based on its transcript.
+        with metrics.timed('prompt_assembly'):
+            context_text = format_context(context_chunks)
+            prompt = build_ask_prompt(context_text, question)
 
-CONTEXT:
-{context_text}
-
-QUESTION:
-{question}
-
-INSTRUCTIONS:
-- Answer the question using ONLY the provided context.
-- If the answer is not in the context, say "I don't have enough information in this part of the video to answer that."
-- Be concise and helpful.
-- Use natural language, not bullet points unless listing items.
-"""
-
-        answer = ollama_generate(prompt)
+        try:
+            answer = ollama_generate(prompt)
+        except deadline.DeadlineExceeded as e:
+            # Out of time for the answer, but the retrieved passages are still useful
+            deadline.record('ask', e.stage)
+            intent_router.record(intent, 'partial')
+            return jsonify({
+                "error": False,
+                "partial": True,
+                "stage": e.stage,
+                "data": "I ran out of time to write an answer, but these parts of the video look relevant:\n\n" + context_text,
+                "chunks": [{"start": float(c['start']), "text": c['text']} for c in context_chunks],
+                "metrics": {
+                    "retrieval_score": float(top_score),
+                    "latency": round(time.perf_counter() - start_time, 2)
+                }
+            })
 
-        latency = round(time.time() - start_time, 2)
+        latency = round(time.perf_counter() - start_time, 2)
         faithfulness = calculate_faithfulness(answer, context_text)
+        intent_router.record(intent, 'rag')
 
         return jsonify({
             "error": False,
             "data": answer,
+            "intent": intent,
             "metrics": {
                 "retrieval_score": float(top_score),
                 "faithfulness": float(faithfulness),
@@ -395,12 +730,17 @@ INSTRUCTIONS:
             }
         })
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": True, "data": f"Backend Error: {str(e)}"})
 
 
 @app.route('/api/extract-entities', methods=['GET'])
+@deadline.route('entities')
+@http_cache.cached('entities', store, request_artifact_keys('entities'))
+@admission.limit('entities', priority=video_priority)
 def extract_entities():
     video_id = request.args.get('v')
     if not video_id:
@@ -411,37 +751,19 @@ def extract_entities():
             return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
 
         # 1. Get Transcript
-        if video_id not in CACHE:
-            transcript = get_transcript(video_id)
-            if not transcript:
-                return jsonify({"error": True, "data": "Transcript not found."})
-            CACHE[video_id] = create_rag_index(video_id, transcript)
-
-        chunks = CACHE[video_id]['chunks']
-        full_text = " ".join([c['text'] for c in chunks])
-        if len(full_text) > 50000:
-            full_text = full_text[:50000]
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found."})
 
         # Ask Ollama to return JSON. We also set format="json".
-        prompt = f"""Analyze the following video transcript and extract key named entities and facts.
-Return the result as a JSON object with the following keys:
-- "key_facts": {{ "people_mentioned": int, "organizations": int, "locations": int, "dates_mentioned": int, "top_people": [{{ "name": str, "mentions": int }}], "top_organizations": [{{ "name": str, "mentions": int }}], "top_locations": [{{ "name": str, "mentions": int }}] }}
-- "entities": {{ "PERSON": [{{ "text": str }}], "ORG": [{{ "text": str }}], "LOC": [{{ "text": str }}], "DATE": [{{ "text": str }}], "EVENT": [{{ "text": str }}] }}
-- "timeline": [{{ "date": str, "context": str }}]
-- "relationships": [{{ "type": str, "entity1": str, "entity2": str, "context": str }}]
-
-Respond ONLY with a single JSON object, no extra text.
-
-Transcript:
-{full_text}
-"""
-
-        # JSON mode
-        raw_response = ollama_generate(prompt, format="json")
+        raw_response = generate_artifact(
+            'entities', video_id, lambda: build_entities_prompt(index_data), format="json"
+        )
 
         # raw_response may already be a dict (structured output) or a JSON string
         if isinstance(raw_response, dict):
-            data = raw_response
+            # Copy so the cached artifact is never mutated
+            data = dict(raw_response)
         else:
             try:
                 data = json.loads(raw_response)
@@ -452,12 +774,17 @@ Transcript:
         data['success'] = True
         return jsonify({"error": False, "data": data})
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": True, "data": str(e)})
 
 
 @app.route('/api/get-insights', methods=['GET'])
+@deadline.route('insights')
+@http_cache.cached('insights', store, request_artifact_keys('insights'))
+@admission.limit('insights', priority=video_priority)
 def get_insights():
     video_id = request.args.get('v')
     if not video_id:
@@ -467,35 +794,1065 @@ def get_insights():
         if not OLLAMA_API_KEY:
             return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
 
-        if video_id not in CACHE:
-            transcript = get_transcript(video_id)
-            if not transcript:
-                return jsonify({"error": True, "data": "Transcript not found."})
-            CACHE[video_id] = create_rag_index(video_id, transcript)
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found."})
 
-        chunks = CACHE[video_id]['chunks']
-        full_text = " ".join([c['text'] for c in chunks])
-        if len(full_text) > 50000:
-            full_text = full_text[:50000]
+        html = generate_artifact('insights', video_id, lambda: build_insights_prompt(index_data))
+        return jsonify({"error": False, "data": html})
 
-        prompt = f"""Generate 5 interesting questions that a user might want to ask about this video, and 3 key insights.
-Format the output as a simple HTML string with:
-<h3>Suggested Questions</h3><ul>...</ul>
-<h3>Key Insights</h3><ul>...</ul>
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": True, "data": str(e)})
 
-Use only information from this transcript:
 
-{full_text}
+# Most caption lines one /api/transcript response returns
+TRANSCRIPT_MAX_LINES = int(os.environ.get("TRANSCRIPT_MAX_LINES", 2000))
+
+
+@app.route('/api/transcript', methods=['GET'])
+@deadline.route('transcript')
+@admission.limit('transcript', priority=video_priority)
+def transcript_slice():
+    """
+    Returns the caption lines overlapping ?from=&to= (seconds or mm:ss).
+    Both bounds are optional; 'limit' caps the number of lines returned
+    and is clamped to TRANSCRIPT_MAX_LINES.
+    """
+    video_id = request.args.get('v')
+    if not video_id:
+        return jsonify({"error": True, "data": "Video ID missing"})
+
+    try:
+        range_start, range_end = parse_time_range(request.args)
+        limit = int(request.args.get('limit', TRANSCRIPT_MAX_LINES))
+    except ValueError as e:
+        return jsonify({"error": True, "data": str(e)})
+    if limit <= 0:
+        return jsonify({"error": True, "data": "'limit' must be a positive integer."})
+    limit = min(limit, TRANSCRIPT_MAX_LINES)
+
+    try:
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found."})
+
+        transcript = index_data['transcript']
+        lo, hi = transcript.range_indices(range_start, range_end)
+        truncated = hi - lo > limit
+        hi = min(hi, lo + limit)
+        # Zero-copy view; only the returned lines are materialized
+        part = transcript.slice(lo, hi)
+
+        return jsonify({
+            "error": False,
+            "data": {
+                "video_id": video_id,
+                "from": range_start,
+                "to": range_end,
+                "truncated": truncated,
+                "text": part.text(),
+                "lines": part.to_entries(),
+            }
+        })
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": True, "data": str(e)})
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def admin_authorized():
+    """Admin routes take ADMIN_TOKEN as a bearer token."""
+    auth = request.headers.get('Authorization', '')
+    return profiler.authorized(auth[len('Bearer '):] if auth.startswith('Bearer ') else None)
+
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Profiles in the ring buffer, newest first (without their stacks)."""
+    if not admin_authorized():
+        return jsonify({"error": True, "data": "Forbidden"}), 403
+    return jsonify({"error": False, "data": profiler.profiles.list()})
+
+
+@app.route('/admin/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile as collapsed stacks, for flamegraph.pl or speedscope."""
+    if not admin_authorized():
+        return jsonify({"error": True, "data": "Forbidden"}), 403
+    profile = profiler.profiles.get(profile_id)
+    if profile is None:
+        return jsonify({"error": True, "data": "Profile not found (the buffer keeps the last PROFILE_BUFFER)"}), 404
+    return Response(profiler.render_collapsed(profile), mimetype='text/plain',
+                    headers={'Cache-Control': 'no-store'})
+
+
+# --- BACKGROUND ARTIFACT BUILDS ---
+
+# Artifacts that can be built ahead of a request: name -> (kind, variant, prompt builder, format)
+# Prompt builders take the video's index.
+ARTIFACT_SPECS = {
+    'summary:short': ('summary', 'short', lambda index_data: build_summary_prompt(index_data, 'short'), None),
+    'summary:detailed': ('summary', 'detailed', lambda index_data: build_summary_prompt(index_data, 'detailed'), None),
+    'overview': ('overview', '', lambda index_data: build_overview_prompt(index_data['chunks']), None),
+    'insights': ('insights', '', build_insights_prompt, None),
+    'entities': ('entities', '', build_entities_prompt, "json"),
+}
+
+
+def build_artifact(video_id, name, index_data):
+    kind, variant, build_prompt, format = ARTIFACT_SPECS[name]
+    return generate_artifact(kind, video_id, lambda: build_prompt(index_data), variant=variant, format=format)
+
+
+def artifact_ready(video_id, name):
+    kind, variant, _, _ = ARTIFACT_SPECS[name]
+    return store.get(artifact_key(kind, video_id, variant)) is not None
+
+
+# --- CACHE WARMING ---
+
+WARM_ARTIFACTS = [name for name in os.environ.get("WARM_ARTIFACTS", "summary:short,overview").split(',') if name]
+
+
+def warm_video(video_id):
+    """Builds the index and configured LLM artifacts for a video if missing."""
+    index_data = ensure_index(video_id)
+    if index_data is None:
+        return False
+    if not OLLAMA_API_KEY:
+        return True
+    for name in WARM_ARTIFACTS:
+        if warmer.paused():
+            break
+        build_artifact(video_id, name, index_data)
+    return True
+
+
+warmer = CacheWarmer(
+    warm_video,
+    tracker=PopularityTracker(half_life=float(os.environ.get("WARM_HALF_LIFE", 6 * 3600))),
+    # Pause while any route runs at more than WARM_PAUSE_RATIO x its usual latency
+    guard=LatencyGuard(ratio=float(os.environ.get("WARM_PAUSE_RATIO", 2.0))),
+    top_n=int(os.environ.get("WARM_TOP_N", 0)),
+    interval=float(os.environ.get("WARM_INTERVAL", 900)),
+    concurrency=int(os.environ.get("WARM_CONCURRENCY", 2)),
+    state_path=os.environ.get("WARM_STATE_PATH"),
+)
+
+
+@app.before_request
+def track_request():
+    request.environ['vistify.start'] = time.perf_counter()
+    if request.path.startswith('/api/'):
+        video_id = request_video_id()
+        if video_id:
+            warmer.tracker.record(video_id)
+
+
+@app.after_request
+def observe_latency(response):
+    start = request.environ.get('vistify.start')
+    if start is not None and request.path.startswith('/api/'):
+        warmer.guard.observe(request.path, time.perf_counter() - start)
+    return response
+
+
+if warmer.top_n > 0:
+    warmer.start()
+
+
+# --- PREFETCH ---
+
+def prefetch_artifact(video_id, name, cancelled):
+    """
+    Prefetch task: skips the LLM call if every interested client has left,
+    or if the artifact's route has no free admission slot.
+    """
+    index_data = ensure_index(video_id)
+    if index_data is None or cancelled.is_set() or not OLLAMA_API_KEY:
+        return
+    with admission.background(name.split(':')[0]) as admitted:
+        if admitted:
+            build_artifact(video_id, name, index_data)
+
+
+def prefetch_client():
+    """
+    Whose prefetches a request touches: the browser tab's ?session= id, so
+    users behind one NAT address do not cancel each other's work. Falls back
+    to the client address for callers that send none.
+    """
+    session = request.args.get('session', '')
+    if 0 < len(session) <= 64 and session.replace('-', '').isalnum():
+        return 'session:' + session
+    return admission.client_id()
+
+
+prefetcher = PrefetchEngine(
+    prefetch_artifact,
+    rules=parse_rules(os.environ.get("PREFETCH_RULES", DEFAULT_RULES)),
+    concurrency=int(os.environ.get("PREFETCH_CONCURRENCY", 2)),
+    is_ready=artifact_ready,
+    # Live traffic first: no speculative LLM calls while latency is elevated
+    should_skip=lambda: warmer.guard.degraded() is not None,
+)
+
+
+@app.route('/api/prefetch/cancel', methods=['POST'])
+def cancel_prefetch():
+    """Called by the frontend when the user leaves a video."""
+    video_id = request_video_id()
+    if not video_id:
+        return jsonify({"error": True, "data": "Video ID missing"})
+    cancelled = prefetcher.cancel(video_id, prefetch_client())
+    return jsonify({"error": False, "data": {"cancelled": cancelled}})
+
+
+# --- BATCH QUESTIONS ---
+
+ASK_BATCH_MAX_QUESTIONS = int(os.environ.get("ASK_BATCH_MAX_QUESTIONS", 50))
+# Generations in flight per batch request
+ASK_BATCH_CONCURRENCY = int(os.environ.get("ASK_BATCH_CONCURRENCY", 4))
+# Questions answered by one prompt when their contexts overlap; 1 disables packing
+ASK_BATCH_PACK_SIZE = int(os.environ.get("ASK_BATCH_PACK_SIZE", 4))
+# Most chunks in a packed prompt's merged context
+ASK_BATCH_PACK_CHUNKS = 8
+
+PACKED_ANSWERS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answers": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "answer": {"type": "string"}},
+                "required": ["id", "answer"],
+            },
+        },
+    },
+    "required": ["answers"],
+}
+
+
+def pack_questions(contexts, pack_size=ASK_BATCH_PACK_SIZE, max_chunks=ASK_BATCH_PACK_CHUNKS):
+    """
+    Groups questions whose retrieved chunks overlap so one prompt can answer
+    them together. contexts is [(question index, chunks)]; returns lists of
+    question indices. A question joins a pack when at least half of its
+    chunks are already in the pack and the merged context stays within
+    max_chunks.
+    """
+    packs = []
+    for idx, chunks in contexts:
+        starts = {c['start'] for c in chunks}
+        for members, pack_starts in packs:
+            if (len(members) < pack_size and 2 * len(starts & pack_starts) >= len(starts)
+                    and len(starts | pack_starts) <= max_chunks):
+                members.append(idx)
+                pack_starts |= starts
+                break
+        else:
+            packs.append(([idx], set(starts)))
+    return [members for members, _ in packs]
+
+
+def build_packed_ask_prompt(context_text, questions):
+    """Builds one prompt answering several questions over a shared context, as JSON."""
+    numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+    return f"""You are a helpful assistant answering questions about a video based on its transcript.
+
+CONTEXT:
+{context_text}
+
+QUESTIONS:
+{numbered}
+
+INSTRUCTIONS:
+- Answer each question using ONLY the provided context.
+- If the answer to a question is not in the context, answer "{NOT_IN_CONTEXT}"
+- Be concise and helpful.
+- Use natural language, not bullet points unless listing items.
+- Respond ONLY with a JSON object {{"answers": [{{"id": int, "answer": str}}]}}, one entry per question, where id is the question's number.
 """
 
-        html = ollama_generate(prompt)
-        return jsonify({"error": False, "data": html})
 
+def parse_packed_answers(raw, count):
+    """Answers in question order from a packed response, or None unless all count are there."""
+    if not isinstance(raw, dict):
+        try:
+            raw = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+    answers = {}
+    entries = raw.get('answers') if isinstance(raw, dict) else None
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and isinstance(entry.get('answer'), str):
+            answers[entry.get('id')] = entry['answer']
+    if any(i not in answers for i in range(1, count + 1)):
+        return None
+    return [answers[i] for i in range(1, count + 1)]
+
+
+def answer_pack(entries):
+    """
+    Answers [(question, chunks)] that share context: one packed prompt, or a
+    prompt per question if there is only one or the packed reply is
+    unusable. Returns ([(answer, context_text)], llm_calls).
+    """
+    if len(entries) > 1:
+        merged = {c['start']: c for _, chunks in entries for c in chunks}
+        context_text = format_context([merged[start] for start in sorted(merged)])
+        with metrics.timed('prompt_assembly'):
+            prompt = build_packed_ask_prompt(context_text, [q for q, _ in entries])
+        answers = parse_packed_answers(ollama_generate(prompt, format=PACKED_ANSWERS_SCHEMA), len(entries))
+        if answers is not None:
+            metrics.inc('vistify_ask_batch_questions_total', len(entries), {'result': 'packed'})
+            return [(answer, context_text) for answer in answers], 1
+        print(f"Packed answer for {len(entries)} questions was unusable; asking one at a time")
+
+    results = []
+    for question, chunks in entries:
+        context_text = format_context(chunks)
+        with metrics.timed('prompt_assembly'):
+            prompt = build_ask_prompt(context_text, question)
+        results.append((ollama_generate(prompt), context_text))
+    metrics.inc('vistify_ask_batch_questions_total', len(entries), {'result': 'single'})
+    return results, len(entries) + (1 if len(entries) > 1 else 0)
+
+
+@app.route('/api/ask-batch', methods=['POST'])
+@deadline.route('ask_batch')
+@admission.limit('ask_batch', priority=video_priority)
+def ask_batch():
+    """
+    Answers many questions about one video in one request. Body:
+        {"video_id": "...", "questions": ["...", ...], "top_k": 5}
+    All questions are retrieved with a single vectorizer pass; questions with
+    overlapping context share a prompt, and generations run in parallel.
+    Returns one {question, answer, metrics} entry per question, in order.
+    """
+    start_time = time.perf_counter()
+
+    try:
+        data = request.get_json(silent=True) or {}
+        video_id = data.get('video_id')
+        questions = data.get('questions')
+
+        if not video_id or not isinstance(questions, list) or not questions:
+            return jsonify({"error": True, "data": "Missing video_id or questions"})
+        if len(questions) > ASK_BATCH_MAX_QUESTIONS:
+            return jsonify({"error": True, "data": f"At most {ASK_BATCH_MAX_QUESTIONS} questions per batch"})
+        if not all(isinstance(q, str) and q.strip() for q in questions):
+            return jsonify({"error": True, "data": "Questions must be non-empty strings"})
+        try:
+            top_k = min(max(int(data.get('top_k', 5)), 1), 20)
+        except (TypeError, ValueError):
+            return jsonify({"error": True, "data": "top_k must be an integer"})
+
+        if not OLLAMA_API_KEY:
+            return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
+
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found. Please summarize first."})
+
+        results = [None] * len(questions)
+        overview, to_retrieve = [], []
+        for i, question in enumerate(questions):
+            intent, _ = intent_router.classify(question)
+            if intent in CANNED_REPLIES:
+                results[i] = {"answer": CANNED_REPLIES[intent], "metrics": {"retrieval_score": 1.0, "faithfulness": 1.0}}
+            elif intent == 'overview':
+                overview.append(i)
+            else:
+                to_retrieve.append(i)
+
+        deadline.check('retrieval')
+        contexts = {}
+        retrieved = retrieve_context_batch(video_id, [questions[i] for i in to_retrieve], top_k)
+        for i, (chunks, top_score) in zip(to_retrieve, retrieved):
+            if chunks:
+                contexts[i] = (chunks, top_score)
+            else:
+                results[i] = {"answer": "I couldn't find specific information about that in the video.",
+                              "metrics": {"retrieval_score": float(top_score), "faithfulness": 0.0}}
+        metrics.inc('vistify_ask_batch_questions_total', len(to_retrieve) - len(contexts), {'result': 'no_context'})
+
+        packs = pack_questions([(i, contexts[i][0]) for i in sorted(contexts)])
+        llm_calls = 0
+        timed_out = None
+        with ThreadPoolExecutor(max_workers=max(1, ASK_BATCH_CONCURRENCY)) as pool:
+            overview_future = None
+            if overview:
+                overview_future = pool.submit(deadline.bind(generate_artifact), 'overview', video_id,
+                                              lambda: build_overview_prompt(index_data['chunks']))
+            futures = [
+                (pack, pool.submit(deadline.bind(answer_pack), [(questions[i], contexts[i][0]) for i in pack]))
+                for pack in packs
+            ]
+
+            for pack, future in futures:
+                try:
+                    answered, calls = future.result()
+                except deadline.DeadlineExceeded as e:
+                    # Out of time for these answers; return their passages instead
+                    timed_out = e.stage
+                    for i in pack:
+                        chunks, top_score = contexts[i]
+                        results[i] = {
+                            "answer": "I ran out of time to write an answer, but these parts of the video look relevant.",
+                            "partial": True,
+                            "chunks": [{"start": float(c['start']), "text": c['text']} for c in chunks],
+                            "metrics": {"retrieval_score": float(top_score), "faithfulness": 0.0},
+                        }
+                    metrics.inc('vistify_ask_batch_questions_total', len(pack), {'result': 'partial'})
+                    continue
+                except Exception as e:
+                    traceback.print_exc()
+                    for i in pack:
+                        results[i] = {"error": True, "answer": f"Backend Error: {str(e)}",
+                                      "metrics": {"retrieval_score": float(contexts[i][1]), "faithfulness": 0.0}}
+                    metrics.inc('vistify_ask_batch_questions_total', len(pack), {'result': 'error'})
+                    continue
+                llm_calls += calls
+                for i, (answer, context_text) in zip(pack, answered):
+                    results[i] = {"answer": answer, "metrics": {
+                        "retrieval_score": float(contexts[i][1]),
+                        "faithfulness": float(calculate_faithfulness(answer, context_text)),
+                    }}
+
+            if overview_future is not None:
+                try:
+                    answer = overview_future.result()
+                    overview_result = {"answer": answer, "metrics": {"retrieval_score": 1.0, "faithfulness": 0.9}}
+                except deadline.DeadlineExceeded as e:
+                    timed_out = e.stage
+                    overview_result = {"answer": "I ran out of time to write an answer.", "partial": True,
+                                       "metrics": {"retrieval_score": 1.0, "faithfulness": 0.0}}
+                except Exception as e:
+                    traceback.print_exc()
+                    overview_result = {"error": True, "answer": f"Backend Error: {str(e)}",
+                                       "metrics": {"retrieval_score": 1.0, "faithfulness": 0.0}}
+                for i in overview:
+                    results[i] = overview_result
+
+        if timed_out is not None:
+            deadline.record('ask_batch', timed_out)
+
+        return jsonify({
+            "error": False,
+            "partial": timed_out is not None,
+            "data": [dict(result, question=question) for question, result in zip(questions, results)],
+            "metrics": {
+                "questions": len(questions),
+                "llm_calls": llm_calls,
+                "latency": round(time.perf_counter() - start_time, 2)
+            }
+        })
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": True, "data": f"Backend Error: {str(e)}"})
+
+
+# --- ENTITY MENTIONS ---
+
+# Build each new video's entity index in the background, so /api/mentions never waits on spaCy
+MENTIONS_EAGER = os.environ.get("MENTIONS_EAGER", "1") != "0"
+_mention_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mentions')
+_ner_available = None
+
+
+def ner_available():
+    """True if spaCy is installed; checked without importing it."""
+    global _ner_available
+    if _ner_available is None:
+        import importlib.util
+        _ner_available = importlib.util.find_spec('spacy') is not None
+    return _ner_available
+
+
+def mention_index(video_id, index_data):
+    """
+    Normalized entity -> {text, label, count, times} for a video (see
+    ner_extractor.build_mention_index). Built once per video from the RAG
+    index's chunks and kept in the artifact store.
+    """
+    def build():
+        import ner_extractor
+        chunks = index_data['chunks']
+        with metrics.timed('mention_index'):
+            return ner_extractor.build_mention_index(chunks.texts(), chunks.starts.tolist())
+
+    return store.get_or_build(mention_key(video_id), build)
+
+
+def mention_key(video_id):
+    return f"mentions:v{FORMAT_VERSION}:{video_id}{live_suffix(video_id)}"
+
+
+def schedule_mention_index(video_id, index_data):
+    if not MENTIONS_EAGER or not ner_available():
+        return
+
+    def run():
+        try:
+            mention_index(video_id, index_data)
+        except Exception as e:
+            print(f"Mention Index Error for {video_id}: {e}")
+
+    _mention_pool.submit(run)
+
+
+@app.route('/api/mentions', methods=['GET'])
+@deadline.route('mentions')
+@admission.limit('mentions', priority=video_priority)
+def mentions():
+    """
+    Where an entity is mentioned: ?v=<id>&entity=obama returns the start
+    times of the chunks that mention it, without an LLM call. Without
+    entity, lists the video's entities by mention count.
+    """
+    video_id = request.args.get('v')
+    entity = request.args.get('entity', '').strip()
+    if not video_id:
+        return jsonify({"error": True, "data": "Video ID missing"})
+    if not ner_available():
+        return jsonify({"error": True, "data": "Entity index unavailable (spaCy not installed)."})
+
+    try:
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found."})
+
+        import ner_extractor
+        index = mention_index(video_id, index_data)
+
+        if not entity:
+            entities = sorted(
+                ({"entity": key, "text": info['text'], "label": info['label'], "count": info['count']}
+                 for key, info in index.items()),
+                key=lambda e: e['count'], reverse=True,
+            )
+            return jsonify({"error": False, "data": {"video_id": video_id, "entities": entities}})
+
+        matches = ner_extractor.find_mentions(index, entity)
+        return jsonify({
+            "error": False,
+            "data": {
+                "video_id": video_id,
+                "entity": entity,
+                "matches": matches,
+                "times": sorted({t for m in matches for t in m['times']}),
+            }
+        })
+
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": True, "data": str(e)})
 
 
+# --- PLAYLIST QUESTIONS ---
+
+# Videos indexed and scored at once for a multi-video question
+PLAYLIST_CONCURRENCY = int(os.environ.get("PLAYLIST_CONCURRENCY", 8))
+_playlist_pool = ThreadPoolExecutor(max_workers=PLAYLIST_CONCURRENCY, thread_name_prefix='playlist')
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+def score_video(video_id, query, top_k):
+    """
+    One video's best chunks for a multi-video question, sorted by calibrated
+    score (see playlist.calibrated_score). Indexes the video if needed;
+    None if it has no transcript.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    index_data = ensure_index(video_id)
+    if index_data is None:
+        return None
+    vectorizer = index_data['vectorizer']
+    coverage = playlist.query_coverage(vectorizer, query)
+    if not coverage:
+        return []
+
+    with metrics.timed('retrieval'):
+        similarities = cosine_similarity(vectorizer.transform([query]), index_data['matrix']).flatten()
+        chunks = index_data['chunks']
+        hits = []
+        for idx in similarities.argsort()[-top_k:][::-1]:
+            # Same relevance threshold as retrieve_context, on the raw cosine
+            if similarities[idx] > 0.05:
+                chunk = chunks[int(idx)]
+                hits.append({
+                    'video_id': video_id,
+                    'start': chunk['start'],
+                    'text': chunk['text'],
+                    'score': playlist.calibrated_score(similarities[idx], coverage),
+                })
+    return hits
+
+
+def build_playlist_prompt(hits, video_ids, question):
+    """The /api/ask prompt over chunks from several videos, each labelled for citation."""
+    numbers = {vid: n for n, vid in enumerate(video_ids, 1)}
+    context_text = "\n\n".join(
+        f"[Video {numbers[h['video_id']]} @ {format_timestamp(h['start'])}] {h['text']}"
+        # Grouped by video and time so neighbouring passages read in order
+        for h in sorted(hits, key=lambda h: (numbers[h['video_id']], h['start']))
+    )
+    return context_text, f"""You are a helpful assistant answering questions about a series of videos based on their transcripts.
+
+CONTEXT:
+{context_text}
+
+QUESTION:
+{question}
+
+INSTRUCTIONS:
+- Answer the question using ONLY the provided context.
+- Cite the passages you use as (Video N, m:ss), copying the labels from the context.
+- If the answer is not in the context, say "I don't have enough information in these videos to answer that."
+- Be concise and helpful.
+- Use natural language, not bullet points unless listing items.
+"""
+
+
+def ask_videos(data, start_time):
+    """
+    /api/ask over several videos: {"video_ids": [...]} or {"playlist_id": "..."}.
+    Videos are indexed and scored in parallel, and the top chunks across all
+    of them are merged into one prompt that cites (video, timestamp) pairs.
+    """
+    question = data.get('question')
+    if not question:
+        return jsonify({"error": True, "data": "Missing question"})
+    if data.get('from') is not None or data.get('to') is not None:
+        return jsonify({"error": True, "data": "Time ranges are only supported for a single video"})
+
+    video_ids = data.get('video_ids')
+    if data.get('playlist_id'):
+        try:
+            video_ids = playlist.resolve(data['playlist_id'])
+        except playlist.PlaylistError as e:
+            return jsonify({"error": True, "data": str(e)})
+    if not isinstance(video_ids, list) or not all(isinstance(v, str) and v for v in video_ids):
+        return jsonify({"error": True, "data": "video_ids must be a list of video ids"})
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        return jsonify({"error": True, "data": "The playlist has no videos"})
+    if len(video_ids) > playlist.MAX_VIDEOS:
+        return jsonify({"error": True, "data": f"At most {playlist.MAX_VIDEOS} videos per question"})
+
+    if not OLLAMA_API_KEY:
+        return jsonify({"error": True, "data": "Server LLM not configured (OLLAMA_API_KEY missing)."})
+
+    top_k = 5
+    futures = [_playlist_pool.submit(deadline.bind(score_video), vid, question, top_k) for vid in video_ids]
+    per_video, missing = [], []
+    for vid, future in zip(video_ids, futures):
+        try:
+            hits = future.result()
+        except deadline.DeadlineExceeded:
+            # Answer from the videos that made it in time
+            missing.append(vid)
+            continue
+        except Exception as e:
+            print(f"Playlist Retrieval Error for {vid}: {e}")
+            missing.append(vid)
+            continue
+        if hits is None:
+            missing.append(vid)
+        else:
+            per_video.append(hits)
+
+    with metrics.timed('retrieval_merge'):
+        hits = playlist.merge_top_k(per_video, top_k)
+
+    if not hits:
+        return jsonify({
+            "error": False,
+            "data": "I couldn't find specific information about that in these videos. Could you rephrase your question or ask something more specific?"
+        })
+
+    with metrics.timed('prompt_assembly'):
+        context_text, prompt = build_playlist_prompt(hits, video_ids, question)
+    sources = [
+        {"video_id": h['video_id'], "video": video_ids.index(h['video_id']) + 1,
+         "start": h['start'], "score": round(h['score'], 4)}
+        for h in hits
+    ]
+
+    try:
+        answer = ollama_generate(prompt)
+    except deadline.DeadlineExceeded as e:
+        deadline.record('ask', e.stage)
+        return jsonify({
+            "error": False,
+            "partial": True,
+            "stage": e.stage,
+            "data": "I ran out of time to write an answer, but these parts of the videos look relevant:\n\n" + context_text,
+            "sources": sources,
+            "skipped_videos": missing,
+            "metrics": {"retrieval_score": float(hits[0]['score']),
+                        "latency": round(time.perf_counter() - start_time, 2)}
+        })
+
+    return jsonify({
+        "error": False,
+        "data": answer,
+        "sources": sources,
+        "skipped_videos": missing,
+        "metrics": {
+            "retrieval_score": float(hits[0]['score']),
+            "faithfulness": float(calculate_faithfulness(answer, context_text)),
+            "latency": round(time.perf_counter() - start_time, 2)
+        }
+    })
+
+
+# --- LIVE INGESTION ---
+
+def finalize_live(live):
+    """Replaces a finished live index with a regular TF-IDF index, stored like any other."""
+    video_id = live.video_id
+    transcript = live.transcript()
+    if len(transcript):
+        index_data = create_rag_index(video_id, transcript)
+        store.put(f"transcript:v{FORMAT_VERSION}:{video_id}", transcript, codec='pickle', front=False)
+        store.put(f"index:v{FORMAT_VERSION}:{video_id}", index_data, codec='pickle', front=False)
+        snapshots.save(video_id, index_data)
+        CACHE[video_id] = index_data
+    live_indexes.pop(video_id)
+    print(f"Live index for {video_id} finalized ({len(transcript)} lines)")
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """
+    Appends caption segments to a live stream's index. Body:
+        {"video_id": "...", "segments": [{"text", "start", "duration"}, ...], "final": false}
+    Each update costs time proportional to the new segments. "final": true
+    ends the stream and rebuilds it as a regular index. Requires ADMIN_TOKEN.
+    """
+    if not admin_authorized():
+        return jsonify({"error": True, "data": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    video_id = data.get('video_id')
+    segments = data.get('segments') or []
+    if not video_id or not isinstance(segments, list):
+        return jsonify({"error": True, "data": "Missing video_id or segments"})
+    if video_id not in live_indexes and not segments:
+        return jsonify({"error": True, "data": "No live stream for this video"})
+
+    try:
+        segments = parse_segments(segments)
+    except ValueError as e:
+        return jsonify({"error": True, "data": f"Invalid segment: {e}"})
+
+    try:
+        with metrics.timed('live_ingest'):
+            live, evicted = live_indexes.touch(video_id)
+            counts = live.ingest(segments)
+        if evicted is not None:
+            # Over LIVE_MAX_STREAMS: the least recently updated stream becomes a regular index
+            finalize_live(evicted)
+
+        result = {
+            "video_id": video_id,
+            "lines": len(live),
+            "chunks": live.closed_chunks,
+            "accepted": counts['accepted'],
+            "skipped": counts['skipped'],
+            "final": bool(data.get('final')),
+        }
+        if data.get('final'):
+            finalize_live(live)
+        return jsonify({"error": False, "data": result})
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": True, "data": str(e)})
+
+
+# --- INTENT ROUTING ---
+
+# Chunks listed in a timestamp answer, and the best-match similarity it needs
+TIMESTAMP_TOP_K = 3
+TIMESTAMP_MIN_SCORE = 0.1
+MENTION_TIMES_SHOWN = 10
+
+
+def snippet(text, limit=160):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + "..."
+
+
+def answer_timestamp(video_id, question, start=None, end=None):
+    """
+    "When do they talk about X": the start times of the chunks that best
+    match the question's topic, straight from the index. None if nothing
+    matches well enough, so the question goes to full RAG.
+    """
+    deadline.check('retrieval')
+    chunks, top_score = retrieve_context(video_id, intent_router.topic(question),
+                                         top_k=TIMESTAMP_TOP_K, start=start, end=end)
+    if not chunks or top_score < TIMESTAMP_MIN_SCORE:
+        return None
+
+    intent_router.record('timestamp', 'index_lookup')
+    chunks.sort(key=lambda c: c['start'])
+    lines = [f"{format_timestamp(c['start'])} - {snippet(c['text'])}" for c in chunks]
+    return {
+        "data": "This comes up at:\n\n" + "\n".join(lines),
+        "chunks": [{"start": float(c['start']), "text": c['text']} for c in chunks],
+        "metrics": {"retrieval_score": float(top_score), "faithfulness": 1.0},
+    }
+
+
+def answer_entity(video_id, question, start=None, end=None):
+    """
+    "Where is X mentioned": answered from the video's entity mention index
+    if it has been built. None if it has not, or names nothing in the
+    question, so the caller falls back to a timestamp lookup.
+    """
+    index = store.get(mention_key(video_id))
+    if not index:
+        return None
+    matches = intent_router.match_entities(index, question)
+    if not matches:
+        return None
+
+    intent_router.record('entity', 'mentions')
+    times = sorted({t for m in matches for t in m['times']
+                    if (start is None or t >= start) and (end is None or t <= end)})
+    name = matches[0]['text']
+    if not times:
+        text = f"{name} isn't mentioned in this part of the video."
+    else:
+        shown = ", ".join(format_timestamp(t) for t in times[:MENTION_TIMES_SHOWN])
+        more = f" and {len(times) - MENTION_TIMES_SHOWN} more times" if len(times) > MENTION_TIMES_SHOWN else ""
+        text = f"{name} is mentioned at {shown}{more}."
+    return {
+        "data": text,
+        "matches": matches,
+        "times": times,
+        "metrics": {"retrieval_score": 1.0, "faithfulness": 1.0},
+    }
+
+
+# --- CHAPTERS ---
+
+CHAPTER_TITLES_SCHEMA = {
+    "type": "object",
+    "properties": {"titles": {"type": "array", "items": {"type": "string"}}},
+    "required": ["titles"],
+}
+
+
+def chapters_key(video_id):
+    return f"chapters:v{FORMAT_VERSION}:{video_id}{live_suffix(video_id)}"
+
+
+def video_chapters(video_id, index_data):
+    """Chapters from topic shifts in the transcript (chapters.build_chapters), kept in the artifact store."""
+    def build():
+        with metrics.timed('chapters'):
+            return chapters.build_chapters(index_data)
+
+    return store.get_or_build(chapters_key(video_id), build)
+
+
+def build_chapter_titles_prompt(index_data, chapter_list):
+    """Builds the JSON-mode prompt that turns chapter keywords into short titles."""
+    chunks = index_data['chunks']
+    entries = []
+    for i, chapter in enumerate(chapter_list, 1):
+        excerpt = snippet(chunks.text(chunks.chunk_at(chapter['start'])), 300)
+        entries.append(f"{i}. [{format_timestamp(chapter['start'])}] keywords: {', '.join(chapter['terms'])}\n"
+                       f"   excerpt: {excerpt}")
+    chapter_text = "\n".join(entries)
+
+    return f"""Write a short title for each chapter of a video.
+
+CHAPTERS:
+{chapter_text}
+
+INSTRUCTIONS:
+- Return {{"titles": [...]}} with exactly one title per chapter, in order.
+- Each title is 2 to 6 words, based on the chapter's keywords and excerpt.
+- Do not number the titles or include timestamps.
+"""
+
+
+def chapter_titles(video_id, index_data, chapter_list):
+    """LLM titles for the chapters (cached), or None if the output does not have one per chapter."""
+    raw = generate_artifact(
+        'chapter_titles', video_id, lambda: build_chapter_titles_prompt(index_data, chapter_list),
+        format=CHAPTER_TITLES_SCHEMA,
+    )
+    if not isinstance(raw, dict):
+        try:
+            raw = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+    titles = raw.get('titles') if isinstance(raw, dict) else None
+    if not isinstance(titles, list) or len(titles) != len(chapter_list):
+        return None
+    if not all(isinstance(t, str) and t.strip() for t in titles):
+        return None
+    return [t.strip() for t in titles]
+
+
+def chapter_artifact_keys():
+    video_id = request.args.get('v')
+    if not video_id:
+        return None
+    keys = [chapters_key(video_id)]
+    if request.args.get('titles') == 'llm' and OLLAMA_API_KEY:
+        keys.append(artifact_key('chapter_titles', video_id))
+    return keys
+
+
+@app.route('/api/chapters', methods=['GET'])
+@deadline.route('chapters')
+@http_cache.cached('chapters', store, chapter_artifact_keys)
+@admission.limit('chapters', priority=video_priority)
+def get_chapters():
+    """
+    Chapter list for ?v=<id>, split at topic shifts in the transcript and
+    labeled with each chapter's top terms, without an LLM call.
+    &titles=llm has the LLM rewrite the labels as short titles; the labels
+    are kept if it is not configured, fails or runs out of time.
+    """
+    video_id = request.args.get('v')
+    if not video_id:
+        return jsonify({"error": True, "data": "Video ID missing"})
+
+    try:
+        index_data = ensure_index(video_id)
+        if index_data is None:
+            return jsonify({"error": True, "data": "Transcript not found."})
+
+        chapter_list = [dict(c) for c in video_chapters(video_id, index_data)]
+        source = 'keywords'
+        if request.args.get('titles') == 'llm' and OLLAMA_API_KEY and chapter_list:
+            try:
+                titles = chapter_titles(video_id, index_data, chapter_list)
+            except deadline.DeadlineExceeded as e:
+                deadline.record('chapters', e.stage)
+                titles = None
+            except Exception as e:
+                print(f"Chapter Titles Error for {video_id}: {e}")
+                titles = None
+            if titles is not None:
+                for chapter, title in zip(chapter_list, titles):
+                    chapter['title'] = title
+                source = 'llm'
+
+        for chapter in chapter_list:
+            chapter['timestamp'] = format_timestamp(chapter['start'])
+        return jsonify({
+            "error": False,
+            "data": {
+                "video_id": video_id,
+                "chapters": chapter_list,
+                "titles": source,
+                "text": "\n".join(f"{c['timestamp']} {c['title']}" for c in chapter_list),
+            }
+        })
+
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": True, "data": str(e)})
+
+
+# --- DEGRADED SUMMARIES ---
+
+# Seconds /api/summary waits for the LLM before serving an extractive summary
+SUMMARY_SLO = float(os.environ.get("SUMMARY_SLO_SECONDS", 20))
+# LLM summaries that outlive their request finish here and land in the store.
+# One worker per summary admission slot, so requests that gave up waiting
+# cannot add LLM calls beyond that limit.
+_summary_pool = ThreadPoolExecutor(max_workers=admission.controller.routes['summary'].concurrency,
+                                   thread_name_prefix='summary')
+# Generations running or queued at once; beyond this a summary stays extractive
+SUMMARY_MAX_PENDING = int(os.environ.get("SUMMARY_MAX_PENDING", 4 * admission.controller.routes['summary'].concurrency))
+# Artifact key -> the generation running for it
+_summary_running = {}
+_summary_running_lock = threading.Lock()
+
+
+def summary_generation(video_id, index_data, summary_type):
+    """
+    The future of the LLM summary for a video, joining one already running
+    for it. None when SUMMARY_MAX_PENDING generations are already pending.
+    """
+    key = artifact_key('summary', video_id, summary_type)
+    with _summary_running_lock:
+        future = _summary_running.get(key)
+        if future is not None:
+            return future
+        if len(_summary_running) >= SUMMARY_MAX_PENDING:
+            return None
+        future = _summary_pool.submit(
+            deadline.bind(generate_artifact), 'summary', video_id,
+            lambda: build_summary_prompt(index_data, summary_type), variant=summary_type,
+        )
+        _summary_running[key] = future
+
+    def finished(f):
+        with _summary_running_lock:
+            if _summary_running.get(key) is f:
+                del _summary_running[key]
+
+    # Outside the lock: runs right away if the future is already done
+    future.add_done_callback(finished)
+    return future
+
+
+def degraded_summary(index_data, summary_type, reason):
+    """
+    The summary as numbered extractive points (extractive.summarize), marked
+    degraded so the client can ask again for the LLM version. `upgrade` says
+    whether one may be ready by then.
+    """
+    metrics.inc('vistify_summary_degraded_total', labels={'reason': reason})
+    with metrics.timed('extractive_summary'):
+        points = extractive.summarize(index_data, 10 if summary_type == 'short' else 20)
+    text = "\n".join(f"{i}. {p['text']} [{format_timestamp(p['start'])}]" for i, p in enumerate(points, 1))
+    return jsonify({
+        "error": False,
+        "data": text,
+        "degraded": True,
+        "reason": reason,
+        "upgrade": reason not in ('llm_unconfigured', 'backlog'),
+    })
+
+
 # --- STARTUP ---
 if __name__ == '__main__':
     print("!!! FRESH START SERVER (OLLAMA CLOUD) !!!")
@@ -0,0 +1,327 @@
+"""
+Cross-process artifact store for transcripts, RAG indexes and LLM outputs.
+
+With several run_production.py processes behind a load balancer, each one has
+its own CACHE. Pointing them all at the same SQLite file (ARTIFACT_STORE_PATH)
+makes cache hits global: artifacts are published atomically, builds are
+serialized per key across processes with lease-based locks, and a small
+in-process LRU sits in front so hot artifacts never touch SQLite.
+
+The shared file is pruned as it is written to: artifacts older than
+ARTIFACT_STORE_MAX_AGE_DAYS are dropped, then the oldest ones until the
+file's artifacts fit in ARTIFACT_STORE_MAX_MB. Anything pruned is simply
+rebuilt on its next request.
+
+Without ARTIFACT_STORE_PATH the store is purely in-process.
+"""
+
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import deadline
+import metrics
+
+metrics.register('vistify_artifact_store_total', 'counter',
+                 'Artifact store lookups by artifact kind and result.')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    value BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def _encode(value, codec):
+    if codec == 'json':
+        return json.dumps(value).encode('utf-8')
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(blob, codec):
+    if codec == 'json':
+        return json.loads(blob)
+    return pickle.loads(blob)
+
+
+def _kind(key):
+    return key.split(':', 1)[0]
+
+
+def is_temporary(path):
+    temp = os.path.realpath(tempfile.gettempdir())
+    return os.path.commonpath([os.path.realpath(path), temp]) == temp
+
+
+class ArtifactStore:
+    def __init__(self, path=None, front_cache_size=256, lock_ttl=300.0, max_age=None, max_bytes=None,
+                 prune_interval=300.0):
+        """
+        path: SQLite file shared by all worker processes, or None for in-process only.
+        front_cache_size: entries kept in the local LRU.
+        lock_ttl: seconds before a build lock held by a crashed process expires.
+        max_age, max_bytes: limits on the shared file's artifacts; None for no limit.
+        prune_interval: least seconds between prunes, which run on writes.
+        """
+        self.path = path
+        self.front_cache_size = front_cache_size
+        self.lock_ttl = lock_ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._front = OrderedDict()
+        self._front_lock = threading.Lock()
+        # In-process single flight: key -> [lock, refcount]
+        self._key_locks = {}
+        self._key_locks_guard = threading.Lock()
+        self._local = threading.local()
+
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._conn()
+            conn.executescript(_SCHEMA)
+
+    # --- SQLite ---
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get_shared(self, key):
+        if not self.path:
+            return None
+        row = self._conn().execute(
+            "SELECT codec, value FROM artifacts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _decode(row[1], row[0])
+
+    def _put_shared(self, key, value, codec):
+        blob = _encode(value, codec)
+        # A single statement is atomic: readers see either the old row or the new one
+        self._conn().execute(
+            "INSERT OR REPLACE INTO artifacts (key, codec, value, created) VALUES (?, ?, ?, ?)",
+            (key, codec, sqlite3.Binary(blob), time.time()),
+        )
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def _try_lock(self, key):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires < ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO locks (key, owner, expires) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lock_ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def _unlock(self, key):
+        self._conn().execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, self.owner))
+
+    # --- Front cache ---
+
+    def _front_get(self, key):
+        with self._front_lock:
+            value = self._front.get(key)
+            if value is not None:
+                self._front.move_to_end(key)
+            return value
+
+    def _front_put(self, key, value):
+        with self._front_lock:
+            self._front[key] = value
+            self._front.move_to_end(key)
+            while len(self._front) > self.front_cache_size:
+                self._front.popitem(last=False)
+
+    @contextmanager
+    def _key_lock(self, key):
+        with self._key_locks_guard:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            # Joining another thread's build waits no longer than this request's deadline
+            wait = deadline.remaining()
+            if not entry[0].acquire(timeout=max(0.0, wait) if wait is not None else -1):
+                raise deadline.DeadlineExceeded('artifact_wait')
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._key_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    # --- Public API ---
+
+    def get(self, key, front=True):
+        """Returns the artifact or None, checking the local LRU first."""
+        if front:
+            value = self._front_get(key)
+            if value is not None:
+                metrics.inc('vistify_artifact_store_total', labels={'kind': _kind(key), 'result': 'front_hit'})
+                return value
+        value = self._get_shared(key)
+        if value is not None:
+            metrics.inc('vistify_artifact_store_total', labels={'kind': _kind(key), 'result': 'shared_hit'})
+            if front:
+                self._front_put(key, value)
+        return value
+
+    def put(self, key, value, codec='json', front=True):
+        """Publishes an artifact to the shared tier and the local LRU."""
+        if self.path:
+            self._put_shared(key, value, codec)
+        if front:
+            self._front_put(key, value)
+
+    def get_or_build(self, key, builder, codec='json', front=True):
+        """
+        Returns the artifact for key, calling builder() at most once across
+        all threads and processes sharing the store. A None result from the
+        builder is returned but not stored.
+        """
+        value = self.get(key, front)
+        if value is not None:
+            return value
+
+        with self._key_lock(key):
+            # Another thread in this process may have built it while we waited
+            value = self.get(key, front)
+            if value is not None:
+                return value
+
+            metrics.inc('vistify_artifact_store_total', labels={'kind': _kind(key), 'result': 'miss'})
+            if not self.path:
+                value = builder()
+                if value is not None:
+                    self.put(key, value, codec, front)
+                return value
+
+            lease_expires = time.time() + self.lock_ttl
+            delay = 0.05
+            while time.time() < lease_expires:
+                if self._try_lock(key):
+                    try:
+                        value = self._get_shared(key)
+                        if value is None:
+                            value = builder()
+                            if value is not None:
+                                self._put_shared(key, value, codec)
+                        if value is not None and front:
+                            self._front_put(key, value)
+                        return value
+                    finally:
+                        self._unlock(key)
+
+                # Another process is building it; wait for the publish
+                deadline.check('artifact_wait')
+                metrics.inc('vistify_artifact_store_total', labels={'kind': _kind(key), 'result': 'wait'})
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                value = self.get(key, front)
+                if value is not None:
+                    return value
+
+            # Lock holder is stuck past its lease; build without it
+            value = builder()
+            if value is not None:
+                self.put(key, value, codec, front)
+            return value
+
+    def delete(self, key):
+        with self._front_lock:
+            self._front.pop(key, None)
+        if self.path:
+            self._conn().execute("DELETE FROM artifacts WHERE key = ?", (key,))
+
+    def prune(self) -> int:
+        """
+        Drops shared artifacts older than max_age, then the oldest until the
+        rest fit in max_bytes, and expired build locks. Returns how many
+        artifacts were dropped.
+        """
+        self._last_prune = time.monotonic()
+        if not self.path:
+            return 0
+        conn = self._conn()
+        now = time.time()
+        dropped = 0
+        if self.max_age:
+            dropped += conn.execute("DELETE FROM artifacts WHERE created < ?", (now - self.max_age,)).rowcount
+        if self.max_bytes:
+            # Newest first; everything past the running total's limit goes
+            dropped += conn.execute("""
+                DELETE FROM artifacts WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(length(value)) OVER (ORDER BY created DESC, key) AS kept FROM artifacts
+                    ) WHERE kept > ?
+                )""", (self.max_bytes,)).rowcount
+        conn.execute("DELETE FROM locks WHERE expires < ?", (now,))
+        if dropped:
+            with self._front_lock:
+                self._front.clear()
+            metrics.inc('vistify_artifact_store_total', dropped, {'kind': 'all', 'result': 'pruned'})
+        return dropped
+
+    def clear(self, prefix=None):
+        """
+        Drops every artifact, or those whose key starts with prefix (used by
+        benchmarks and tests between runs). Clearing a whole shared store
+        outside the temp directory is refused, so a benchmark run with
+        ARTIFACT_STORE_PATH set cannot wipe a production store.
+        """
+        if self.path and prefix is None and not is_temporary(self.path):
+            raise RuntimeError(f"Refusing to clear the shared artifact store at {self.path}; pass a key prefix")
+        with self._front_lock:
+            for key in [k for k in self._front if prefix is None or k.startswith(prefix)]:
+                del self._front[key]
+        if self.path:
+            if prefix is None:
+                self._conn().execute("DELETE FROM artifacts")
+            else:
+                self._conn().execute("DELETE FROM artifacts WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+store = ArtifactStore(
+    os.environ.get("ARTIFACT_STORE_PATH"),
+    max_age=float(os.environ.get("ARTIFACT_STORE_MAX_AGE_DAYS", 30)) * 86400 or None,
+    max_bytes=int(float(os.environ.get("ARTIFACT_STORE_MAX_MB", 4096)) * 1024 * 1024) or None,
+)
@@ -0,0 +1,416 @@
+"""
+Offline benchmark suite for the Flask API.
+
+Generates synthetic transcripts, points the app at a local mock Ollama server
+(mock_ollama.py) and measures the RAG helpers and end-to-end routes. No API
+keys or network access are needed.
+
+Usage:
+    python benchmark.py --lines 500,2000,8000 --out bench_results.json
+    python benchmark.py --thresholds bench_thresholds.json   # exits 1 on regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_ollama import MockOllamaServer
+
+# Filler that real auto-generated captions are full of
+FILLER = ['[Music]', '[Applause]', 'um', 'uh', 'you know', 'so', 'like', 'right']
+
+
+def make_vocabulary(size=3000, seed=0):
+    """Pseudo-words with a realistic length distribution."""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocab = set()
+    while len(vocab) < size:
+        vocab.add(''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(vocab)
+
+
+def make_transcript(n_lines, seed=0, words_per_line=10, line_seconds=3.0, vocab_size=3000):
+    """
+    Returns a transcript in get_transcript() format.
+    Words follow a Zipf-like distribution so TF-IDF sees a long tail.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(vocab_size, seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    transcript = []
+    for i in range(n_lines):
+        words = rng.choices(vocab, weights=weights, k=words_per_line)
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(FILLER))
+        transcript.append({
+            'text': ' '.join(words),
+            'start': round(i * line_seconds, 2),
+            'duration': line_seconds,
+        })
+    return transcript
+
+
+def make_questions(transcript, n, seed=0):
+    """Questions built from words that occur in the transcript."""
+    rng = random.Random(seed + 1)
+    questions = []
+    for _ in range(n):
+        line = rng.choice(transcript)['text'].split()
+        picked = rng.sample(line, min(3, len(line)))
+        questions.append("what does the video say about " + " ".join(picked))
+    return questions
+
+
+def summarize(samples, wall_seconds=None):
+    """Latency percentiles (ms) and throughput for a list of durations in seconds."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        if not ordered:
+            return 0.0
+        idx = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[idx] * 1000
+
+    total = wall_seconds if wall_seconds is not None else sum(ordered)
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(pct(50), 3),
+        'p90_ms': round(pct(90), 3),
+        'p99_ms': round(pct(99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        'throughput_per_s': round(len(ordered) / total, 2) if total > 0 else 0.0,
+    }
+
+
+def time_calls(fn, args_list, warmup=1):
+    for args in args_list[:warmup]:
+        fn(*args)
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_create_rag_index(app_module, transcript, repeat):
+    samples = time_calls(app_module.create_rag_index, [('bench', transcript)] * repeat)
+    return summarize(samples)
+
+
+def bench_retrieve_context(app_module, transcript, n_queries):
+    app_module.CACHE['bench'] = app_module.create_rag_index('bench', transcript)
+    questions = make_questions(transcript, n_queries)
+    samples = time_calls(app_module.retrieve_context, [('bench', q) for q in questions])
+    app_module.CACHE.pop('bench', None)
+    return summarize(samples)
+
+
+def _allocated(build):
+    """Bytes still allocated by whatever build() returns."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+    return size
+
+
+def bench_memory(transcript):
+    """
+    Resident size of a transcript plus its chunks: the old list-of-dicts
+    layout (with the joined full text it rebuilt per request) versus the
+    columnar one. Inputs are copied from JSON so no strings are shared.
+    """
+    from columnar import Chunks, ColumnarTranscript
+
+    raw = json.dumps(transcript)
+
+    def dicts():
+        entries = json.loads(raw)
+        chunks, current, start = [], "", 0
+        for entry in entries:
+            if not current:
+                start = entry['start']
+            current += " " + entry['text']
+            if len(current) > 500:
+                chunks.append({'text': current.strip(), 'start': start})
+                current = ""
+        if current:
+            chunks.append({'text': current.strip(), 'start': start})
+        return entries, chunks, " ".join(c['text'] for c in chunks)
+
+    def columnar():
+        columns = ColumnarTranscript.from_entries(json.loads(raw))
+        return columns, Chunks.build(columns)
+
+    dict_bytes = _allocated(dicts)
+    columnar_bytes = _allocated(columnar)
+    return {
+        'dict_bytes': dict_bytes,
+        'columnar_bytes': columnar_bytes,
+        'ratio': round(dict_bytes / columnar_bytes, 2) if columnar_bytes else None,
+    }
+
+
+def bench_cache_tiers(app_module, transcript, repeat):
+    """Compressed size of one cold index and the cost of demoting/promoting it."""
+    from tiered_cache import TieredCache
+
+    cache = TieredCache(idle_seconds=0)
+    demote, promote = [], []
+    for _ in range(repeat):
+        cache['bench'] = app_module.create_rag_index('bench', transcript)
+        start = time.perf_counter()
+        cache.demote('bench')
+        demote.append(time.perf_counter() - start)
+        stats = cache.stats()
+        start = time.perf_counter()
+        cache.get('bench')
+        promote.append(time.perf_counter() - start)
+    return {
+        'hot_bytes': stats['cold']['raw_bytes'],
+        'cold_bytes': stats['cold']['bytes'],
+        'ratio': stats['cold']['ratio'],
+        'demote_p50_ms': summarize(demote)['p50_ms'],
+        'promote_p50_ms': summarize(promote)['p50_ms'],
+    }
+
+
+def bench_snapshot(app_module, transcript, repeat):
+    """
+    Warm-start cost: mapping an index snapshot, versus unpickling the index
+    and versus rebuilding it from the stored transcript (a restart without
+    snapshots).
+    """
+    import pickle
+    from columnar import as_columnar
+    from snapshot import load_index, save_index
+
+    index_data = app_module.create_rag_index('bench', transcript)
+    stored = pickle.dumps(as_columnar(transcript), protocol=pickle.HIGHEST_PROTOCOL)
+    rebuild = time_calls(lambda: app_module.create_rag_index('bench', pickle.loads(stored)), [()] * repeat)
+    pickled = pickle.dumps(index_data, protocol=pickle.HIGHEST_PROTOCOL)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.vidx')
+        save = time_calls(save_index, [(index_data, path)] * repeat)
+        load = time_calls(load_index, [(path,)] * repeat)
+        size = os.path.getsize(path)
+    unpickle = time_calls(pickle.loads, [(pickled,)] * repeat)
+    return {
+        'file_bytes': size,
+        'save_p50_ms': summarize(save)['p50_ms'],
+        'load_p50_ms': summarize(load)['p50_ms'],
+        'unpickle_p50_ms': summarize(unpickle)['p50_ms'],
+        'rebuild_p50_ms': summarize(rebuild)['p50_ms'],
+    }
+
+
+def bench_prompt_compression(app_module, transcript, repeat):
+    """Extractive compression of a whole-transcript prompt to the default budget."""
+    import prompt_compression
+
+    index_data = app_module.create_rag_index('bench', transcript)
+    budget = min(50000, prompt_compression.DEFAULT_TOKEN_BUDGET * prompt_compression.CHARS_PER_TOKEN)
+    samples = time_calls(prompt_compression.compress, [(index_data, budget)] * repeat)
+    text, stats = prompt_compression.compress(index_data, budget)
+    baseline = min(stats['original_chars'], 50000)
+    return dict(summarize(samples), ratio=round(baseline / max(1, len(text)), 2))
+
+
+def bench_process_transcript(transcript, repeat):
+    try:
+        import ner_extractor
+        ner_extractor.load_ner_model()
+    except Exception as e:
+        return {'skipped': f"spaCy unavailable: {e}"}
+    text = " ".join(entry['text'] for entry in transcript)
+    samples = time_calls(ner_extractor.process_transcript, [(text,)] * repeat)
+    return summarize(samples)
+
+
+def _route_request(client, route, video_id, question):
+    if route == 'ask':
+        resp = client.post('/api/ask', json={'video_id': video_id, 'question': question})
+    elif route == 'summary':
+        resp = client.get(f'/api/summary?v={video_id}&type=short')
+    elif route == 'insights':
+        resp = client.get(f'/api/get-insights?v={video_id}')
+    else:
+        resp = client.get(f'/api/extract-entities?v={video_id}')
+    body = resp.get_json()
+    if resp.status_code != 200 or body is None or body.get('error'):
+        raise RuntimeError(f"{route} failed: {resp.status_code} {body}")
+
+
+def bench_route(app_module, transcript, route, requests_count, concurrency, cold):
+    """
+    Drives one route through the Flask test client.
+    cold=True clears the index cache before every request, so each one pays
+    the transcript fetch and index build.
+    """
+    questions = make_questions(transcript, requests_count)
+    app_module.CACHE.clear()
+    app_module.store.clear()
+    if not cold:
+        app_module.ensure_index('bench')
+
+    def one(i):
+        video_id = 'bench'
+        if cold:
+            # A distinct id per request keeps concurrent cold requests cold
+            video_id = f'bench-{i}'
+        client = app_module.app.test_client()
+        start = time.perf_counter()
+        _route_request(client, route, video_id, questions[i])
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(requests_count)))
+    wall = time.perf_counter() - wall_start
+    app_module.CACHE.clear()
+    app_module.store.clear()
+    return summarize(samples, wall)
+
+
+def load_app(base_url, transcript):
+    """
+    Imports app.py wired to the mock LLM and a synthetic transcript source.
+    A shared artifact store outside the temp directory is swapped for a
+    temporary one, since benchmarks clear it between runs.
+    """
+    from artifact_store import is_temporary
+
+    os.environ['OLLAMA_BASE_URL'] = base_url
+    shared = os.environ.get('ARTIFACT_STORE_PATH')
+    if shared and not is_temporary(shared):
+        os.environ['ARTIFACT_STORE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='vistify-bench-'), 'artifacts.db')
+    os.environ.setdefault('OLLAMA_API_KEY', 'benchmark')
+    import app as app_module
+    import metrics
+
+    app_module.OLLAMA_BASE_URL = base_url
+    if not app_module.OLLAMA_API_KEY:
+        app_module.OLLAMA_API_KEY = 'benchmark'
+    app_module.get_transcript = metrics.timed('transcript_fetch')(lambda video_id: transcript)
+    return app_module
+
+
+def run(lines_list, repeat, route_requests, concurrency, llm_latency, seed=0):
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'llm_latency': llm_latency,
+            'seed': seed,
+        },
+        'benchmarks': {},
+    }
+    bench = results['benchmarks']
+
+    with MockOllamaServer(latency=llm_latency, seed=seed) as server:
+        for n_lines in lines_list:
+            transcript = make_transcript(n_lines, seed)
+            app_module = load_app(server.base_url, transcript)
+            print(f"--- {n_lines} caption lines ---")
+
+            bench[f'create_rag_index/{n_lines}'] = bench_create_rag_index(app_module, transcript, repeat)
+            bench[f'retrieve_context/{n_lines}'] = bench_retrieve_context(app_module, transcript, repeat * 10)
+            bench[f'process_transcript/{n_lines}'] = bench_process_transcript(transcript, max(1, repeat // 5))
+            bench[f'memory/{n_lines}'] = bench_memory(transcript)
+            bench[f'prompt_compression/{n_lines}'] = bench_prompt_compression(app_module, transcript, repeat)
+            bench[f'snapshot/{n_lines}'] = bench_snapshot(app_module, transcript, max(1, repeat // 2))
+            bench[f'cache_tiers/{n_lines}'] = bench_cache_tiers(app_module, transcript, max(1, repeat // 2))
+
+            for route in ('summary', 'ask', 'insights', 'entities'):
+                for cold in (True, False):
+                    key = f"route_{route}_{'cold' if cold else 'warm'}/{n_lines}"
+                    bench[key] = bench_route(app_module, transcript, route, route_requests, concurrency, cold)
+
+            for key in sorted(k for k in bench if k.endswith(f'/{n_lines}')):
+                print(f"{key:40s} {bench[key]}")
+
+    return results
+
+
+def check_thresholds(results, thresholds):
+    """
+    Compares results against {benchmark: {metric: max_value}}.
+    Returns a list of human-readable failures.
+    """
+    failures = []
+    for name, limits in thresholds.items():
+        if name.startswith('_'):
+            continue
+        measured = results['benchmarks'].get(name)
+        if measured is None or 'skipped' in measured:
+            continue
+        for metric, limit in limits.items():
+            value = measured.get(metric)
+            if value is not None and value > limit:
+                failures.append(f"{name}.{metric} = {value} exceeds {limit}")
+    return failures
+
+
+def compare_baseline(results, baseline, tolerance):
+    """Flags p50/p99 regressions larger than tolerance relative to a previous run."""
+    failures = []
+    for name, measured in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or 'skipped' in measured or 'skipped' in previous:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if previous.get(metric) and measured[metric] > previous[metric] * (1 + tolerance):
+                failures.append(f"{name}.{metric} = {measured[metric]} vs baseline {previous[metric]}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vistify offline benchmark suite")
+    parser.add_argument('--lines', default='500,2000,8000', help="Comma-separated transcript lengths (caption lines)")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--route-requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--llm-latency', default='fixed:0', help="Mock LLM latency, see mock_ollama.latency_sampler")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--thresholds', help="JSON file of absolute limits to gate on")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative regression vs baseline")
+    args = parser.parse_args()
+
+    lines_list = [int(x) for x in args.lines.split(',') if x]
+    results = run(lines_list, args.repeat, args.route_requests, args.concurrency, args.llm_latency, args.seed)
+
+    failures = []
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            failures += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare_baseline(results, json.load(f), args.tolerance)
+    results['regressions'] = failures
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if failures:
+        print("REGRESSIONS:")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
@@ -0,0 +1,193 @@
+"""
+Local chapter generation: TextTiling over the RAG index.
+
+At every gap between two chunks, the summed TF-IDF rows of the CHAPTER_WINDOW
+chunks before it are compared with those of the chunks after it. A topic
+shift shows up as a dip in that similarity. A gap's depth is how far it sits
+below the highest similarity within CHAPTER_WINDOW gaps on either side. The
+deepest local dips become chapter boundaries, at least CHAPTER_MIN_SECONDS
+apart. There is at most one chapter per CHAPTER_TARGET_SECONDS of video, and
+at most CHAPTERS_MAX chapters. The window sums are products of a sparse band
+matrix with the existing chunk matrix, so a four-hour transcript takes under
+150 ms.
+
+Each chapter is labeled with the terms that weigh most in it compared with
+the rest of the video. /api/chapters can ask the LLM to turn these labels
+into short titles.
+"""
+
+import os
+from typing import Dict, List
+
+import numpy as np
+
+WINDOW = int(os.environ.get("CHAPTER_WINDOW", 6))
+MIN_SECONDS = float(os.environ.get("CHAPTER_MIN_SECONDS", 90))
+TARGET_SECONDS = float(os.environ.get("CHAPTER_TARGET_SECONDS", 300))
+MAX_CHAPTERS = int(os.environ.get("CHAPTERS_MAX", 20))
+LABEL_TERMS = 3
+# Peaks must be this many standard deviations deeper than the mean gap
+CUTOFF_STDS = 0.0
+
+
+def band(lo, hi, n):
+    """Sparse (len(lo), n) matrix of ones in columns lo[i]..hi[i]-1 of row i, clipped to 0..n."""
+    from scipy import sparse
+
+    lo = np.clip(lo, 0, n)
+    hi = np.clip(hi, 0, n)
+    lengths = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cols = np.repeat(lo, lengths) + offsets
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(lo), n))
+
+
+def _row_dots(a, b) -> np.ndarray:
+    return np.asarray(a.multiply(b).sum(axis=1)).ravel()
+
+
+def gap_similarities(matrix, window=WINDOW) -> np.ndarray:
+    """Cosine similarity across each gap; entry g is the gap between chunks g and g + 1."""
+    n = matrix.shape[0]
+    gaps = np.arange(1, n)
+    left = band(gaps - window, gaps, n) @ matrix
+    right = band(gaps, gaps + window, n) @ matrix
+    norms = np.sqrt(_row_dots(left, left) * _row_dots(right, right))
+    dots = _row_dots(left, right)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def depth_scores(similarities, window=WINDOW) -> np.ndarray:
+    """How far each gap dips below the highest similarity within `window` gaps on each side."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    # Light smoothing, as in TextTiling
+    if len(similarities) >= 3:
+        padded = np.pad(similarities, 1, mode='edge')
+        similarities = (padded[:-2] + padded[1:-1] + padded[2:]) / 3
+    padded = np.pad(similarities, window, mode='constant', constant_values=-np.inf)
+    windows = sliding_window_view(padded, window + 1)
+    left_peak = windows[:len(similarities)].max(axis=1)
+    right_peak = windows[window:window + len(similarities)].max(axis=1)
+    return (left_peak - similarities) + (right_peak - similarities)
+
+
+def boundaries(starts, duration, depths, min_seconds=MIN_SECONDS,
+               target_seconds=TARGET_SECONDS, max_chapters=MAX_CHAPTERS) -> List[int]:
+    """
+    Chunk indices that open a new chapter (after the first). Candidates are
+    the local maxima of the depth scores that are deeper than the mean gap,
+    taken deepest first.
+    """
+    wanted = int(min(max_chapters, round(duration / target_seconds))) - 1
+    if wanted <= 0 or not len(depths):
+        return []
+    padded = np.pad(depths, 1, mode='constant', constant_values=-np.inf)
+    candidates = np.flatnonzero((depths >= padded[:-2]) & (depths >= padded[2:]))
+    # Against all gaps, not just the peaks: with two real shifts the shallower
+    # one is always below the mean of the peaks
+    candidates = candidates[depths[candidates] > depths.mean() + CUTOFF_STDS * depths.std()]
+    # Gap g opens chunk g + 1
+    candidates = candidates[np.argsort(-depths[candidates], kind='stable')] + 1
+
+    chosen_starts = [0.0, duration]
+    chosen = []
+    for k in candidates:
+        start = float(starts[k])
+        if all(abs(start - other) >= min_seconds for other in chosen_starts):
+            chosen.append(int(k))
+            chosen_starts.append(start)
+            if len(chosen) == wanted:
+                break
+    return sorted(chosen)
+
+
+def label_terms(index_data, bounds, n_terms=LABEL_TERMS) -> List[List[str]]:
+    """Top terms of each chapter (chunks bounds[i]..bounds[i + 1]-1) against the whole video."""
+    vectorizer = index_data['vectorizer']
+    matrix = index_data['matrix']
+    if not hasattr(vectorizer, 'get_feature_names_out'):
+        # Hashed features (live streams) cannot be mapped back to terms
+        return _count_terms(index_data, bounds, n_terms)
+
+    bounds = np.asarray(bounds)
+    lengths = np.diff(bounds)
+    sums = band(bounds[:-1], bounds[1:], matrix.shape[0]) @ matrix
+    means = sums.toarray() / lengths[:, None]
+    overall = np.asarray(matrix.mean(axis=0)).ravel()
+    names = vectorizer.get_feature_names_out()
+    return [_pick_terms(names, row - overall, n_terms) for row in means]
+
+
+def _pick_terms(names, weights, n_terms) -> List[str]:
+    """Highest-weighted terms, skipping any that repeat a word already picked."""
+    picked, seen = [], set()
+    for column in np.argsort(-weights)[:n_terms * 10]:
+        if weights[column] <= 0:
+            break
+        term = str(names[column])
+        words = term.split()
+        if seen.intersection(words):
+            continue
+        picked.append(term)
+        seen.update(words)
+        if len(picked) == n_terms:
+            break
+    return picked
+
+
+def _count_terms(index_data, bounds, n_terms) -> List[List[str]]:
+    from collections import Counter
+
+    analyzer = index_data['vectorizer'].build_analyzer()
+    chunks = index_data['chunks']
+    counts = [Counter(term for k in range(lo, hi) for term in analyzer(chunks.text(k)))
+              for lo, hi in zip(bounds[:-1], bounds[1:])]
+    # Terms in fewer chapters are more distinctive
+    spread = Counter(term for c in counts for term in c)
+    result = []
+    for c in counts:
+        names = list(c)
+        weights = np.array([c[t] / spread[t] for t in names], dtype=np.float64)
+        result.append(_pick_terms(names, weights, n_terms) if names else [])
+    return result
+
+
+def title(terms) -> str:
+    return ", ".join(term.title() for term in terms) or "Untitled"
+
+
+def duration(chunks) -> float:
+    transcript = chunks.transcript
+    return float(transcript.starts[-1] + transcript.durations[-1]) if len(transcript) else 0.0
+
+
+def segment_bounds(index_data) -> List[int]:
+    """Chunk indices where chapters start, then the chunk count: [0, ..., n]."""
+    chunks = index_data['chunks']
+    n = len(chunks)
+    cuts = []
+    if n > 2 * WINDOW:
+        depths = depth_scores(gap_similarities(index_data['matrix']))
+        cuts = boundaries(chunks.starts, duration(chunks), depths)
+    return [0] + cuts + [n]
+
+
+def build_chapters(index_data) -> List[Dict]:
+    """
+    Chapters for an indexed video:
+        [{'start': 0.0, 'end': 254.1, 'title': 'Interest Rates, Inflation', 'terms': [...]}, ...]
+    The first chapter starts at 0.
+    """
+    chunks = index_data['chunks']
+    if not len(chunks):
+        return []
+    bounds = segment_bounds(index_data)
+    terms = label_terms(index_data, bounds)
+    starts = [0.0] + [float(chunks.starts[k]) for k in bounds[1:-1]]
+    ends = starts[1:] + [duration(chunks)]
+    return [
+        {'start': start, 'end': end, 'title': title(chapter_terms), 'terms': chapter_terms}
+        for start, end, chapter_terms in zip(starts, ends, terms)
+    ]
@@ -0,0 +1,218 @@
+"""
+Columnar transcript representation.
+
+A transcript is held as one UTF-8 buffer of all caption lines joined by
+single spaces, an int64 byte-offset array, and float32 start/duration arrays,
+instead of one Python dict per caption line. Chunks are index ranges over the
+lines, so chunk text, the full transcript text and any time range are
+memoryview slices of the same buffer.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Default chunk size in characters (reduced from 1000 to 500)
+CHUNK_CHARS = 500
+
+# Bumped whenever the pickled layout changes, so stale shared artifacts are ignored
+FORMAT_VERSION = 2
+
+
+class ColumnarTranscript:
+    """
+    Caption line i occupies buffer[offsets[i]:offsets[i + 1] - 1]; the byte
+    after it is the joining space. Lines i..j-1 joined with spaces are
+    therefore buffer[offsets[i]:offsets[j] - 1], with no copying.
+    Slices share the buffer and arrays of their parent.
+    """
+
+    __slots__ = ('buffer', 'offsets', 'starts', 'durations')
+
+    def __init__(self, buffer, offsets, starts, durations):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.starts = starts
+        self.durations = durations
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> 'ColumnarTranscript':
+        """Builds from get_transcript()-style [{'text', 'start', 'duration'}, ...]."""
+        encoded = []
+        starts = []
+        durations = []
+        for entry in entries:
+            # Edge whitespace carries no meaning and would double up at chunk joins
+            encoded.append(entry['text'].strip().encode('utf-8'))
+            starts.append(entry['start'])
+            durations.append(entry['duration'])
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) + 1 for b in encoded], out=offsets[1:])
+        return cls(
+            b" ".join(encoded),
+            offsets,
+            np.asarray(starts, dtype=np.float32),
+            np.asarray(durations, dtype=np.float32),
+        )
+
+    def to_entries(self) -> List[Dict[str, Any]]:
+        return [
+            {'text': self.line_text(i), 'start': float(self.starts[i]), 'duration': float(self.durations[i])}
+            for i in range(len(self))
+        ]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return {'text': self.line_text(i), 'start': float(self.starts[i]), 'duration': float(self.durations[i])}
+
+    def span_bytes(self, i, j) -> memoryview:
+        """Lines i..j-1 joined by spaces, as a zero-copy view of the buffer."""
+        if j <= i:
+            return memoryview(b"")
+        return memoryview(self.buffer)[int(self.offsets[i]):int(self.offsets[j]) - 1]
+
+    def span_text(self, i, j, limit: Optional[int] = None) -> str:
+        """Lines i..j-1 joined by spaces. limit caps the result in characters."""
+        view = self.span_bytes(i, j)
+        if limit is not None:
+            # A character is at most 4 UTF-8 bytes; a cut mid-character is dropped
+            view = view[:limit * 4]
+            return str(view, 'utf-8', 'ignore')[:limit]
+        return str(view, 'utf-8')
+
+    def line_text(self, i) -> str:
+        return self.span_text(i, i + 1)
+
+    def text(self, limit: Optional[int] = None) -> str:
+        return self.span_text(0, len(self), limit)
+
+    def slice(self, i, j) -> 'ColumnarTranscript':
+        """Lines i..j-1 as a view sharing this transcript's buffer and arrays."""
+        return ColumnarTranscript(self.buffer, self.offsets[i:j + 1], self.starts[i:j], self.durations[i:j])
+
+    def line_at(self, seconds) -> int:
+        """Index of the caption line playing at `seconds` (binary search)."""
+        return max(0, int(np.searchsorted(self.starts, seconds, side='right')) - 1)
+
+    def range_indices(self, start=None, end=None):
+        """(i, j) such that lines i..j-1 overlap [start, end] seconds."""
+        return _overlapping(self.starts, len(self), start, end)
+
+    def char_lengths(self) -> np.ndarray:
+        """Per-line character counts (plus the joining space)."""
+        # buffer is bytes, or a uint8 array when mapped from a snapshot
+        ascii_only = (self.buffer.isascii() if isinstance(self.buffer, bytes)
+                      else not (np.asarray(self.buffer) & 0x80).any())
+        if ascii_only:
+            # Bytes are characters; offsets already include the joining space
+            return np.diff(self.offsets)
+        lengths = np.empty(len(self), dtype=np.int64)
+        view = memoryview(self.buffer)
+        for i in range(len(self)):
+            lengths[i] = len(str(view[int(self.offsets[i]):int(self.offsets[i + 1]) - 1], 'utf-8')) + 1
+        return lengths
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.nbytes + self.starts.nbytes + self.durations.nbytes
+
+
+def _overlapping(starts, n, start, end):
+    """
+    Items are contiguous spans beginning at sorted `starts`, each running
+    until the next one begins. Returns the index range overlapping [start, end].
+    """
+    i = 0 if start is None else max(0, int(np.searchsorted(starts, start, side='right')) - 1)
+    j = n if end is None else int(np.searchsorted(starts, end, side='right'))
+    return i, max(i, j)
+
+
+def as_columnar(transcript) -> Optional[ColumnarTranscript]:
+    """Accepts a ColumnarTranscript or a list of caption dicts (None passes through)."""
+    if transcript is None or isinstance(transcript, ColumnarTranscript):
+        return transcript
+    return ColumnarTranscript.from_entries(transcript)
+
+
+class Chunks:
+    """
+    Retrieval chunks as line-index ranges: chunk k covers lines
+    bounds[k]..bounds[k + 1]-1 and starts at starts[k].
+    Indexing yields {'text', 'start'} dicts built on demand.
+    """
+
+    __slots__ = ('transcript', 'bounds', 'starts')
+
+    def __init__(self, transcript, bounds, starts):
+        self.transcript = transcript
+        self.bounds = bounds
+        self.starts = starts
+
+    @classmethod
+    def build(cls, transcript: ColumnarTranscript, max_chars=CHUNK_CHARS) -> 'Chunks':
+        """
+        Greedy chunking: a chunk closes on the first line that takes it past
+        max_chars characters, matching the original string-concatenation loop.
+        """
+        n = len(transcript)
+        cum = np.zeros(n + 1, dtype=np.int64)
+        if n:
+            np.cumsum(transcript.char_lengths(), out=cum[1:])
+
+        bounds = [0]
+        i = 0
+        while i < n:
+            # First j with cum[j] - cum[i] > max_chars, i.e. lines i..j-1 overflow
+            j = int(np.searchsorted(cum, cum[i] + max_chars, side='right'))
+            i = min(j, n)
+            bounds.append(i)
+
+        bounds = np.asarray(bounds, dtype=np.int32)
+        starts = transcript.starts[bounds[:-1]] if n else np.zeros(0, dtype=np.float32)
+        return cls(transcript, bounds, starts)
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def text(self, k) -> str:
+        return self.transcript.span_text(int(self.bounds[k]), int(self.bounds[k + 1])).strip()
+
+    def texts(self) -> List[str]:
+        return [self.text(k) for k in range(len(self))]
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            start, stop, step = k.indices(len(self))
+            if step != 1:
+                raise ValueError("Chunk slices must be contiguous")
+            stop = max(start, stop)
+            return Chunks(self.transcript, self.bounds[start:stop + 1], self.starts[start:stop])
+        if k < 0:
+            k += len(self)
+        return {'text': self.text(k), 'start': float(self.starts[k])}
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def full_text(self, limit: Optional[int] = None) -> str:
+        """All chunk texts joined by spaces, sliced straight from the buffer."""
+        if not len(self):
+            return ""
+        return self.transcript.span_text(int(self.bounds[0]), int(self.bounds[-1]), limit).strip()
+
+    def chunk_at(self, seconds) -> int:
+        """Index of the chunk containing `seconds` (binary search on chunk starts)."""
+        return max(0, int(np.searchsorted(self.starts, seconds, side='right')) - 1)
+
+    def range_indices(self, start=None, end=None):
+        """(i, j) such that chunks i..j-1 overlap [start, end] seconds."""
+        return _overlapping(self.starts, len(self), start, end)
+
+    @property
+    def nbytes(self):
+        return self.bounds.nbytes + self.starts.nbytes
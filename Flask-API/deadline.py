@@ -0,0 +1,154 @@
+"""
+End-to-end request deadlines.
+
+Each request gets a time budget from its X-Request-Timeout header (seconds;
+it can only shorten the route's budget) or the route's default, which stays
+below the frontend's 150s TIMEOUT_SECONDS. The deadline is kept per thread
+for the duration of the request, so the stages under the route (admission
+wait, transcript HTTP calls and retries, artifact-store waits, the LLM call)
+size their timeouts from the time left and give up early instead of
+finishing work nobody is waiting for. Background threads (warmer, prefetch)
+have no deadline and keep their own timeouts.
+
+Routes may catch DeadlineExceeded to return partial results; otherwise
+@route turns it into a 504 naming the stage that ran out of time.
+Override the defaults with DEADLINE_<ROUTE>=seconds.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional
+
+from flask import jsonify, request
+
+import metrics
+
+metrics.register('vistify_deadline_exceeded_total', 'counter',
+                 'Requests that ran out of time, by route and the stage they were in.')
+metrics.register('vistify_deadline_budget_seconds', 'histogram',
+                 'Time budget given to each request.', (1, 5, 10, 20, 30, 60, 90, 120, 150))
+
+HEADER = 'X-Request-Timeout'
+
+# Seconds; the frontend gives up at 150
+DEFAULT_BUDGETS = {
+    'summary': 140.0,
+    'insights': 140.0,
+    'entities': 140.0,
+    'ask': 90.0,
+    'ask_batch': 140.0,
+    'transcript': 30.0,
+    'mentions': 60.0,
+    'chapters': 60.0,
+}
+FALLBACK_BUDGET = 140.0
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def budget(route_name) -> float:
+    return float(os.environ.get(f"DEADLINE_{route_name.upper()}",
+                                DEFAULT_BUDGETS.get(route_name, FALLBACK_BUDGET)))
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current thread's deadline, or None if it has none."""
+    expires = getattr(_local, 'expires', None)
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def check(stage, needed=0.0):
+    """Raises DeadlineExceeded if no more than `needed` seconds are left."""
+    left = remaining()
+    if left is not None and left <= needed:
+        raise DeadlineExceeded(stage)
+
+
+def timeout(stage, default, needed=0.0) -> float:
+    """default capped to the time left. Raises if no more than `needed` seconds are left."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= needed:
+        raise DeadlineExceeded(stage)
+    return min(default, left)
+
+
+@contextmanager
+def scope(seconds):
+    """Runs the block under a deadline `seconds` from now. Nested scopes can only shorten it."""
+    previous = getattr(_local, 'expires', None)
+    expires = time.monotonic() + seconds
+    if previous is not None:
+        expires = min(expires, previous)
+    _local.expires = expires
+    try:
+        yield
+    finally:
+        _local.expires = previous
+
+
+def bind(fn):
+    """Wraps fn to run under the calling thread's deadline, for work handed to a pool."""
+    expires = getattr(_local, 'expires', None)
+    if expires is None:
+        return fn
+
+    @wraps(fn)
+    def bound(*args, **kwargs):
+        previous = getattr(_local, 'expires', None)
+        _local.expires = expires
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.expires = previous
+    return bound
+
+
+def request_budget(route_name) -> float:
+    limit = budget(route_name)
+    try:
+        requested = float(request.headers.get(HEADER, ''))
+    except ValueError:
+        return limit
+    return min(requested, limit) if requested > 0 else limit
+
+
+def record(route_name, stage):
+    metrics.inc('vistify_deadline_exceeded_total', labels={'route': route_name, 'stage': stage})
+    print(f"Deadline exceeded ({route_name}) during {stage}")
+
+
+def route(route_name):
+    """Route decorator; place it directly under @app.route so the budget covers admission too."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            seconds = request_budget(route_name)
+            metrics.observe('vistify_deadline_budget_seconds', seconds, {'route': route_name})
+            with scope(seconds):
+                try:
+                    return view(*args, **kwargs)
+                except DeadlineExceeded as e:
+                    record(route_name, e.stage)
+                    resp = jsonify({
+                        "error": True,
+                        "data": "This is taking longer than expected, please try again in a moment.",
+                        "stage": e.stage,
+                    })
+                    resp.status_code = 504
+                    resp.headers['Cache-Control'] = 'no-store'
+                    return resp
+        return wrapper
+    return decorator
@@ -0,0 +1,90 @@
+"""
+Extractive summaries for when the LLM is slow or unavailable.
+
+TextRank over the RAG index: the graph is the chunks' cosine similarity
+matrix (the TF-IDF rows are L2-normalized, so it is X @ X.T), and each
+chunk's score is its PageRank weight, found by power iteration. Chunks are
+picked round-robin across the video's chapters (see chapters.py), so every
+topic is covered. Each chapter's most central chunk comes first, and
+near-duplicates of picked chunks are skipped. The picks are returned in
+video order. A two-hour transcript takes a few tens of milliseconds.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+import chapters
+from prompt_compression import clean_text
+
+DAMPING = 0.85
+# Chunks this similar to one already picked are skipped
+REDUNDANCY = 0.5
+POINT_CHARS = 240
+
+
+def similarity_graph(matrix):
+    """Chunk-by-chunk cosine similarities without self-loops, as a sparse matrix."""
+    graph = (matrix @ matrix.T).tocsr()
+    graph.setdiag(0)
+    graph.eliminate_zeros()
+    return graph
+
+
+def pagerank(graph, damping=DAMPING, tol=1e-6, max_iter=100) -> np.ndarray:
+    """Stationary weights of a random walk on the weighted graph; chunks with no edges jump anywhere."""
+    n = graph.shape[0]
+    degree = np.asarray(graph.sum(axis=1)).ravel()
+    dangling = degree == 0
+    inverse = np.divide(1.0, degree, out=np.zeros(n), where=~dangling)
+    transposed = graph.T.tocsr()
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = transposed @ (scores * inverse)
+        updated = (1 - damping) / n + damping * (spread + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def select(scores, graph, k, bounds=None, redundancy=REDUNDANCY) -> List[int]:
+    """
+    Up to k chunk indices, in video order. Chunks are taken round-robin
+    across the segments in bounds ([0, ..., n], e.g. chapters), best first
+    within each round, so the summary covers the whole video. Near-duplicates
+    of picked chunks are skipped.
+    """
+    n = len(scores)
+    bounds = np.asarray(bounds if bounds is not None else [0, n])
+    lengths = np.diff(bounds)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    # Each chunk's rank within its segment, then all chunks by (rank, -score)
+    by_segment = np.lexsort((-scores, segment))
+    rank = np.empty(n, dtype=np.int64)
+    rank[by_segment] = np.arange(n) - np.repeat(bounds[:-1], lengths)
+
+    picked = []
+    for idx in np.lexsort((-scores, rank)):
+        if len(picked) == k:
+            break
+        if picked and graph[idx, picked].max() > redundancy:
+            continue
+        picked.append(int(idx))
+    return sorted(picked)
+
+
+def trim(text, limit=POINT_CHARS) -> str:
+    text = clean_text(text)
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + "..."
+
+
+def summarize(index_data, points=10) -> List[Dict]:
+    """The `points` most central chunks, as [{'start', 'text'}] in video order."""
+    chunks = index_data['chunks']
+    if not len(chunks):
+        return []
+    graph = similarity_graph(index_data['matrix'])
+    picked = select(pagerank(graph), graph, points, chapters.segment_bounds(index_data))
+    return [{'start': float(chunks.starts[k]), 'text': trim(chunks.text(k))} for k in picked]
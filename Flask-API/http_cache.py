@@ -0,0 +1,147 @@
+"""
+HTTP-level caching for the artifact GET routes.
+
+Responses from /api/summary, /api/get-insights, /api/extract-entities and
+/api/chapters are a pure function of their cached artifacts, so their ETag
+is a hash of those artifacts. A request whose If-None-Match matches gets a 304 before
+admission, index loading or any LLM call; a CDN or browser that keeps the
+body can revalidate for free. Each route gets its own Cache-Control policy
+(override with CACHE_CONTROL_<ROUTE>), and their large bodies are brotli-
+or gzip-compressed according to Accept-Encoding. Other routes are sent
+uncompressed.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from functools import wraps
+
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+metrics.register('vistify_http_cache_total', 'counter',
+                 'Conditional GET handling by route and result.')
+metrics.register('vistify_compression_bytes_total', 'counter',
+                 'Response bytes before and after compression, by encoding.')
+
+# Outputs only change when the model or prompt changes, so let caches keep
+# them a while and revalidate in the background after that
+DEFAULT_CACHE_CONTROL = {
+    'summary': 'public, max-age=3600, stale-while-revalidate=86400',
+    'insights': 'public, max-age=3600, stale-while-revalidate=86400',
+    'entities': 'public, max-age=3600, stale-while-revalidate=86400',
+    'chapters': 'public, max-age=3600, stale-while-revalidate=86400',
+}
+
+# Bumped when a route's response shape changes, so old ETags stop matching
+ETAG_VERSION = '1'
+
+MIN_COMPRESS_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def cache_control(route_name):
+    return os.environ.get(f"CACHE_CONTROL_{route_name.upper()}", DEFAULT_CACHE_CONTROL.get(route_name, 'no-cache'))
+
+
+def artifact_etag(store, keys):
+    """Hash of the artifacts at keys, or None if any is not cached yet."""
+    digest = hashlib.sha1(ETAG_VERSION.encode('utf-8'))
+    for key in keys:
+        value = store.get(key)
+        if value is None:
+            return None
+        digest.update(key.encode('utf-8'))
+        digest.update(json.dumps(value, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def _set_validators(resp, route_name, etag):
+    # Weak: the gzip, brotli and identity encodings share one validator
+    resp.headers['ETag'] = quote_etag(etag, weak=True)
+    resp.headers['Cache-Control'] = cache_control(route_name)
+    resp.vary.add('Accept-Encoding')
+
+
+def cached(route_name, store, artifact_keys):
+    """
+    Route decorator; place it above @admission.limit so 304s skip the queue.
+    artifact_keys() returns the store keys the response is derived from, or
+    None when the request is invalid.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Picked up by compress_response once every other hook has run
+            request.environ['vistify.compress'] = True
+            keys = artifact_keys()
+            if keys and request.if_none_match:
+                etag = artifact_etag(store, keys)
+                if etag is not None and request.if_none_match.contains_weak(etag):
+                    metrics.inc('vistify_http_cache_total', labels={'route': route_name, 'result': 'not_modified'})
+                    resp = Response(status=304)
+                    _set_validators(resp, route_name, etag)
+                    return resp
+
+            resp = view(*args, **kwargs)
+            body = resp.get_json(silent=True) if resp.status_code == 200 else None
+            if keys and body is not None and not body.get('error') and not body.get('degraded'):
+                etag = artifact_etag(store, keys)
+                if etag is not None:
+                    _set_validators(resp, route_name, etag)
+                    metrics.inc('vistify_http_cache_total', labels={'route': route_name, 'result': 'tagged'})
+                    return resp
+            # Errors, partial and degraded results must not be cached
+            resp.headers['Cache-Control'] = 'no-store'
+            metrics.inc('vistify_http_cache_total', labels={'route': route_name, 'result': 'untagged'})
+            return resp
+        return wrapper
+    return decorator
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compresses large uncompressed bodies of @cached routes."""
+    if (not request.environ.get('vistify.compress') or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.status_code < 200
+            or response.status_code in (204, 304)):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+    encoding = _pick_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    metrics.inc('vistify_compression_bytes_total', len(data), {'encoding': encoding, 'stage': 'in'})
+    metrics.inc('vistify_compression_bytes_total', len(compressed), {'encoding': encoding, 'stage': 'out'})
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
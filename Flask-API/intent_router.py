@@ -0,0 +1,269 @@
+"""
+Local intent classification for /api/ask.
+
+Each question is classified before any retrieval or LLM work and routed to
+the cheapest path that can answer it:
+
+    greeting          canned reply; no index needed
+    acknowledgement   canned reply to thanks, "ok", "got it", ...
+    overview          the cached "what is this video about" artifact
+    timestamp         the best-matching chunks' start times, from the TF-IDF index
+    entity            the entity mention index (see /api/mentions)
+    question          full RAG
+
+The classifier is a linear model over word unigrams, bigrams, prefixes and
+first/last word features. It is trained offline from intent_samples.json with
+
+    python intent_router.py --train
+
+and shipped as intent_model.json (weights only, no sklearn at request time),
+so scoring a question takes tens of microseconds. A prediction below
+INTENT_MIN_CONFIDENCE (or the higher bar in INTENT_CONFIDENCE for overview
+and canned replies) falls back to 'question', which can answer anything.
+Canned replies also need the whole question to be short small talk.
+INTENT_MODEL points at another model file; INTENT_ROUTER=rules uses the old
+fixed phrase lists instead. Routing decisions are counted in
+vistify_ask_route_total by intent and the path that answered.
+"""
+
+import json
+import math
+import os
+import re
+from typing import Dict, List, Tuple
+
+import metrics
+
+metrics.register('vistify_ask_route_total', 'counter',
+                 'Questions by classified intent and the path that answered them.')
+metrics.register('vistify_intent_confidence', 'histogram',
+                 'Classifier confidence in the chosen intent.', (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES_PATH = os.path.join(HERE, 'intent_samples.json')
+MODEL_PATH = os.environ.get("INTENT_MODEL", os.path.join(HERE, 'intent_model.json'))
+MIN_CONFIDENCE = float(os.environ.get("INTENT_MIN_CONFIDENCE", 0.6))
+
+INTENTS = ('greeting', 'acknowledgement', 'overview', 'timestamp', 'entity', 'question')
+FALLBACK = 'question'
+# Intents answered without looking at the video; a wrong guess costs the user an answer
+CANNED_INTENTS = ('greeting', 'acknowledgement')
+# Confidence these intents need on top of MIN_CONFIDENCE
+INTENT_CONFIDENCE = {'overview': 0.85, 'greeting': 0.8, 'acknowledgement': 0.8}
+# Canned intents only for utterances this short, made of words from their samples
+SMALL_TALK_MAX_WORDS = 6
+
+_WORD = re.compile(r"[a-z0-9]+(?:['&.-][a-z0-9]+)*")
+
+# Words that say what kind of answer is wanted, not what it is about
+CUE_WORDS = {
+    'when', 'where', 'what', 'which', 'time', 'times', 'timestamp', 'timestamps', 'minute', 'point',
+    'part', 'parts', 'section', 'video', 'mention', 'mentions', 'mentioned', 'mentioning',
+    'talk', 'talks', 'talking', 'discuss', 'discusses', 'discussed', 'reference', 'references',
+    'referenced', 'say', 'says', 'said', 'come', 'comes', 'brought', 'find', 'show', 'list',
+    'jump', 'skip', 'many', 'often', 'every', 'each', 'all', 'any', 'anywhere', 'at',
+}
+STOP_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'do', 'does', 'did', 'he', 'she', 'they',
+    'it', 'i', 'you', 'we', 'me', 'him', 'her', 'them', 'of', 'to', 'in', 'on', 'for', 'about',
+    'into', 'up', 'there', 'this', 'that', 'how', 'anyone', 'someone', 'get', 'start', 'starts',
+    'begin', 'begins', 'give', 'can', 'could', 'please', 'and', 'or', 'by', 'with', 'from',
+}
+
+
+def words(text) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def features(text) -> List[str]:
+    """Binary features of a question: words, word pairs, word prefixes, the first and last word, and a length bucket."""
+    tokens = words(text)
+    if not tokens:
+        return ['#len0']
+    feats = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    # Crude stems, so "mentions" and "mentioned" share evidence
+    feats.extend(f"~{t[:5]}" for t in tokens if len(t) > 5)
+    feats.append(f"^{tokens[0]}")
+    feats.append(f"{tokens[-1]}$")
+    feats.append(f"#len{min(len(tokens), 4)}")
+    return feats
+
+
+class LinearClassifier:
+    """Multinomial logistic regression, applied with dict lookups."""
+
+    def __init__(self, intents, bias, weights: Dict[str, List[float]], small_talk=None):
+        self.intents = list(intents)
+        self.bias = list(bias)
+        self.weights = weights
+        # Every word of the greeting and acknowledgement samples
+        self.small_talk = set(small_talk) if small_talk is not None else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            model = json.load(f)
+        return cls(model['intents'], model['bias'], model['weights'], model.get('small_talk'))
+
+    def save(self, path):
+        model = {'intents': self.intents, 'bias': self.bias, 'weights': self.weights}
+        if self.small_talk is not None:
+            model['small_talk'] = sorted(self.small_talk)
+        with open(path, 'w') as f:
+            json.dump(model, f, separators=(',', ':'), sort_keys=True)
+
+    def classify(self, text) -> Tuple[str, float]:
+        scores = list(self.bias)
+        for feature in set(features(text)):
+            weights = self.weights.get(feature)
+            if weights is not None:
+                for i, weight in enumerate(weights):
+                    scores[i] += weight
+        best = max(range(len(scores)), key=scores.__getitem__)
+        # Softmax probability of the best intent
+        confidence = 1.0 / sum(math.exp(score - scores[best]) for score in scores)
+        return self.intents[best], confidence
+
+
+class RuleClassifier:
+    """The fixed phrase lists /api/ask used before the trained model."""
+
+    GREETINGS = ['hi', 'hello', 'hey']
+    OVERVIEW_PHRASES = ['what is this video', 'what is the video', 'video about', 'topic of']
+
+    def classify(self, text) -> Tuple[str, float]:
+        question_lower = text.lower().strip()
+        if question_lower in self.GREETINGS:
+            return 'greeting', 1.0
+        if any(phrase in question_lower for phrase in self.OVERVIEW_PHRASES):
+            return 'overview', 1.0
+        return FALLBACK, 1.0
+
+
+def load_classifier():
+    if os.environ.get("INTENT_ROUTER") == 'rules':
+        return RuleClassifier()
+    try:
+        return LinearClassifier.load(MODEL_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Intent model unavailable ({e}); using phrase rules")
+        return RuleClassifier()
+
+
+classifier = load_classifier()
+
+
+def is_small_talk(question) -> bool:
+    """Short and made only of words seen in greetings and thanks, so "hello kitty" is not."""
+    tokens = words(question)
+    small_talk = getattr(classifier, 'small_talk', None)
+    if small_talk is None:
+        return True
+    return 0 < len(tokens) <= SMALL_TALK_MAX_WORDS and all(t in small_talk for t in tokens)
+
+
+def classify(question) -> Tuple[str, float]:
+    """
+    (intent, confidence) for a question. Predictions below their intent's
+    confidence, and canned intents for anything but small talk, become
+    'question': RAG can answer a greeting, a canned reply cannot answer a question.
+    """
+    intent, confidence = classifier.classify(question)
+    metrics.observe('vistify_intent_confidence', confidence, {'intent': intent})
+    if confidence < max(MIN_CONFIDENCE, INTENT_CONFIDENCE.get(intent, 0.0)):
+        return FALLBACK, confidence
+    if intent in CANNED_INTENTS and not is_small_talk(question):
+        return FALLBACK, confidence
+    return intent, confidence
+
+
+def record(intent, path):
+    metrics.inc('vistify_ask_route_total', labels={'intent': intent, 'path': path})
+
+
+def topic(question) -> str:
+    """The question without its cue words: what a timestamp lookup should search for."""
+    kept = [w for w in words(question) if w not in CUE_WORDS and w not in STOP_WORDS]
+    return " ".join(kept) or question
+
+
+def entity_candidates(question, max_words=4) -> List[str]:
+    """Word n-grams of the question that could name an entity, longest first."""
+    tokens = words(question)
+    candidates = []
+    for n in range(min(max_words, len(tokens)), 0, -1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if gram[0] in CUE_WORDS or gram[0] in STOP_WORDS or gram[-1] in CUE_WORDS or gram[-1] in STOP_WORDS:
+                continue
+            candidates.append(" ".join(gram))
+    return candidates
+
+
+def match_entities(index, question) -> List[dict]:
+    """
+    Mention-index entries named in the question: the longest exact match,
+    else entities containing a candidate as whole words ("obama" finds
+    "barack obama"), like ner_extractor.find_mentions.
+    """
+    candidates = entity_candidates(question)
+    for candidate in candidates:
+        if candidate in index:
+            return [dict(index[candidate], entity=candidate)]
+    for candidate in candidates:
+        padded = f" {candidate} "
+        matches = [dict(info, entity=name) for name, info in index.items() if padded in f" {name} "]
+        if matches:
+            matches.sort(key=lambda m: m['count'], reverse=True)
+            return matches
+    return []
+
+
+def train(samples_path=SAMPLES_PATH, out_path=MODEL_PATH):
+    """Fits the linear model on the labeled samples and writes its weights."""
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import cross_val_score
+    from sklearn.pipeline import make_pipeline
+
+    with open(samples_path) as f:
+        samples = json.load(f)
+    texts = [text for intent in samples for text in samples[intent]]
+    labels = [intent for intent in samples for _ in samples[intent]]
+
+    def pipeline():
+        return make_pipeline(CountVectorizer(analyzer=features, binary=True),
+                             LogisticRegression(C=10.0, max_iter=2000))
+
+    scores = cross_val_score(pipeline(), texts, labels, cv=5)
+    print(f"Cross-validated accuracy: {scores.mean():.3f} (+/- {scores.std():.3f}) over {len(texts)} samples")
+
+    model = pipeline().fit(texts, labels)
+    vectorizer, regression = model.steps[0][1], model.steps[1][1]
+    weights = {
+        feature: [round(float(w), 4) for w in regression.coef_[:, column]]
+        for feature, column in vectorizer.vocabulary_.items()
+    }
+    bias = [round(float(b), 4) for b in regression.intercept_]
+    small_talk = {w for intent in CANNED_INTENTS for text in samples.get(intent, []) for w in words(text)}
+    LinearClassifier(regression.classes_.tolist(), bias, weights, small_talk).save(out_path)
+    print(f"Wrote {out_path} ({len(weights)} features, intents {regression.classes_.tolist()})")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vistify intent classifier")
+    parser.add_argument('--train', action='store_true', help="Train from --samples and write --out")
+    parser.add_argument('--samples', default=SAMPLES_PATH)
+    parser.add_argument('--out', default=MODEL_PATH)
+    parser.add_argument('questions', nargs='*', help="Questions to classify")
+    args = parser.parse_args()
+
+    if args.train:
+        train(args.samples, args.out)
+        classifier = LinearClassifier.load(args.out)
+    for question in args.questions:
+        predicted, confidence = classifier.classify(question)
+        routed, _ = classify(question)
+        print(f"{predicted:15s} {confidence:.2f}  -> {routed:15s} {question}")
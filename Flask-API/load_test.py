@@ -0,0 +1,245 @@
+"""
+Concurrency load-test harness.
+
+Starts the app under waitress in a child process (synthetic transcripts, LLM
+calls going to mock_ollama.py with a configurable latency distribution) and
+drives the four /api/* routes with open-loop Poisson arrivals. Sweeping the
+waitress thread count and the upstream latency shows where worker threads
+saturate on ollama_generate.
+
+Usage:
+    python load_test.py --rate 20 --duration 30 --threads 4,8,16 \\
+        --llm-latency 'fixed:0.5;lognormal:0,0.7' --mix ask=0.6,summary=0.2,insights=0.1,entities=0.1
+"""
+
+import argparse
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmark import make_questions, make_transcript, summarize
+from mock_ollama import MockOllamaServer
+
+ROUTES = ('ask', 'summary', 'insights', 'entities')
+
+
+class ServiceTimeMiddleware:
+    """Reports time spent inside the Flask app, so clients can derive queueing delay."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+
+        def timed_start_response(status, headers, exc_info=None):
+            headers.append(('X-Service-Time', f"{time.perf_counter() - start:.6f}"))
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, timed_start_response)
+
+
+def serve(port, threads, llm_url, lines):
+    """Child-process entry point: the app on waitress with `threads` workers."""
+    import logging
+    from waitress import serve as waitress_serve
+    from benchmark import load_app
+
+    # Queue depth is what we are measuring; don't log a warning per request
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+
+    app_module = load_app(llm_url, make_transcript(lines))
+    app_module.app.wsgi_app = ServiceTimeMiddleware(app_module.app.wsgi_app)
+    # Trust X-Forwarded-For from the local driver so each simulated user is a distinct client
+    waitress_serve(app_module.app, host='127.0.0.1', port=port, threads=threads,
+                   connection_limit=10000, backlog=4096, _quiet=True,
+                   trusted_proxy='127.0.0.1', trusted_proxy_headers='x-forwarded-for')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(threads, llm_url, lines):
+    port = free_port()
+    proc = subprocess.Popen([
+        sys.executable, __file__, '--serve',
+        '--port', str(port), '--threads', str(threads),
+        '--llm-url', llm_url, '--lines', str(lines),
+    ])
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(base + '/metrics', timeout=1).status_code == 200:
+                return proc, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Server did not start")
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        route, _, weight = part.partition('=')
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route in mix: {route}")
+        mix[route] = float(weight)
+    return mix
+
+
+def send(session, base, route, video_id, question, timeout, client):
+    # Each simulated user gets its own address so per-client admission limits apply per user
+    headers = {'X-Forwarded-For': client}
+    if route == 'ask':
+        return session.post(f"{base}/api/ask", json={'video_id': video_id, 'question': question},
+                            headers=headers, timeout=timeout)
+    if route == 'summary':
+        return session.get(f"{base}/api/summary", params={'v': video_id, 'type': 'short'},
+                           headers=headers, timeout=timeout)
+    if route == 'insights':
+        return session.get(f"{base}/api/get-insights", params={'v': video_id}, headers=headers, timeout=timeout)
+    return session.get(f"{base}/api/extract-entities", params={'v': video_id}, headers=headers, timeout=timeout)
+
+
+def drive(base, rate, duration, mix, videos, questions, timeout, seed=0, users=200, max_clients=512):
+    """
+    Open-loop Poisson arrivals at `rate` req/s for `duration` seconds.
+    Returns (records, wall_seconds) with one record per request; wall time
+    runs until the last response, not just the arrival window.
+    """
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    # Zipf-like popularity over the video pool
+    video_weights = [1.0 / (i + 1) for i in range(videos)]
+    local = threading.local()
+    records = []
+    records_lock = threading.Lock()
+
+    def one(route, video_id, question, client, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        record = {'route': route, 'dispatch_lag': time.perf_counter() - scheduled}
+        start = time.perf_counter()
+        try:
+            resp = send(session, base, route, video_id, question, timeout, client)
+            record['latency'] = time.perf_counter() - start
+            record['status'] = resp.status_code
+            service = resp.headers.get('X-Service-Time')
+            if service is not None:
+                record['queue_delay'] = max(0.0, record['latency'] - float(service))
+            body = resp.json() if resp.headers.get('Content-Type', '').startswith('application/json') else None
+            record['ok'] = resp.status_code == 200 and bool(body) and not body.get('error')
+        except requests.RequestException as e:
+            record['latency'] = time.perf_counter() - start
+            record['status'] = type(e).__name__
+            record['ok'] = False
+        with records_lock:
+            records.append(record)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_clients) as pool:
+        next_at = t0
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at - t0 > duration:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route = rng.choices(routes, weights)[0]
+            video_id = f"load-{rng.choices(range(videos), video_weights)[0]}"
+            user = rng.randrange(users)
+            client = f"10.0.{user // 256}.{user % 256}"
+            pool.submit(one, route, video_id, rng.choice(questions), client, next_at)
+    return records, time.perf_counter() - t0
+
+
+def report(records, wall):
+    ok = [r for r in records if r.get('ok')]
+    result = {
+        'requests': len(records),
+        'succeeded': len(ok),
+        'error_rate': round(1 - len(ok) / len(records), 4) if records else 0.0,
+        'throughput_per_s': round(len(ok) / wall, 2) if wall > 0 else 0.0,
+        'dispatch_lag': summarize([r['dispatch_lag'] for r in records], wall),
+        'latency': summarize([r['latency'] for r in ok], wall),
+        'queue_delay': summarize([r['queue_delay'] for r in ok if 'queue_delay' in r], wall),
+        'errors': {},
+        'routes': {},
+    }
+    for r in records:
+        if not r.get('ok'):
+            key = str(r['status'])
+            result['errors'][key] = result['errors'].get(key, 0) + 1
+    for route in ROUTES:
+        route_ok = [r['latency'] for r in ok if r['route'] == route]
+        if route_ok:
+            result['routes'][route] = summarize(route_ok, wall)
+    return result
+
+
+def run_sweep(args):
+    mix = parse_mix(args.mix)
+    questions = make_questions(make_transcript(args.lines), 200)
+    runs = []
+    for latency in args.llm_latency.split(';'):
+        with MockOllamaServer(latency=latency, seed=args.seed) as llm:
+            for threads in [int(t) for t in args.threads.split(',')]:
+                proc, base = start_server(threads, llm.base_url, args.lines)
+                try:
+                    print(f"--- threads={threads} llm_latency={latency} rate={args.rate}/s ---")
+                    records, wall = drive(base, args.rate, args.duration, mix, args.videos,
+                                          questions, args.timeout, args.seed, args.users)
+                finally:
+                    proc.terminate()
+                    proc.wait()
+                result = report(records, wall)
+                result.update({'threads': threads, 'llm_latency': latency, 'rate': args.rate, 'mix': mix})
+                runs.append(result)
+                print(f"throughput={result['throughput_per_s']}/s errors={result['error_rate']:.1%} "
+                      f"p50={result['latency']['p50_ms']}ms p99={result['latency']['p99_ms']}ms "
+                      f"queue p99={result['queue_delay']['p99_ms']}ms")
+    return runs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vistify concurrency load test")
+    parser.add_argument('--rate', type=float, default=10.0, help="Offered load, requests/second")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load per configuration")
+    parser.add_argument('--threads', default='4,8,16', help="Comma-separated waitress thread counts")
+    parser.add_argument('--llm-latency', default='fixed:0.5',
+                        help="Semicolon-separated mock LLM latency specs, e.g. 'fixed:0.5;lognormal:0,0.7'")
+    parser.add_argument('--mix', default='ask=0.6,summary=0.2,insights=0.1,entities=0.1')
+    parser.add_argument('--videos', type=int, default=20, help="Distinct video ids (Zipf popularity)")
+    parser.add_argument('--users', type=int, default=200, help="Distinct simulated client addresses")
+    parser.add_argument('--lines', type=int, default=2000, help="Caption lines per synthetic transcript")
+    parser.add_argument('--timeout', type=float, default=150.0, help="Client timeout, matches the frontend")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='load_results.json')
+    # Internal: child-process server mode
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--llm-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, int(args.threads), args.llm_url, args.lines)
+        sys.exit(0)
+
+    runs = run_sweep(args)
+    with open(args.out, 'w') as f:
+        json.dump({'runs': runs}, f, indent=2)
+    print(f"Results written to {args.out}")
@@ -0,0 +1,193 @@
+"""
+Lightweight Prometheus-style metrics for the Flask API.
+
+Every thread records into its own shard, so the request path never takes a
+shared lock. Shards are only merged when /metrics is scraped.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds. Covers sub-millisecond retrieval up to the 120s LLM timeout.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+# name -> (type, help, buckets)
+_METRICS: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {}
+# name -> callable returning [(labels dict, value), ...], evaluated per scrape
+_GAUGES: Dict[str, Callable[[], List[Tuple[Dict[str, str], float]]]] = {}
+
+_registry_lock = threading.Lock()
+# (thread, shard) pairs. Shards of finished threads are folded into _retired.
+_shards = []
+_retired: Dict[Tuple[str, tuple], list] = {}
+_local = threading.local()
+
+
+def register(name, kind, help_text, buckets=None):
+    """Declare a metric. kind is 'counter' or 'histogram'."""
+    if kind == 'histogram' and buckets is None:
+        buckets = LATENCY_BUCKETS
+    _METRICS[name] = (kind, help_text, tuple(buckets) if buckets else None)
+
+
+def register_gauge(name, help_text, collect):
+    """
+    Declare a gauge whose current values come from collect(), called at
+    scrape time and returning [(labels dict, value), ...].
+    """
+    _METRICS[name] = ('gauge', help_text, None)
+    _GAUGES[name] = collect
+
+
+register('vistify_stage_seconds', 'histogram',
+         'Time spent in each pipeline stage.')
+register('vistify_llm_tokens', 'histogram',
+         'Tokens per LLM call, as reported by Ollama.', TOKEN_BUCKETS)
+register('vistify_llm_tokens_total', 'counter',
+         'Total tokens processed by the LLM.')
+register('vistify_cache_requests_total', 'counter',
+         'Video index cache lookups by result.')
+register('vistify_ask_batch_questions_total', 'counter',
+         'Questions in /api/ask-batch by how they were answered.')
+register('vistify_summary_degraded_total', 'counter',
+         'Summaries served extractively instead of by the LLM, by reason.')
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = {}
+        with _registry_lock:
+            _shards.append((threading.current_thread(), shard))
+        _local.shard = shard
+    return shard
+
+
+def _key(labels):
+    if not labels:
+        return ()
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, labels=None):
+    """Increment a counter."""
+    shard = _shard()
+    key = (name, _key(labels))
+    cell = shard.get(key)
+    if cell is None:
+        shard[key] = [amount]
+    else:
+        cell[0] += amount
+
+
+def observe(name, value, labels=None):
+    """Record a value into a histogram."""
+    buckets = _METRICS[name][2]
+    shard = _shard()
+    key = (name, _key(labels))
+    cell = shard.get(key)
+    if cell is None:
+        # [per-bucket counts (+Inf last), sum, count]
+        cell = [[0] * (len(buckets) + 1), 0.0, 0]
+        shard[key] = cell
+    cell[0][bisect.bisect_left(buckets, value)] += 1
+    cell[1] += value
+    cell[2] += 1
+
+
+@contextmanager
+def timed(stage):
+    """Time a block and record it under vistify_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('vistify_stage_seconds', time.perf_counter() - start, {'stage': stage})
+
+
+def _merge_into(target, shard):
+    for key, cell in shard.items():
+        existing = target.get(key)
+        if len(cell) == 1:
+            if existing is None:
+                target[key] = [cell[0]]
+            else:
+                existing[0] += cell[0]
+        else:
+            if existing is None:
+                target[key] = [list(cell[0]), cell[1], cell[2]]
+            else:
+                existing[0] = [a + b for a, b in zip(existing[0], cell[0])]
+                existing[1] += cell[1]
+                existing[2] += cell[2]
+
+
+def snapshot():
+    """Merge all shards into {(name, labels): cell}."""
+    merged = {}
+    with _registry_lock:
+        alive = []
+        for thread, shard in _shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge_into(_retired, shard.copy())
+        _shards[:] = alive
+        _merge_into(merged, _retired)
+        shards = [shard for _, shard in alive]
+    for shard in shards:
+        # dict.copy() is atomic under the GIL, so the owner may keep writing.
+        _merge_into(merged, shard.copy())
+    return merged
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ''
+    body = ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in items)
+    return '{' + body + '}'
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+    merged = snapshot()
+    by_name = {}
+    for (name, labels), cell in merged.items():
+        by_name.setdefault(name, []).append((labels, cell))
+
+    lines = []
+    for name, (kind, help_text, buckets) in _METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'gauge':
+            for labels, value in _GAUGES[name]():
+                lines.append(f"{name}{_format_labels(_key(labels))} {_format_number(value)}")
+            continue
+        for labels, cell in sorted(by_name.get(name, [])):
+            if kind == 'counter':
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(cell[0])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), cell[0]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_number(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(cell[1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cell[2]}")
+    return "\n".join(lines) + "\n"
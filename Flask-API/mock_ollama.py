@@ -0,0 +1,180 @@
+"""
+Local stand-in for the Ollama Cloud /api/generate endpoint.
+
+Used by benchmark.py and load_test.py so the app can be exercised without an
+API key or network access. Latency is drawn from a configurable distribution.
+
+Usage:
+    python mock_ollama.py --port 11434 --latency lognormal:0.0,0.5
+    OLLAMA_BASE_URL=http://127.0.0.1:11434/api python run_production.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def latency_sampler(spec, seed=None):
+    """
+    Parses a latency spec into a zero-argument callable returning seconds.
+      fixed:S            always S
+      uniform:A,B        uniform between A and B
+      exp:MEAN           exponential with the given mean
+      lognormal:MU,SIGMA exp(N(MU, SIGMA)), i.e. a median of e^MU seconds
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    kind, _, args = (spec or 'fixed:0').partition(':')
+    params = [float(x) for x in args.split(',') if x]
+
+    if kind == 'fixed':
+        value = params[0] if params else 0.0
+        return lambda: value
+    if kind == 'uniform':
+        low, high = params
+        draw = lambda: rng.uniform(low, high)
+    elif kind == 'exp':
+        mean = params[0]
+        draw = lambda: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    elif kind == 'lognormal':
+        mu, sigma = params
+        draw = lambda: math.exp(rng.gauss(mu, sigma))
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample():
+        # random.Random is not safe to share between handler threads
+        with lock:
+            return draw()
+    return sample
+
+
+def fake_completion(prompt, format=None):
+    """Returns a deterministic response body shaped like the real one."""
+    if isinstance(format, dict) and 'answers' in format.get('properties', {}):
+        # Packed /api/ask-batch prompt: one answer per numbered question
+        block = prompt.split("QUESTIONS:", 1)[-1].split("\n\n", 1)[0]
+        questions = [line for line in block.strip().splitlines() if line.strip()]
+        return json.dumps({"answers": [{"id": i, "answer": f"Answer to {q.split('. ', 1)[-1]}"}
+                                       for i, q in enumerate(questions, 1)]})
+    if isinstance(format, dict) and 'titles' in format.get('properties', {}):
+        # /api/chapters?titles=llm: one title per numbered chapter
+        block = prompt.split("CHAPTERS:", 1)[-1].split("\n\nINSTRUCTIONS", 1)[0]
+        count = sum(1 for line in block.splitlines() if line[:1].isdigit())
+        return json.dumps({"titles": [f"Chapter {i}" for i in range(1, count + 1)]})
+    if format is not None:
+        return json.dumps({
+            "key_facts": {"people_mentioned": 0, "organizations": 0, "locations": 0,
+                          "dates_mentioned": 0, "top_people": [], "top_organizations": [],
+                          "top_locations": []},
+            "entities": {},
+            "timeline": [],
+            "relationships": [],
+        })
+    words = prompt.split()[-200:]
+    points = [f"{i + 1}. " + " ".join(words[i * 12:(i + 1) * 12]) for i in range(10)]
+    return "\n".join(points)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/api/generate':
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        prompt = payload.get('prompt', '')
+
+        server = self.server
+        delay = server.latency()
+        if delay > 0:
+            time.sleep(delay)
+
+        with server.stats_lock:
+            server.requests_served += 1
+            fail = server.error_rate and server.rng.random() < server.error_rate
+
+        if fail:
+            self.send_error(503, "Mock overload")
+            return
+
+        text = fake_completion(prompt, payload.get('format'))
+        body = json.dumps({
+            "model": payload.get('model'),
+            "response": text,
+            "done": True,
+            # Rough 4-characters-per-token estimate
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "eval_count": max(1, len(text) // 4),
+            "total_duration": int(delay * 1e9),
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockOllamaServer:
+    """Threaded mock server. Use as a context manager or call start()/stop()."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0', error_rate=0.0, seed=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency_sampler(latency, seed) if isinstance(latency, str) else latency
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.stats_lock = threading.Lock()
+        self.httpd.requests_served = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    @property
+    def requests_served(self):
+        return self.httpd.requests_served
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mock Ollama /api/generate server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', default='fixed:0', help="e.g. fixed:0.5, uniform:0.1,2, exp:1, lognormal:0,0.5")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.latency, args.error_rate)
+    print(f"Mock Ollama listening on {server.base_url} (latency={args.latency})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
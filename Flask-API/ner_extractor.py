@@ -287,6 +287,60 @@ def extract_relationships(transcript: str, entities: Dict[str, List[Dict[str, An
     
     return unique_relationships[:20]  # Limit to top 20
 
+def normalize_entity(text: str) -> str:
+    """Lowercased, whitespace-collapsed entity text; the key of the mention index."""
+    return " ".join(text.lower().split()).strip(" .,!?;:\"'")
+
+def build_mention_index(chunk_texts: List[str], chunk_starts: List[float]) -> Dict[str, Dict[str, Any]]:
+    """
+    Maps each normalized entity to the chunks that mention it:
+        {'obama': {'text': 'Obama', 'label': 'PERSON', 'count': 3, 'times': [12.0, 754.5]}}
+    chunk_texts/chunk_starts are the RAG index's chunks and their start
+    times. Labels follow ENTITY_CORRECTIONS; IGNORE_LIST entries and very
+    short entities are skipped.
+    """
+    nlp = load_ner_model()
+    nlp.max_length = 2000000
+    # Only the recognizer is needed; skipping the parser and tagger makes this several times faster
+    disabled = [name for name in nlp.pipe_names if name not in ('tok2vec', 'ner')]
+
+    surface = defaultdict(Counter)
+    labels = defaultdict(Counter)
+    times = defaultdict(set)
+    for doc, start in zip(nlp.pipe(chunk_texts, disable=disabled, batch_size=64), chunk_starts):
+        for ent in doc.ents:
+            key = normalize_entity(ent.text)
+            if len(key) <= 2 or key in IGNORE_LIST:
+                continue
+            surface[key][ent.text.strip()] += 1
+            labels[key][ENTITY_CORRECTIONS.get(key, ent.label_)] += 1
+            times[key].add(round(float(start), 2))
+
+    return {
+        key: {
+            'text': surface[key].most_common(1)[0][0],
+            'label': labels[key].most_common(1)[0][0],
+            'count': sum(surface[key].values()),
+            'times': sorted(times[key]),
+        }
+        for key in times
+    }
+
+def find_mentions(index: Dict[str, Dict[str, Any]], entity: str) -> List[Dict[str, Any]]:
+    """
+    Index entries for an entity: the exact normalized match if there is one,
+    else every entity containing it as whole words ("obama" finds "barack obama").
+    """
+    key = normalize_entity(entity)
+    if not key:
+        return []
+    if key in index:
+        return [dict(index[key], entity=key)]
+    padded = f" {key} "
+    matches = [dict(info, entity=name) for name, info in index.items() if padded in f" {name} "]
+    matches.sort(key=lambda m: m['count'], reverse=True)
+    return matches
+
 def process_transcript(transcript: str) -> Dict[str, Any]:
     """
     Main function to process transcript and extract all NER information.
@@ -0,0 +1,91 @@
+"""
+Multi-video (playlist) question answering helpers.
+
+Playlist ids are resolved to video ids with the YouTube Data API
+(YOUTUBE_API_KEY), cached for PLAYLIST_TTL seconds. Each video's chunks are
+scored by its own TF-IDF index, so raw cosines are not comparable across
+videos: a query that shares one word with a video's vocabulary normalizes to
+the same length as one that shares all of them. calibrated_score() weights
+the cosine by the fraction of the query's terms the video knows. The
+per-video top-k lists are then merged with a heap.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import List, Optional
+
+import requests
+
+import deadline
+
+PLAYLIST_API_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
+MAX_VIDEOS = int(os.environ.get("PLAYLIST_MAX_VIDEOS", 50))
+TTL = float(os.environ.get("PLAYLIST_TTL", 600))
+
+_lock = threading.Lock()
+# playlist_id -> (video_ids, expires)
+_playlists = {}
+
+
+class PlaylistError(Exception):
+    pass
+
+
+def query_coverage(vectorizer, query) -> float:
+    """Fraction of the query's analyzed terms (unigrams and bigrams) in the video's vocabulary."""
+    terms = vectorizer.build_analyzer()(query)
+    if not terms:
+        return 0.0
+    vocabulary = vectorizer.vocabulary_
+    return sum(1 for term in terms if term in vocabulary) / len(terms)
+
+
+def calibrated_score(similarity, coverage) -> float:
+    return float(similarity) * coverage
+
+
+def merge_top_k(per_video, k) -> List[dict]:
+    """
+    k best hits across videos. per_video holds one list of hits per video,
+    each sorted by descending 'score'; merged lazily with a heap.
+    """
+    merged = heapq.merge(*per_video, key=lambda hit: -hit['score'])
+    return list(itertools.islice(merged, k))
+
+
+def resolve(playlist_id) -> List[str]:
+    """Video ids of a playlist, in playlist order (at most PLAYLIST_MAX_VIDEOS)."""
+    with _lock:
+        cached = _playlists.get(playlist_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+    api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not api_key:
+        raise PlaylistError("Playlist lookup needs YOUTUBE_API_KEY; pass video_ids instead.")
+
+    video_ids = []
+    page_token: Optional[str] = None
+    while len(video_ids) < MAX_VIDEOS:
+        params = {'part': 'contentDetails', 'maxResults': 50, 'playlistId': playlist_id, 'key': api_key}
+        if page_token:
+            params['pageToken'] = page_token
+        resp = requests.get(PLAYLIST_API_URL, params=params, timeout=deadline.timeout('playlist', 10.0))
+        if resp.status_code == 404:
+            raise PlaylistError("Playlist not found.")
+        resp.raise_for_status()
+        data = resp.json()
+        video_ids.extend(item['contentDetails']['videoId'] for item in data.get('items', []))
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            break
+
+    video_ids = list(dict.fromkeys(video_ids))[:MAX_VIDEOS]
+    with _lock:
+        if len(_playlists) >= 1024:
+            _playlists.clear()
+        _playlists[playlist_id] = (video_ids, time.monotonic() + TTL)
+    return video_ids
@@ -0,0 +1,154 @@
+"""
+Predictive prefetch of sibling artifacts.
+
+The frontend follows a summary with insights and usually entities for the
+same video. When a trigger artifact is requested, the rules (PREFETCH_RULES,
+e.g. "summary=insights,entities") schedule the likely next artifacts on a
+small background pool (PREFETCH_CONCURRENCY), so they are generated while
+the user is still reading. Later requests find them ready, or join the
+in-flight build through the artifact store's per-key single flight.
+
+Tasks are deduplicated per (video, artifact) and remember which clients
+(browser sessions) want them. A client loading another video, or calling
+POST /api/prefetch/cancel, withdraws its interest; a task nobody wants is
+cancelled if still queued and skips its LLM call if already started.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+metrics.register('vistify_prefetch_total', 'counter',
+                 'Prefetch scheduling and outcomes by artifact and result.')
+
+DEFAULT_RULES = "summary=insights,entities"
+
+
+def parse_rules(spec) -> Dict[str, List[str]]:
+    """"summary=insights,entities;insights=entities" -> {'summary': ['insights', 'entities'], ...}"""
+    rules = {}
+    for rule in spec.split(';'):
+        if '=' not in rule:
+            continue
+        trigger, targets = rule.split('=', 1)
+        rules[trigger.strip()] = [t.strip() for t in targets.split(',') if t.strip()]
+    return rules
+
+
+class _Task:
+    __slots__ = ('future', 'clients', 'cancelled')
+
+    def __init__(self):
+        self.future = None
+        self.clients = set()
+        self.cancelled = threading.Event()
+
+
+class PrefetchEngine:
+    def __init__(self, run: Callable[[str, str, threading.Event], None], rules=None, concurrency=2,
+                 max_pending=32, is_ready: Optional[Callable[[str, str], bool]] = None,
+                 should_skip: Optional[Callable[[], bool]] = None):
+        """
+        run(video_id, artifact, cancelled): builds one artifact, checking
+            cancelled before expensive steps.
+        is_ready(video_id, artifact): True if it is already cached.
+        should_skip(): True while the server is too loaded to prefetch.
+        """
+        self.run = run
+        self.rules = rules if rules is not None else parse_rules(DEFAULT_RULES)
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.is_ready = is_ready
+        self.should_skip = should_skip
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='prefetch') if concurrency else None
+        self._lock = threading.Lock()
+        # (video_id, artifact) -> _Task, while queued or running
+        self._tasks: Dict[tuple, _Task] = {}
+        # client -> video it last touched
+        self._client_video: Dict[str, str] = {}
+
+    def _count(self, artifact, result):
+        metrics.inc('vistify_prefetch_total', labels={'artifact': artifact, 'result': result})
+
+    def touch(self, trigger, video_id, client) -> List[str]:
+        """Called when a trigger artifact is requested. Returns the artifacts scheduled."""
+        if self._pool is None:
+            return []
+        with self._lock:
+            previous = self._client_video.pop(client, None)
+            if len(self._client_video) >= 10000:
+                # Forget the least recently active client
+                del self._client_video[next(iter(self._client_video))]
+            self._client_video[client] = video_id
+        if previous is not None and previous != video_id:
+            # The user moved on; stop work only they wanted
+            self.cancel(previous, client)
+
+        targets = self.rules.get(trigger, [])
+        if not targets or (self.should_skip and self.should_skip()):
+            return []
+
+        scheduled = []
+        for artifact in targets:
+            if self.is_ready and self.is_ready(video_id, artifact):
+                self._count(artifact, 'ready')
+                continue
+            key = (video_id, artifact)
+            with self._lock:
+                task = self._tasks.get(key)
+                if task is not None:
+                    task.clients.add(client)
+                    self._count(artifact, 'deduped')
+                    continue
+                if len(self._tasks) >= self.max_pending:
+                    self._count(artifact, 'dropped')
+                    continue
+                task = self._tasks[key] = _Task()
+                task.clients.add(client)
+                task.future = self._pool.submit(self._execute, key, task)
+            self._count(artifact, 'scheduled')
+            scheduled.append(artifact)
+        return scheduled
+
+    def _execute(self, key, task):
+        video_id, artifact = key
+        try:
+            if task.cancelled.is_set():
+                self._count(artifact, 'cancelled')
+                return
+            with metrics.timed('prefetch'):
+                self.run(video_id, artifact, task.cancelled)
+            self._count(artifact, 'cancelled' if task.cancelled.is_set() else 'done')
+        except Exception as e:
+            print(f"Prefetch Error ({artifact}) for {video_id}: {e}")
+            self._count(artifact, 'error')
+        finally:
+            with self._lock:
+                if self._tasks.get(key) is task:
+                    del self._tasks[key]
+
+    def cancel(self, video_id, client) -> int:
+        """Withdraws a client's interest in a video's prefetches. Returns tasks cancelled."""
+        cancelled = 0
+        with self._lock:
+            if self._client_video.get(client) == video_id:
+                del self._client_video[client]
+            for (vid, artifact), task in list(self._tasks.items()):
+                if vid != video_id or client not in task.clients:
+                    continue
+                task.clients.discard(client)
+                if task.clients:
+                    continue
+                task.cancelled.set()
+                if task.future.cancel():
+                    # Never started, so _execute will not clean up after it
+                    del self._tasks[(vid, artifact)]
+                    self._count(artifact, 'cancelled')
+                cancelled += 1
+        return cancelled
+
+    def pending(self) -> List[tuple]:
+        with self._lock:
+            return list(self._tasks)
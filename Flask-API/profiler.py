@@ -0,0 +1,223 @@
+"""
+On-demand sampling profiler for live requests.
+
+A request is profiled when it carries `X-Profile: <ADMIN_TOKEN>`, or at
+random with probability PROFILE_SAMPLE_RATE. One background thread samples
+the stacks of the threads being profiled every PROFILE_INTERVAL_MS; it sleeps
+when nothing is being profiled, so the cost when disabled is a header check
+per request.
+
+Finished profiles are kept in a ring buffer of the last PROFILE_BUFFER
+requests. /admin/profiles lists them, and /admin/profiles/<id> returns
+collapsed stacks ("frame;frame;frame count" lines), the input format of
+flamegraph.pl and speedscope. `with profiled(label):` profiles any other block
+the same way, e.g. a background index build.
+
+Only the request's own thread is sampled. Work it hands to a pool (the
+summary, playlist and ask-batch pools, prefetch) shows up as the request
+waiting on a future; wrap that work in `profiled()` to see inside it.
+"""
+
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from flask import request
+
+import metrics
+
+metrics.register('vistify_profiles_total', 'counter',
+                 'Profiles captured, by trigger.')
+
+HEADER = 'X-Profile'
+
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER", 50))
+
+
+def admin_token() -> Optional[str]:
+    return os.environ.get("ADMIN_TOKEN") or None
+
+
+def authorized(value) -> bool:
+    """True if value matches ADMIN_TOKEN. Always False while no token is configured."""
+    token = admin_token()
+    return bool(token and value) and hmac.compare_digest(value.encode('utf-8'), token.encode('utf-8'))
+
+
+def collapse(frame) -> str:
+    """A stack as one collapsed-stack line, outermost frame first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """One daemon thread sampling the stacks of registered threads."""
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        # thread ident -> Counter of collapsed stacks
+        self._targets: Dict[int, Counter] = {}
+        self._thread = None
+
+    def add(self, ident) -> Counter:
+        stacks = Counter()
+        with self._cond:
+            self._targets[ident] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return stacks
+
+    def remove(self, ident) -> Counter:
+        """Stops sampling a thread. Returns a copy of its stacks, which no longer change."""
+        with self._cond:
+            stacks = self._targets.pop(ident, None)
+            return Counter(stacks) if stacks is not None else Counter()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._targets:
+                    self._cond.wait()
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            # Collapse outside the lock, count under it, for threads still being sampled
+            samples = [(ident, stacks, collapse(frames[ident])) for ident, stacks in targets if ident in frames]
+            del frames
+            with self._cond:
+                for ident, stacks, stack in samples:
+                    if self._targets.get(ident) is stacks:
+                        stacks[stack] += 1
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """Ring buffer of finished profiles."""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def add(self, profile) -> int:
+        with self._lock:
+            profile['id'] = next(self._ids)
+            self._profiles.append(profile)
+        return profile['id']
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            profiles = list(self._profiles)
+        return [{k: v for k, v in p.items() if k != 'stacks'} for p in reversed(profiles)]
+
+    def get(self, profile_id) -> Optional[dict]:
+        with self._lock:
+            return next((p for p in self._profiles if p['id'] == profile_id), None)
+
+
+sampler = StackSampler()
+profiles = ProfileStore()
+
+
+def render_collapsed(profile) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in profile['stacks'].most_common())
+
+
+class _Active:
+    __slots__ = ('ident', 'started', 'meta')
+
+    def __init__(self, meta):
+        self.ident = threading.get_ident()
+        sampler.add(self.ident)
+        self.started = time.perf_counter()
+        self.meta = meta
+
+
+def start(**meta) -> _Active:
+    """Starts sampling the calling thread."""
+    return _Active(meta)
+
+
+def finish(active, **meta) -> int:
+    """Stops sampling and stores the profile. Returns its id."""
+    stacks = sampler.remove(active.ident)
+    seconds = time.perf_counter() - active.started
+    profile = dict(active.meta, **meta)
+    profile.update({
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': round(seconds, 4),
+        'samples': sum(stacks.values()),
+        'interval_ms': sampler.interval * 1000,
+        'stacks': stacks,
+    })
+    return profiles.add(profile)
+
+
+@contextmanager
+def profiled(label, **meta):
+    active = start(label=label, **meta)
+    try:
+        yield
+    finally:
+        finish(active)
+        metrics.inc('vistify_profiles_total', labels={'trigger': 'block'})
+
+
+def _trigger() -> Optional[str]:
+    value = request.headers.get(HEADER)
+    if value is not None and authorized(value):
+        return 'header'
+    if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+
+def init_app(app, video_id=None):
+    """
+    Registers the request hooks. video_id() may return the request's video,
+    recorded with its profile.
+    """
+    @app.before_request
+    def start_profile():
+        if not SAMPLE_RATE and HEADER not in request.headers:
+            return
+        if request.path == '/metrics' or request.path.startswith('/admin/'):
+            return
+        trigger = _trigger()
+        if trigger is None:
+            return
+        request.environ['vistify.profile'] = start(
+            label=f"{request.method} {request.path}", trigger=trigger,
+            video_id=video_id() if video_id else None,
+        )
+
+    @app.after_request
+    def finish_profile(response):
+        active = request.environ.pop('vistify.profile', None)
+        if active is not None:
+            profile_id = finish(active, status=response.status_code)
+            metrics.inc('vistify_profiles_total', labels={'trigger': active.meta['trigger']})
+            response.headers['X-Profile-Id'] = str(profile_id)
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # after_request does not run when the view raised
+        active = request.environ.pop('vistify.profile', None)
+        if active is not None:
+            finish(active, status=500)
@@ -0,0 +1,167 @@
+"""
+Extractive prompt compression for whole-transcript prompts.
+
+Instead of the first 50,000 raw characters, a prompt gets the chunks that
+best cover the video within the model's token budget. Each chunk's TF-IDF
+row (already L2-normalized in the index) is scored by its similarity to the
+document centroid, and chunks are picked greedily by maximal marginal
+relevance: high centrality, low similarity to what is already selected.
+Selected chunks keep their original order, with "[...]" marking skipped
+stretches, and caption noise such as "[Music]" or "um" is stripped.
+
+Enable per route with PROMPT_COMPRESSION=summary,insights. Budgets come from
+MODEL_TOKEN_BUDGETS or PROMPT_TOKEN_BUDGET.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import metrics
+
+metrics.register('vistify_prompt_chars_total', 'counter',
+                 'Transcript characters placed in prompts, before and after compression.')
+metrics.register('vistify_prompt_compression_ratio', 'histogram',
+                 'Original / compressed transcript length per prompt.', (1, 1.25, 1.5, 2, 3, 4, 6, 8, 12))
+metrics.register('vistify_prompt_compression_saved_seconds_total', 'counter',
+                 'Estimated LLM prefill time saved by prompt compression.')
+
+# Transcript tokens per prompt, leaving room for instructions and the answer
+MODEL_TOKEN_BUDGETS = {
+    'gpt-oss:20b': 6000,
+    'gpt-oss:120b': 8000,
+}
+DEFAULT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4
+
+# Weight of centrality against redundancy in the MMR score
+DIVERSITY = 0.3
+
+_NOISE = re.compile(
+    r"\[(?:music|applause|laughter|inaudible|silence|noise|cheering)\]"
+    r"|\b(?:um+|uh+|erm+|hmm+)\b,?",
+    re.IGNORECASE,
+)
+_REPEATED_WORD = re.compile(r"\b(\w+)(?:\s+\1\b)+", re.IGNORECASE)
+_SPACES = re.compile(r"\s{2,}")
+
+_prefill_lock = threading.Lock()
+# EWMA of seconds of prompt processing per token, from Ollama's own timings
+_prefill_seconds_per_token = None
+
+
+def enabled_routes() -> set:
+    return {r.strip() for r in os.environ.get("PROMPT_COMPRESSION", "").split(',') if r.strip()}
+
+
+def token_budget(model) -> int:
+    if os.environ.get("PROMPT_TOKEN_BUDGET"):
+        return int(os.environ["PROMPT_TOKEN_BUDGET"])
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+def clean_text(text) -> str:
+    """Drops caption sound tags, filler words and stuttered repeats."""
+    text = _NOISE.sub(' ', text)
+    text = _REPEATED_WORD.sub(r'\1', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def record_prefill(prompt_tokens, prompt_seconds):
+    """Feeds the prefill-rate estimate used to report time saved."""
+    global _prefill_seconds_per_token
+    if not prompt_tokens or not prompt_seconds:
+        return
+    rate = prompt_seconds / prompt_tokens
+    with _prefill_lock:
+        if _prefill_seconds_per_token is None:
+            _prefill_seconds_per_token = rate
+        else:
+            _prefill_seconds_per_token += 0.1 * (rate - _prefill_seconds_per_token)
+
+
+def select_chunks(matrix, lengths, budget_chars, diversity=DIVERSITY) -> List[int]:
+    """
+    Greedy MMR selection of chunk indices whose lengths fit budget_chars.
+    matrix rows must be L2-normalized (TfidfVectorizer's default).
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return []
+    centroid = np.asarray(matrix.mean(axis=0)).ravel()
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return []
+    centrality = matrix @ (centroid / norm)
+
+    lengths = np.asarray(lengths)
+    max_sim = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    remaining = budget_chars
+    while True:
+        available &= lengths <= remaining
+        if not available.any():
+            break
+        scores = (1 - diversity) * centrality - diversity * max_sim
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        remaining -= lengths[best] + 1
+        # Similarity of every chunk to the new pick (sparse x dense is far cheaper than sparse x sparse)
+        np.maximum(max_sim, matrix.dot(matrix[best].toarray().ravel()), out=max_sim)
+    return sorted(selected)
+
+
+def compress(index_data, budget_chars) -> Tuple[str, Dict[str, float]]:
+    """
+    Transcript text for a prompt, at most budget_chars long.
+    Returns (text, stats) with original/compressed character counts.
+    """
+    chunks = index_data['chunks']
+    texts = chunks.texts()
+    original_chars = len(chunks.full_text())
+    # Budget on raw lengths; cleaning only shrinks the chunks that are picked
+    lengths = [len(t) for t in texts]
+
+    if sum(lengths) + len(texts) <= budget_chars:
+        picked = list(range(len(texts)))
+    else:
+        # Room for the "[...]" gap markers
+        picked = select_chunks(index_data['matrix'], [n + 6 for n in lengths], budget_chars)
+
+    parts = []
+    previous = -1
+    for idx in picked:
+        if previous >= 0 and idx != previous + 1:
+            parts.append("[...]")
+        cleaned = clean_text(texts[idx])
+        if cleaned:
+            parts.append(cleaned)
+        previous = idx
+    text = " ".join(parts)
+    return text, {'original_chars': original_chars, 'compressed_chars': len(text), 'chunks': len(picked)}
+
+
+def compressed_text(index_data, route, model, limit) -> str:
+    """compress() for a route, recording ratio and estimated LLM time saved."""
+    budget_chars = min(limit, token_budget(model) * CHARS_PER_TOKEN)
+    with metrics.timed('prompt_compression'):
+        text, stats = compress(index_data, budget_chars)
+
+    # What the uncompressed path would have sent
+    baseline = min(stats['original_chars'], limit)
+    metrics.inc('vistify_prompt_chars_total', baseline, {'route': route, 'stage': 'original'})
+    metrics.inc('vistify_prompt_chars_total', len(text), {'route': route, 'stage': 'compressed'})
+    ratio = baseline / len(text) if text else 1.0
+    metrics.observe('vistify_prompt_compression_ratio', ratio, {'route': route})
+
+    rate = _prefill_seconds_per_token
+    if rate is not None:
+        saved = max(0, baseline - len(text)) / CHARS_PER_TOKEN * rate
+        metrics.inc('vistify_prompt_compression_saved_seconds_total', saved, {'route': route})
+    return text
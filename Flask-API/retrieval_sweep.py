@@ -0,0 +1,237 @@
+"""
+Offline retrieval evaluation: sweeps chunker and retriever settings over a
+labeled question set and reports quality against cost for each one.
+
+Dataset (JSON lines), one labeled question per line:
+    {"video_id": "abc123", "question": "how is the model trained?", "start": 754.0, "end": 790.0}
+start/end (seconds) mark where the answer is. A retrieved chunk is relevant
+if its time span overlaps that range.
+
+Transcripts come from --transcripts DIR ({video_id}.json in get_transcript()
+format), falling back to the transcript fetcher. --synthetic N generates a
+self-labeled set instead, for smoke runs without data.
+
+Per configuration it reports recall@k (questions with at least one relevant
+chunk retrieved), MRR, estimated prompt tokens for the retrieved context and
+p50/p99 retrieval latency. Chunking/vectorizer groups run in parallel across
+cores; use --workers 1 for the least noisy latency numbers.
+
+Usage:
+    python retrieval_sweep.py --dataset labels.jsonl --transcripts transcripts/
+    python retrieval_sweep.py --synthetic 200 --chunk-chars 300,500,1000 --top-k 3,5,8
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmark import make_transcript, summarize
+from columnar import Chunks, ColumnarTranscript
+
+# The settings app.py ships with, highlighted in the report
+CURRENT = {'chunk_chars': 500, 'ngram': (1, 2), 'top_k': 5, 'threshold': 0.05}
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (about 4 characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def load_dataset(path):
+    with open(path) as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    for item in items:
+        item['start'] = float(item['start'])
+        item['end'] = float(item.get('end', item['start']))
+    return items
+
+
+def load_transcripts(video_ids, directory=None):
+    transcripts = {}
+    for video_id in sorted(set(video_ids)):
+        path = os.path.join(directory, f"{video_id}.json") if directory else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                transcripts[video_id] = json.load(f)
+            continue
+        from transcript_fetcher import fetcher
+        data = fetcher.fetch(video_id)
+        if data:
+            transcripts[video_id] = data
+        else:
+            print(f"Skipping {video_id}: no transcript")
+    return transcripts
+
+
+def synthetic_dataset(n_questions, n_videos=4, n_lines=1500, seed=0):
+    """Questions built from one caption line each, labeled with that line's time."""
+    rng = random.Random(seed)
+    transcripts, items = {}, []
+    for v in range(n_videos):
+        video_id = f"synthetic-{v}"
+        transcripts[video_id] = make_transcript(n_lines, seed=seed + v)
+    for _ in range(n_questions):
+        video_id = rng.choice(sorted(transcripts))
+        line = rng.choice(transcripts[video_id])
+        words = line['text'].split()
+        picked = rng.sample(words, min(3, len(words)))
+        items.append({
+            'video_id': video_id,
+            'question': "what does the video say about " + " ".join(picked),
+            'start': line['start'],
+            'end': line['start'] + line['duration'],
+        })
+    return transcripts, items
+
+
+def parse_list(value, cast):
+    return [cast(x) for x in value.split(',') if x]
+
+
+def parse_ngram(value):
+    low, high = value.split('-')
+    return int(low), int(high)
+
+
+def evaluate_group(chunk_chars, ngram, transcripts, items, top_ks, thresholds):
+    """
+    Builds one index per video for a chunker/vectorizer setting, scores every
+    question once, then applies each top_k/threshold combination to the scores.
+    """
+    indexes = {}
+    build_seconds = 0.0
+    for video_id, entries in transcripts.items():
+        start = time.perf_counter()
+        transcript = ColumnarTranscript.from_entries(entries)
+        chunks = Chunks.build(transcript, max_chars=chunk_chars)
+        vectorizer = TfidfVectorizer(stop_words='english', ngram_range=ngram)
+        matrix = vectorizer.fit_transform(chunks.texts())
+        build_seconds += time.perf_counter() - start
+        # Chunk k spans [starts[k], starts[k + 1]); the last runs to the end of the video
+        last = transcript.starts[-1] + transcript.durations[-1]
+        ends = np.append(chunks.starts[1:], last)
+        indexes[video_id] = (chunks, vectorizer, matrix, ends)
+
+    per_question = []
+    for item in items:
+        if item['video_id'] not in indexes:
+            continue
+        chunks, vectorizer, matrix, ends = indexes[item['video_id']]
+        # Same scoring as app.retrieve_context
+        start = time.perf_counter()
+        similarities = cosine_similarity(vectorizer.transform([item['question']]), matrix).flatten()
+        order = similarities.argsort()[::-1]
+        elapsed = time.perf_counter() - start
+        relevant = (chunks.starts <= item['end']) & (ends >= item['start'])
+        per_question.append((similarities, order, relevant, chunks, elapsed))
+
+    results = []
+    for top_k, threshold in itertools.product(top_ks, thresholds):
+        hits, reciprocal, tokens = [], [], []
+        for similarities, order, relevant, chunks, _ in per_question:
+            retrieved = [idx for idx in order[:top_k] if similarities[idx] > threshold]
+            rank = next((r for r, idx in enumerate(retrieved, 1) if relevant[idx]), None)
+            hits.append(rank is not None)
+            reciprocal.append(1.0 / rank if rank else 0.0)
+            # The context block exactly as /api/ask assembles it
+            context = "\n\n".join(f"[Time: {int(chunks.starts[idx])}s] {chunks.text(idx)}" for idx in retrieved)
+            tokens.append(estimate_tokens(context))
+        latency = summarize([q[4] for q in per_question])
+        results.append({
+            'chunk_chars': chunk_chars,
+            'ngram': list(ngram),
+            'top_k': top_k,
+            'threshold': threshold,
+            'questions': len(per_question),
+            'recall_at_k': round(float(np.mean(hits)), 4) if hits else 0.0,
+            'mrr': round(float(np.mean(reciprocal)), 4) if reciprocal else 0.0,
+            'prompt_tokens_mean': round(float(np.mean(tokens)), 1) if tokens else 0.0,
+            'retrieval_p50_ms': latency['p50_ms'],
+            'retrieval_p99_ms': latency['p99_ms'],
+            'index_build_ms': round(build_seconds * 1000, 1),
+        })
+    return results
+
+
+def mark_pareto(results):
+    """Flags configurations no other one beats on recall, MRR, tokens and p50 at once."""
+    for r in results:
+        r['pareto'] = not any(
+            o is not r
+            and o['recall_at_k'] >= r['recall_at_k'] and o['mrr'] >= r['mrr']
+            and o['prompt_tokens_mean'] <= r['prompt_tokens_mean']
+            and o['retrieval_p50_ms'] <= r['retrieval_p50_ms']
+            and (o['recall_at_k'], o['mrr'], -o['prompt_tokens_mean'], -o['retrieval_p50_ms'])
+            != (r['recall_at_k'], r['mrr'], -r['prompt_tokens_mean'], -r['retrieval_p50_ms'])
+            for o in results
+        )
+
+
+def sweep(transcripts, items, chunk_chars_list, ngrams, top_ks, thresholds, workers=None):
+    groups = list(itertools.product(chunk_chars_list, ngrams))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(evaluate_group, chunk_chars, ngram, transcripts, items, top_ks, thresholds)
+            for chunk_chars, ngram in groups
+        ]
+        for future in futures:
+            results.extend(future.result())
+    mark_pareto(results)
+    results.sort(key=lambda r: (-r['recall_at_k'], -r['mrr'], r['prompt_tokens_mean']))
+    return results
+
+
+def print_table(results):
+    print(f"{'chars':>6} {'ngram':>6} {'k':>3} {'thresh':>7} {'recall':>7} {'mrr':>6} "
+          f"{'tokens':>7} {'p50ms':>7} {'p99ms':>7}")
+    for r in results:
+        current = (r['chunk_chars'], tuple(r['ngram']), r['top_k'], r['threshold']) == tuple(CURRENT.values())
+        flags = ('*' if r['pareto'] else ' ') + ('<- current' if current else '')
+        print(f"{r['chunk_chars']:>6} {'%d-%d' % tuple(r['ngram']):>6} {r['top_k']:>3} {r['threshold']:>7} "
+              f"{r['recall_at_k']:>7} {r['mrr']:>6} {r['prompt_tokens_mean']:>7} "
+              f"{r['retrieval_p50_ms']:>7} {r['retrieval_p99_ms']:>7} {flags}")
+    print("* = Pareto-optimal (recall, MRR, prompt tokens, p50 latency)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vistify retrieval parameter sweep")
+    parser.add_argument('--dataset', help="Labeled questions (JSON lines)")
+    parser.add_argument('--transcripts', help="Directory of {video_id}.json transcripts")
+    parser.add_argument('--synthetic', type=int, default=0, help="Generate N self-labeled questions instead")
+    parser.add_argument('--chunk-chars', default='250,500,1000')
+    parser.add_argument('--ngrams', default='1-1,1-2', help="Comma-separated ngram ranges, e.g. 1-1,1-2")
+    parser.add_argument('--top-k', default='3,5,8')
+    parser.add_argument('--thresholds', default='0,0.05,0.1')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='sweep_results.json')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        transcripts, items = synthetic_dataset(args.synthetic)
+    elif args.dataset:
+        items = load_dataset(args.dataset)
+        transcripts = load_transcripts([item['video_id'] for item in items], args.transcripts)
+    else:
+        parser.error("--dataset or --synthetic is required")
+
+    results = sweep(
+        transcripts, items,
+        parse_list(args.chunk_chars, int),
+        [parse_ngram(x) for x in args.ngrams.split(',') if x],
+        parse_list(args.top_k, int),
+        parse_list(args.thresholds, float),
+        args.workers,
+    )
+    print_table(results)
+    with open(args.out, 'w') as f:
+        json.dump({'current': dict(CURRENT, ngram=list(CURRENT['ngram'])), 'results': results}, f, indent=2)
+    print(f"Results written to {args.out}")
@@ -1,10 +1,26 @@
 from waitress import serve
-from app import app
+from app import app, preload
 import os
+import threading
 
 if __name__ == "__main__":
     print("----------------------------------------------------------------")
     print("STARTING PRODUCTION SERVER (WAITRESS)")
-    print("Serving on http://0.0.0.0:5000")
+    # Admission control (admission.py) caps the LLM-heavy routes, so extra
+    # threads mostly sit waiting on cheap requests rather than on Ollama.
+    threads = int(os.environ.get("WAITRESS_THREADS", 32))
+    print(f"Serving on http://0.0.0.0:5000 with {threads} threads")
     print("----------------------------------------------------------------")
-    serve(app, host='0.0.0.0', port=5000)
+    # Set TRUSTED_PROXY to the load balancer's address so per-client limits
+    # see the real client address from X-Forwarded-For.
+    proxy_kwargs = {}
+    if os.environ.get("TRUSTED_PROXY"):
+        proxy_kwargs = {
+            "trusted_proxy": os.environ["TRUSTED_PROXY"],
+            "trusted_proxy_headers": "x-forwarded-for",
+        }
+    # Heavy modules are imported lazily for serverless cold starts; a long-running
+    # server loads them in the background instead of on the first request.
+    if os.environ.get("PRELOAD", "1") != "0":
+        threading.Thread(target=preload, name="preload", daemon=True).start()
+    serve(app, host='0.0.0.0', port=5000, threads=threads, **proxy_kwargs)
@@ -0,0 +1,340 @@
+"""
+On-disk index snapshots that load with np.memmap instead of unpickling.
+
+One file per video:
+
+    b"VIDX" | uint32 version | uint32 header length | JSON header | sections
+
+The header lists each section's byte offset, dtype and length. Sections are
+64-byte aligned raw arrays: the columnar transcript (text buffer, offsets,
+starts, durations), chunk bounds and starts, the TF-IDF matrix in CSR form,
+the vocabulary as newline-joined terms ordered by feature index, and the IDF
+weights. Loading maps the file and wraps views of it, so only the vocabulary
+dict is built in Python; everything else is paged in by the OS on demand.
+
+Set SNAPSHOT_DIR to enable. Snapshots are written after an index is built
+and mapped lazily the first time a video is requested after a restart. The
+header records the app's index format (how chunks and the vectorizer were
+built); a snapshot of any other format or version is rejected before it is
+mapped, and deleted. Files unused for SNAPSHOT_MAX_AGE_DAYS (default 30) are
+pruned, then the least recently used ones until the directory fits in
+SNAPSHOT_MAX_MB (default 4096).
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import metrics
+from columnar import FORMAT_VERSION, Chunks, ColumnarTranscript
+
+MAGIC = b"VIDX"
+SNAPSHOT_VERSION = 1
+ALIGN = 64
+
+metrics.register('vistify_snapshot_total', 'counter',
+                 'Index snapshot loads and saves by result.')
+
+# Vectorizer parameters that affect transform(); everything else is fit-only
+_TRANSFORM_PARAMS = ('analyzer', 'binary', 'lowercase', 'ngram_range', 'norm', 'smooth_idf',
+                     'stop_words', 'strip_accents', 'sublinear_tf', 'token_pattern', 'use_idf', 'dtype')
+
+
+_SECTIONS = ('text', 'offsets', 'starts', 'durations', 'chunk_bounds', 'chunk_starts',
+             'csr_data', 'csr_indices', 'csr_indptr', 'vocabulary', 'idf')
+
+
+class SnapshotError(Exception):
+    """Raised for a missing, truncated or incompatible snapshot file."""
+
+
+def _vectorizer_header(vectorizer) -> Dict[str, Any]:
+    params = vectorizer.get_params()
+    if params.get('tokenizer') or params.get('preprocessor') or callable(params.get('analyzer')):
+        raise SnapshotError("Vectorizers with custom callables cannot be snapshotted")
+    header = {k: params[k] for k in _TRANSFORM_PARAMS}
+    header['dtype'] = np.dtype(header['dtype']).name
+    if isinstance(header['stop_words'], (list, tuple, frozenset, set)):
+        header['stop_words'] = sorted(header['stop_words'])
+    return {'kind': 'tfidf', 'params': header}
+
+
+def _vectorizer_from_header(header, vocabulary, idf):
+    if header.get('kind') != 'tfidf':
+        raise SnapshotError(f"Unsupported vectorizer kind: {header.get('kind')}")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    params = dict(header['params'])
+    params['ngram_range'] = tuple(params['ngram_range'])
+    params['dtype'] = np.dtype(params['dtype']).type
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = vocabulary
+    if params['use_idf']:
+        vectorizer.idf_ = idf
+    return vectorizer
+
+
+def save_index(index_data, path, index_format=''):
+    """
+    Writes a create_rag_index() result to path atomically. index_format
+    names how the index was built; load_index() can require it to match.
+    """
+    transcript = index_data['transcript']
+    chunks = index_data['chunks']
+    vectorizer = index_data['vectorizer']
+    matrix = index_data['matrix'].tocsr()
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    if any('\n' in term for term in terms):
+        raise SnapshotError("Vocabulary terms may not contain newlines")
+    idf = getattr(vectorizer, 'idf_', None)
+
+    arrays = {
+        'text': np.frombuffer(bytes(transcript.buffer), dtype=np.uint8),
+        'offsets': np.asarray(transcript.offsets, dtype=np.int64),
+        'starts': np.asarray(transcript.starts, dtype=np.float32),
+        'durations': np.asarray(transcript.durations, dtype=np.float32),
+        'chunk_bounds': np.asarray(chunks.bounds, dtype=np.int32),
+        'chunk_starts': np.asarray(chunks.starts, dtype=np.float32),
+        'csr_data': matrix.data,
+        'csr_indices': matrix.indices,
+        'csr_indptr': matrix.indptr,
+        'vocabulary': np.frombuffer("\n".join(terms).encode('utf-8'), dtype=np.uint8),
+        'idf': np.asarray(idf if idf is not None else [], dtype=np.float64),
+    }
+
+    header = {
+        'columnar_version': FORMAT_VERSION,
+        'index_format': index_format,
+        'vectorizer': _vectorizer_header(vectorizer),
+        'matrix_shape': list(matrix.shape),
+        'sections': {},
+    }
+    # Section offsets depend on the header length, so lay out relative to the
+    # data start and let the loader add it
+    position = 0
+    for name, array in arrays.items():
+        position = -(-position // ALIGN) * ALIGN
+        header['sections'][name] = [position, array.dtype.str, int(array.size)]
+        position += array.nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    preamble = MAGIC + struct.pack('<II', SNAPSHOT_VERSION, len(header_bytes)) + header_bytes
+    data_start = -(-len(preamble) // ALIGN) * ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(preamble)
+            for name, array in arrays.items():
+                f.seek(data_start + header['sections'][name][0])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_index(path, mmap=True, index_format=None) -> Dict[str, Any]:
+    """
+    Loads a snapshot written by save_index() into the create_rag_index() shape.
+    With mmap=True all arrays are read-only views of the mapped file. Raises
+    SnapshotError if index_format is given and differs from the file's, or if
+    the header does not describe the file.
+    """
+    from scipy import sparse
+
+    try:
+        with open(path, 'rb') as f:
+            preamble = f.read(12)
+            if len(preamble) < 12 or preamble[:4] != MAGIC:
+                raise SnapshotError(f"Not an index snapshot: {path}")
+            version, header_len = struct.unpack('<II', preamble[4:])
+            if version != SNAPSHOT_VERSION:
+                raise SnapshotError(f"Snapshot version {version}, expected {SNAPSHOT_VERSION}")
+            header = json.loads(f.read(header_len))
+            size = os.fstat(f.fileno()).st_size
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable snapshot {path}: {e}")
+    if header.get('columnar_version') != FORMAT_VERSION:
+        raise SnapshotError("Snapshot was written for a different transcript layout")
+    if index_format is not None and header.get('index_format') != index_format:
+        raise SnapshotError(f"Snapshot index format {header.get('index_format')!r}, expected {index_format!r}")
+
+    data_start = -(-(12 + header_len) // ALIGN) * ALIGN
+    sections = header.get('sections', {})
+    missing = set(_SECTIONS) - set(sections)
+    if missing:
+        raise SnapshotError(f"Snapshot {path} lacks sections {sorted(missing)}")
+    # Checked before mapping, so a short file never reaches the views
+    for offset, dtype, count in sections.values():
+        if data_start + offset + count * np.dtype(dtype).itemsize > size:
+            raise SnapshotError(f"Truncated snapshot {path}")
+    if mmap:
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        raw = np.fromfile(path, dtype=np.uint8)
+
+    def section(name):
+        offset, dtype, count = sections[name]
+        dtype = np.dtype(dtype)
+        begin = data_start + offset
+        return raw[begin:begin + count * dtype.itemsize].view(dtype)
+
+    transcript = ColumnarTranscript(
+        section('text'), section('offsets'), section('starts'), section('durations'),
+    )
+    chunks = Chunks(transcript, section('chunk_bounds'), section('chunk_starts'))
+    matrix = sparse.csr_matrix(
+        (section('csr_data'), section('csr_indices'), section('csr_indptr')),
+        shape=tuple(header['matrix_shape']), copy=False,
+    )
+    terms = str(memoryview(section('vocabulary')), 'utf-8').split('\n')
+    vocabulary = dict(zip(terms, range(len(terms)))) if terms != [''] else {}
+    vectorizer = _vectorizer_from_header(header['vectorizer'], vocabulary, np.array(section('idf')))
+
+    return {
+        'transcript': transcript,
+        'chunks': chunks,
+        'vectorizer': vectorizer,
+        'matrix': matrix,
+    }
+
+
+class SnapshotStore:
+    """Snapshot files for many videos under one directory."""
+
+    def __init__(self, directory=None, index_format='', max_age=None, max_bytes=None, prune_interval=300.0):
+        """
+        index_format: set by the app; snapshots written with another one are
+            rejected. max_age (seconds since last use) and max_bytes bound
+            the directory; None disables either.
+        """
+        self.directory = directory
+        self.index_format = index_format
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def path(self, video_id):
+        # Video ids are short and URL-safe; anything else is hashed
+        if re.fullmatch(r'[A-Za-z0-9_-]{1,64}', video_id):
+            name = video_id
+        else:
+            name = hashlib.sha1(video_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{name}.v{SNAPSHOT_VERSION}.vidx")
+
+    def __contains__(self, video_id):
+        return self.enabled and os.path.exists(self.path(video_id))
+
+    def load(self, video_id) -> Optional[Dict[str, Any]]:
+        """Maps a video's snapshot, or returns None if there is no usable one."""
+        if not self.enabled:
+            return None
+        path = self.path(video_id)
+        if not os.path.exists(path):
+            metrics.inc('vistify_snapshot_total', labels={'op': 'load', 'result': 'miss'})
+            return None
+        try:
+            with metrics.timed('snapshot_load'):
+                index_data = load_index(path, index_format=self.index_format)
+        except SnapshotError as e:
+            print(f"Snapshot Error for {video_id}: {e}")
+            metrics.inc('vistify_snapshot_total', labels={'op': 'load', 'result': 'error'})
+            # Rebuilt and saved again on this request
+            self._remove(path)
+            return None
+        # The modification time doubles as last use, for pruning
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        metrics.inc('vistify_snapshot_total', labels={'op': 'load', 'result': 'ok'})
+        return index_data
+
+    def save(self, video_id, index_data):
+        if not self.enabled:
+            return
+        try:
+            with metrics.timed('snapshot_save'):
+                save_index(index_data, self.path(video_id), self.index_format)
+        except (OSError, SnapshotError) as e:
+            print(f"Snapshot Error for {video_id}: {e}")
+            metrics.inc('vistify_snapshot_total', labels={'op': 'save', 'result': 'error'})
+            return
+        metrics.inc('vistify_snapshot_total', labels={'op': 'save', 'result': 'ok'})
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Deletes snapshots of other SNAPSHOT_VERSIONs, abandoned temp files,
+        snapshots unused for max_age, then the least recently used ones until
+        the rest fit in max_bytes. Returns the number of files deleted.
+        """
+        self._last_prune = time.monotonic()
+        if not self.enabled:
+            return 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        now = time.time()
+        current = f".v{SNAPSHOT_VERSION}.vidx"
+        kept, removed = [], 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            age = now - stat.st_mtime
+            stale = (
+                (name.endswith('.vidx') and not name.endswith(current))
+                # Left behind by a crash mid-save; a live one is seconds old
+                or (name.endswith('.tmp') and age > 3600)
+                or (name.endswith(current) and self.max_age is not None and age > self.max_age)
+            )
+            if stale:
+                removed += self._remove(path)
+            elif name.endswith(current):
+                kept.append((stat.st_mtime, stat.st_size, path))
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in kept)
+            for _, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+        if removed:
+            metrics.inc('vistify_snapshot_total', removed, {'op': 'prune', 'result': 'ok'})
+        return removed
+
+    def _remove(self, path) -> int:
+        # Processes that already mapped the file keep their mapping
+        try:
+            os.unlink(path)
+            return 1
+        except OSError:
+            return 0
+
+
+snapshots = SnapshotStore(
+    os.environ.get("SNAPSHOT_DIR"),
+    max_age=float(os.environ.get("SNAPSHOT_MAX_AGE_DAYS", 30)) * 86400 or None,
+    max_bytes=int(float(os.environ.get("SNAPSHOT_MAX_MB", 4096)) * 1024 * 1024) or None,
+)
@@ -0,0 +1,139 @@
+"""
+Cold-start benchmark for serverless deploys.
+
+Each run starts a fresh interpreter and records how long `import app` takes,
+then the first cheap request (/metrics), then the first request that builds
+an index (/api/ask, against mock_ollama.py and a synthetic transcript, so
+it includes the deferred sklearn import). It also prints an import-time
+profile of app's direct imports.
+
+Usage:
+    python startup_benchmark.py --runs 5 --thresholds bench_thresholds.json
+Exits 1 if a startup/* limit in the thresholds file is exceeded.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmark import check_thresholds, summarize
+from mock_ollama import MockOllamaServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+from benchmark import load_app, make_transcript
+app_module = load_app(sys.argv[1], make_transcript(int(sys.argv[2])))
+client = app_module.app.test_client()
+t2 = time.perf_counter()
+client.get('/metrics')
+t3 = time.perf_counter()
+resp = client.post('/api/ask', json={'video_id': 'cold', 'question': 'what does the video say about this'})
+t4 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(json.dumps({'import_app': t1 - t0, 'first_request': t3 - t2, 'first_ask': t4 - t3}))
+"""
+
+
+def _child_env(base_url):
+    env = dict(os.environ)
+    env['OLLAMA_BASE_URL'] = base_url
+    env.setdefault('OLLAMA_API_KEY', 'benchmark')
+    # Keep background threads out of the measurement
+    env['WARM_TOP_N'] = '0'
+    return env
+
+
+def measure_interpreter():
+    """Seconds for a bare `python -c pass`, the floor under every cold start."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - start
+
+
+def measure_cold_start(base_url, n_lines):
+    out = subprocess.run(
+        [sys.executable, '-c', _CHILD, base_url, str(n_lines)],
+        cwd=HERE, env=_child_env(base_url), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(top=15):
+    """app's direct imports by cumulative import time (python -X importtime)."""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=HERE, env=_child_env('http://127.0.0.1:9'), capture_output=True, text=True, check=True,
+    )
+    rows, children = [], []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        # A module is listed after its imports, so the depth 1 lines since the
+        # last depth 0 line are its direct imports. Only app's count, not the
+        # interpreter's own startup imports (encodings, site, ...).
+        if depth == 0:
+            if name.strip() == 'app':
+                rows = children
+            children = []
+        elif depth == 1:
+            children.append({'module': name.strip(), 'self_ms': round(int(self_us) / 1000, 1),
+                             'cumulative_ms': round(int(cumulative_us) / 1000, 1)})
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:top]
+
+
+def run(runs, n_lines):
+    samples = {'interpreter': [], 'import_app': [], 'first_request': [], 'first_ask': []}
+    with MockOllamaServer() as server:
+        for _ in range(runs):
+            samples['interpreter'].append(measure_interpreter())
+            for name, seconds in measure_cold_start(server.base_url, n_lines).items():
+                samples[name].append(seconds)
+    return {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'runs': runs, 'lines': n_lines},
+        'benchmarks': {f'startup/{name}': summarize(values) for name, values in samples.items()},
+        'import_profile': import_profile(),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vistify cold-start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--lines', type=int, default=2000, help="Caption lines in the first /api/ask")
+    parser.add_argument('--out', default='startup_results.json')
+    parser.add_argument('--thresholds', help="JSON file of absolute limits to gate on")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.lines)
+    for name, stats in results['benchmarks'].items():
+        print(f"{name:24s} p50 {stats['p50_ms']:8.1f} ms   max {stats['max_ms']:8.1f} ms")
+    print("Import profile (direct imports of app):")
+    for row in results['import_profile']:
+        print(f"  {row['module']:28s} {row['cumulative_ms']:8.1f} ms")
+
+    failures = []
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            limits = {k: v for k, v in json.load(f).items() if k.startswith('startup/')}
+        failures = check_thresholds(results, limits)
+    results['regressions'] = failures
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if failures:
+        print("REGRESSIONS:")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
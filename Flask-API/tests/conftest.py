@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+os.environ.setdefault('WARM_TOP_N', '0')
+os.environ.setdefault('MENTIONS_EAGER', '0')
+os.environ.setdefault('PREFETCH_RULES', '')
+# Never touch a real artifact store or snapshot directory
+os.environ['ARTIFACT_STORE_PATH'] = ''
+os.environ['SNAPSHOT_DIR'] = ''
+
+
+@pytest.fixture(scope='session')
+def llm():
+    from mock_ollama import MockOllamaServer
+
+    with MockOllamaServer(latency='fixed:0') as server:
+        yield server
+
+
+@pytest.fixture(scope='session')
+def transcript():
+    import benchmark
+
+    return benchmark.make_transcript(400)
+
+
+@pytest.fixture
+def app_module(llm, transcript):
+    """app.py against the mock LLM and a synthetic transcript, with empty caches."""
+    import benchmark
+
+    app_module = benchmark.load_app(llm.base_url, transcript)
+    app_module.CACHE.clear()
+    app_module.store.clear()
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def slow_llm(app_module, monkeypatch):
+    """Points the app at an LLM that takes 2s, with any time left enough to start a call."""
+    from mock_ollama import MockOllamaServer
+
+    with MockOllamaServer(latency='fixed:2') as server:
+        monkeypatch.setattr(app_module, 'OLLAMA_BASE_URL', server.base_url)
+        monkeypatch.setattr(app_module, 'LLM_MIN_SECONDS', 0.05)
+        yield server
@@ -0,0 +1,150 @@
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from admission import PRIORITY_COLD, PRIORITY_HOT, AdmissionController, RouteLimit
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.005)
+    return condition()
+
+
+def queue(limit, priority, admitted, timeout=5.0):
+    """Starts a thread waiting for a slot; it appends `priority` to admitted once it has one."""
+    def wait():
+        if limit.acquire(priority, timeout) is None:
+            admitted.append(priority)
+
+    before = limit.queued
+    thread = threading.Thread(target=wait)
+    thread.start()
+    assert wait_for(lambda: limit.queued == before + 1)
+    return thread
+
+
+def test_free_slots_admit_immediately():
+    limit = RouteLimit('test', concurrency=2, queue_size=1, max_wait=1)
+    assert limit.acquire(PRIORITY_COLD, 0) is None
+    assert limit.acquire(PRIORITY_COLD, 0) is None
+    assert limit.active == 2
+
+
+def test_full_queue_rejects_without_waiting():
+    limit = RouteLimit('test', concurrency=1, queue_size=1, max_wait=1)
+    limit.acquire(PRIORITY_COLD, 0)
+    admitted = []
+    waiting = queue(limit, PRIORITY_COLD, admitted)
+
+    start = time.perf_counter()
+    assert limit.acquire(PRIORITY_HOT, 5) == 'queue_full'
+    assert time.perf_counter() - start < 0.5
+
+    limit.release(0.1)
+    waiting.join(5)
+    assert admitted == [PRIORITY_COLD]
+
+
+def test_waiting_past_the_timeout_gives_up():
+    limit = RouteLimit('test', concurrency=1, queue_size=2, max_wait=1)
+    limit.acquire(PRIORITY_COLD, 0)
+    assert limit.acquire(PRIORITY_COLD, 0.05) == 'timeout'
+    assert limit.queued == 0
+
+    # The abandoned waiter is skipped; the slot is freed
+    limit.release(0.1)
+    assert limit.active == 0
+
+
+def test_released_slots_go_to_hot_requests_first_then_in_order():
+    limit = RouteLimit('test', concurrency=1, queue_size=4, max_wait=5)
+    limit.acquire(PRIORITY_COLD, 0)
+    admitted = []
+    threads = [queue(limit, PRIORITY_COLD, admitted), queue(limit, PRIORITY_HOT, admitted),
+               queue(limit, PRIORITY_COLD + 1, admitted), queue(limit, PRIORITY_HOT, admitted)]
+
+    for expected in range(1, 5):
+        limit.release(0.1)
+        assert wait_for(lambda: len(admitted) == expected)
+        assert limit.active == 1
+    for thread in threads:
+        thread.join(5)
+    assert admitted == [PRIORITY_HOT, PRIORITY_HOT, PRIORITY_COLD, PRIORITY_COLD + 1]
+
+
+def make_app(controller, release):
+    app = Flask(__name__)
+
+    @app.route('/slow')
+    @controller.limit('slow')
+    def slow():
+        release.wait(5)
+        return jsonify({"error": False})
+
+    return app
+
+
+def test_busy_route_returns_503_with_retry_after():
+    controller = AdmissionController(client_concurrency=10)
+    controller.add_route('slow', concurrency=1, queue_size=0, max_wait=1)
+    release = threading.Event()
+    app = make_app(controller, release)
+
+    first = threading.Thread(target=lambda: app.test_client().get('/slow'))
+    first.start()
+    assert wait_for(lambda: controller.routes['slow'].active == 1)
+
+    resp = app.test_client().get('/slow')
+    assert resp.status_code == 503
+    assert int(resp.headers['Retry-After']) >= 1
+
+    release.set()
+    first.join(5)
+    assert app.test_client().get('/slow').status_code == 200
+
+
+def test_client_limit_returns_429():
+    controller = AdmissionController(client_concurrency=1)
+    controller.add_route('slow', concurrency=4, queue_size=4, max_wait=1)
+    release = threading.Event()
+    app = make_app(controller, release)
+
+    first = threading.Thread(target=lambda: app.test_client().get('/slow'))
+    first.start()
+    assert wait_for(lambda: controller.client_active)
+
+    resp = app.test_client().get('/slow')
+    assert resp.status_code == 429
+    assert resp.headers['Retry-After'] == '1'
+
+    release.set()
+    first.join(5)
+    assert controller.client_active == {}
+
+
+def test_limits_can_be_overridden_from_the_environment(monkeypatch):
+    monkeypatch.setenv('ADMISSION_CUSTOM_CONCURRENCY', '7')
+    monkeypatch.setenv('ADMISSION_CUSTOM_WAIT', '2.5')
+    controller = AdmissionController()
+    controller.add_route('custom', concurrency=1, queue_size=3, max_wait=10)
+
+    route = controller.routes['custom']
+    assert (route.concurrency, route.queue_size, route.max_wait) == (7, 3, 2.5)
+
+
+def test_background_work_takes_only_free_slots():
+    controller = AdmissionController()
+    controller.add_route('test', concurrency=1, queue_size=1, max_wait=1)
+    limit = controller.routes['test']
+
+    with controller.background('test') as admitted:
+        assert admitted and limit.active == 1
+        # Never queues behind (or ahead of) live requests
+        assert not limit.try_acquire()
+        assert limit.queued == 0
+        with controller.background('test') as nested:
+            assert not nested
+    assert limit.active == 0
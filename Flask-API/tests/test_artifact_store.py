@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+import pytest
+
+import deadline
+from artifact_store import ArtifactStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, 'artifacts.db')
+
+
+def test_artifacts_are_shared_between_stores(path):
+    first, second = ArtifactStore(path), ArtifactStore(path)
+    first.put('summary:v1:abc', "text")
+    assert second.get('summary:v1:abc') == "text"
+    first.put('index:v1:abc', {'n': [1, 2]}, codec='pickle', front=False)
+    assert second.get('index:v1:abc') == {'n': [1, 2]}
+
+
+def test_builder_runs_once_across_threads():
+    store = ArtifactStore()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.1)
+        return "built"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_or_build('k:1', build))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert results == ["built"] * 5
+    assert len(calls) == 1
+
+
+def test_none_is_returned_but_not_stored(path):
+    store = ArtifactStore(path)
+    assert store.get_or_build('k:none', lambda: None) is None
+    assert store.get_or_build('k:none', lambda: "later") == "later"
+
+
+def test_waits_for_a_live_lease_and_uses_the_published_value(path):
+    holder, waiter = ArtifactStore(path, lock_ttl=5), ArtifactStore(path, lock_ttl=5)
+    assert holder._try_lock('k:shared')
+
+    def publish():
+        time.sleep(0.2)
+        holder.put('k:shared', "from holder")
+        holder._unlock('k:shared')
+
+    threading.Thread(target=publish).start()
+    start = time.perf_counter()
+    assert waiter.get_or_build('k:shared', lambda: "from waiter") == "from holder"
+    assert time.perf_counter() - start < 2
+
+
+def test_expired_lease_of_a_crashed_builder_is_taken_over(path):
+    crashed, survivor = ArtifactStore(path, lock_ttl=0.3), ArtifactStore(path, lock_ttl=0.3)
+    # Takes the build lock and never publishes or unlocks
+    assert crashed._try_lock('k:orphan')
+    assert not survivor._try_lock('k:orphan')
+
+    start = time.perf_counter()
+    assert survivor.get_or_build('k:orphan', lambda: "rebuilt") == "rebuilt"
+    assert 0.3 <= time.perf_counter() - start < 2
+    assert crashed.get('k:orphan') == "rebuilt"
+    # The survivor released the lock it took over
+    assert crashed._try_lock('k:orphan')
+
+
+def test_waiting_stops_at_the_request_deadline(path):
+    holder, waiter = ArtifactStore(path, lock_ttl=5), ArtifactStore(path, lock_ttl=5)
+    assert holder._try_lock('k:slow')
+
+    with deadline.scope(0.2), pytest.raises(deadline.DeadlineExceeded) as info:
+        waiter.get_or_build('k:slow', lambda: "too late")
+    assert info.value.stage == 'artifact_wait'
+
+
+def test_prune_drops_expired_then_oldest_artifacts(path):
+    store = ArtifactStore(path, max_age=3600, max_bytes=2500, prune_interval=3600)
+    store.put('k:stale', "x" * 100)
+    store._conn().execute("UPDATE artifacts SET created = created - 7200 WHERE key = 'k:stale'")
+    for i in range(4):
+        store.put(f'k:{i}', "y" * 1000, front=False)
+        time.sleep(0.01)
+
+    assert store.prune() == 3
+    remaining = {row[0] for row in store._conn().execute("SELECT key FROM artifacts")}
+    assert remaining == {'k:2', 'k:3'}
+    # Pruned artifacts are not served from the local LRU either
+    assert store.get('k:stale') is None
+
+
+def test_writes_prune_at_most_once_per_interval(path, monkeypatch):
+    store = ArtifactStore(path, max_bytes=10, prune_interval=3600)
+    calls = []
+    monkeypatch.setattr(store, 'prune', lambda: calls.append(1))
+    store._last_prune = 0.0
+    store.put('k:1', "a")
+    store._last_prune = time.monotonic()
+    store.put('k:2', "b")
+    assert len(calls) == 1
+
+
+def test_clear_refuses_to_wipe_a_shared_store_outside_temp(tmp_path, monkeypatch):
+    import artifact_store
+
+    store = ArtifactStore(os.path.join(tmp_path, 'artifacts.db'))
+    store.put('llm:summary:abc', "keep")
+    store.put('bench:abc', "drop")
+    monkeypatch.setattr(artifact_store, 'is_temporary', lambda path: False)
+
+    with pytest.raises(RuntimeError):
+        store.clear()
+    store.clear('bench:')
+    assert store.get('bench:abc') is None
+    assert store.get('llm:summary:abc') == "keep"
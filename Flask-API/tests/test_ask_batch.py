@@ -0,0 +1,48 @@
+import benchmark
+import deadline
+
+
+def chunks(*starts):
+    return [{'start': float(s), 'text': f"chunk {s}"} for s in starts]
+
+
+def test_pack_questions_groups_overlapping_context(app_module):
+    contexts = [(0, chunks(1, 2, 3)), (1, chunks(2, 3, 4)), (2, chunks(7, 8, 9)), (3, chunks(1, 8))]
+    assert app_module.pack_questions(contexts, pack_size=4, max_chunks=8) == [[0, 1, 3], [2]]
+    assert app_module.pack_questions(contexts, pack_size=1, max_chunks=8) == [[0], [1], [2], [3]]
+
+
+def test_parse_packed_answers_needs_every_answer(app_module):
+    raw = '{"answers": [{"id": 2, "answer": "b"}, {"id": 1, "answer": "a"}]}'
+    assert app_module.parse_packed_answers(raw, 2) == ["a", "b"]
+    assert app_module.parse_packed_answers(raw, 3) is None
+    assert app_module.parse_packed_answers("not json", 1) is None
+
+
+def test_answers_come_back_in_question_order(client, transcript):
+    questions = benchmark.make_questions(transcript, 5) + ["thanks!"]
+    client.get('/api/transcript?v=batch_order')
+
+    body = client.post('/api/ask-batch', json={'video_id': 'batch_order', 'questions': questions}).get_json()
+
+    assert body['error'] is False
+    assert body['partial'] is False
+    assert [a['question'] for a in body['data']] == questions
+    assert all(a['answer'] for a in body['data'])
+    assert body['metrics']['llm_calls'] <= 5
+
+
+def test_timed_out_questions_are_partial(client, transcript, slow_llm):
+    questions = benchmark.make_questions(transcript, 3) + ["hi"]
+    client.get('/api/transcript?v=batch_late')
+
+    resp = client.post('/api/ask-batch', json={'video_id': 'batch_late', 'questions': questions},
+                       headers={deadline.HEADER: '0.5'})
+    body = resp.get_json()
+
+    assert resp.status_code == 200
+    assert body['partial'] is True
+    answers = body['data']
+    assert [a['question'] for a in answers] == questions
+    assert all(a['partial'] and a['chunks'] for a in answers[:3])
+    assert not answers[3].get('partial')
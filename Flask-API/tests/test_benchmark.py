@@ -0,0 +1,74 @@
+import json
+
+import pytest
+import requests
+
+from benchmark import check_thresholds, compare_baseline, make_questions, make_transcript, summarize
+from mock_ollama import MockOllamaServer, latency_sampler
+
+
+def test_synthetic_transcripts_are_deterministic():
+    first, second = make_transcript(50, seed=3), make_transcript(50, seed=3)
+    assert first == second
+    assert first != make_transcript(50, seed=4)
+    assert [line['start'] for line in first[:3]] == [0.0, 3.0, 6.0]
+    for question in make_questions(first, 5):
+        words = question.split()[6:]
+        assert any(all(w in line['text'].split() for w in words) for line in first)
+
+
+def test_summarize_percentiles_and_throughput():
+    stats = summarize([0.001 * k for k in range(1, 101)], wall_seconds=2.0)
+    assert stats['n'] == 100
+    assert stats['p50_ms'] == pytest.approx(51.0)
+    assert stats['p99_ms'] == pytest.approx(99.0)
+    assert stats['max_ms'] == pytest.approx(100.0)
+    assert stats['throughput_per_s'] == 50.0
+    assert summarize([])['p50_ms'] == 0.0
+
+
+def test_thresholds_and_baseline_flag_regressions():
+    results = {'benchmarks': {'index/500': {'p50_ms': 12.0, 'p99_ms': 30.0},
+                              'route/ask': {'skipped': 'no LLM'}}}
+    thresholds = {'_comment': {}, 'index/500': {'p50_ms': 10.0, 'p99_ms': 40.0}, 'route/ask': {'p50_ms': 1.0}}
+    assert check_thresholds(results, thresholds) == ["index/500.p50_ms = 12.0 exceeds 10.0"]
+
+    baseline = {'benchmarks': {'index/500': {'p50_ms': 11.0, 'p99_ms': 20.0}}}
+    assert compare_baseline(results, baseline, 0.25) == ["index/500.p99_ms = 30.0 vs baseline 20.0"]
+
+
+@pytest.mark.parametrize('spec, low, high', [
+    ('fixed:0.5', 0.5, 0.5),
+    ('uniform:0.1,0.2', 0.1, 0.2),
+    ('exp:0.1', 0.0, float('inf')),
+    ('lognormal:0,0.5', 0.0, float('inf')),
+])
+def test_latency_specs(spec, low, high):
+    sample = latency_sampler(spec, seed=1)
+    assert all(low <= sample() <= high for _ in range(20))
+
+
+def test_unknown_latency_spec_is_rejected():
+    with pytest.raises(ValueError):
+        latency_sampler('gamma:1')
+
+
+def test_mock_server_answers_like_ollama():
+    with MockOllamaServer(latency='fixed:0') as server:
+        resp = requests.post(f"{server.base_url}/generate", json={'model': 'm', 'prompt': "one two three"}, timeout=5)
+        body = resp.json()
+        assert body['done'] is True and body['model'] == 'm'
+        assert body['response'].startswith("1. ")
+        assert body['prompt_eval_count'] >= 1
+
+        schema = {'type': 'object', 'properties': {'titles': {}}}
+        prompt = "CHAPTERS:\n1. a\n2. b\n\nINSTRUCTIONS: title them"
+        resp = requests.post(f"{server.base_url}/generate", json={'prompt': prompt, 'format': schema}, timeout=5)
+        assert json.loads(resp.json()['response']) == {'titles': ["Chapter 1", "Chapter 2"]}
+        assert server.requests_served == 2
+
+
+def test_mock_server_error_rate():
+    with MockOllamaServer(error_rate=1.0) as server:
+        resp = requests.post(f"{server.base_url}/generate", json={'prompt': "x"}, timeout=5)
+        assert resp.status_code == 503
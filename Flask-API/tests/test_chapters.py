@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+import chapters
+
+TOPICS = [
+    ['volcano', 'lava', 'magma', 'eruption', 'crater', 'ash'],
+    ['inflation', 'interest', 'prices', 'bank', 'rates', 'wages'],
+    ['telescope', 'galaxy', 'orbit', 'planet', 'stars', 'light'],
+]
+FILLER = ['so', 'and', 'really', 'then', 'here', 'well', 'about', 'just']
+
+
+def topic_transcript(seconds_per_topic=300, line_seconds=5.0, seed=0):
+    """Three topics back to back; each line mixes its topic's words with filler."""
+    rng = random.Random(seed)
+    lines = []
+    per_topic = int(seconds_per_topic / line_seconds)
+    for t, words in enumerate(TOPICS):
+        for i in range(per_topic):
+            text = " ".join(rng.choice(words) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(10))
+            lines.append({'text': text, 'start': (t * per_topic + i) * line_seconds, 'duration': line_seconds})
+    return lines
+
+
+def test_band_sums_the_requested_columns():
+    matrix = chapters.band(np.array([-1, 1, 3]), np.array([2, 3, 9]), 4).toarray()
+    assert matrix.tolist() == [[1, 1, 0, 0], [0, 1, 1, 0], [0, 0, 0, 1]]
+
+
+def test_depth_peaks_at_the_dip():
+    similarities = np.array([0.9, 0.9, 0.9, 0.9, 0.2, 0.9, 0.9, 0.9, 0.9])
+    depths = chapters.depth_scores(similarities, window=3)
+    assert depths[4] == depths.max()
+    assert depths[0] < depths[4] and depths[-1] < depths[4]
+
+
+def test_boundaries_take_the_deepest_spaced_peaks():
+    starts = np.arange(20) * 30.0
+    depths = np.zeros(19)
+    # Gaps 4 and 5 are both deep, but their chunks start only 30s apart
+    depths[[4, 5, 11]] = [1.0, 0.9, 0.8]
+    depths[15] = 0.2
+    cuts = chapters.boundaries(starts, 600.0, depths, min_seconds=90, target_seconds=200, max_chapters=20)
+    assert cuts == [5, 12]
+
+
+def test_boundaries_respect_target_and_max():
+    starts = np.arange(20) * 30.0
+    depths = np.zeros(19)
+    depths[[3, 8, 13]] = [1.0, 0.9, 0.8]
+    assert chapters.boundaries(starts, 600.0, depths, min_seconds=60, target_seconds=300) == [4]
+    assert chapters.boundaries(starts, 600.0, depths, min_seconds=60, target_seconds=100, max_chapters=3) == [4, 9]
+    # Too short for more than one chapter
+    assert chapters.boundaries(starts, 600.0, depths, target_seconds=600) == []
+
+
+@pytest.fixture
+def topic_index(app_module):
+    from columnar import as_columnar
+
+    return app_module.create_rag_index('topics', as_columnar(topic_transcript()))
+
+
+def test_chapters_split_at_topic_shifts(topic_index):
+    result = chapters.build_chapters(topic_index)
+    assert len(result) == 3
+    assert result[0]['start'] == 0.0
+    assert result[-1]['end'] == 900.0
+    chunk_seconds = 900.0 / len(topic_index['chunks'])
+    for chapter, expected in zip(result[1:], (300.0, 600.0)):
+        assert abs(chapter['start'] - expected) <= 2 * chunk_seconds
+    for chapter, words in zip(result, TOPICS):
+        assert set(chapter['terms']) <= set(words)
+        assert chapter['title'] == ", ".join(term.title() for term in chapter['terms'])
+
+
+def test_short_videos_are_one_chapter(app_module):
+    from columnar import as_columnar
+
+    index_data = app_module.create_rag_index('short', as_columnar(topic_transcript(seconds_per_topic=20)))
+    assert chapters.segment_bounds(index_data) == [0, len(index_data['chunks'])]
+    assert len(chapters.build_chapters(index_data)) == 1
+
+
+def test_chapters_endpoint(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_transcript', lambda video_id: topic_transcript())
+    data = client.get('/api/chapters?v=topics').get_json()['data']
+    assert data['titles'] == 'keywords'
+    assert [c['timestamp'] for c in data['chapters']][0] == '0:00'
+    assert data['text'].splitlines()[0].startswith('0:00 ')
+    assert len(data['chapters']) == 3
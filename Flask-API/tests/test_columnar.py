@@ -0,0 +1,84 @@
+import pytest
+
+from benchmark import make_transcript
+from columnar import Chunks, ColumnarTranscript, as_columnar
+
+ENTRIES = [
+    {'text': 'hello there', 'start': 0.0, 'duration': 2.0},
+    {'text': '  café crème ', 'start': 2.0, 'duration': 2.0},
+    {'text': 'naïve résumé', 'start': 4.0, 'duration': 3.0},
+    {'text': 'the end', 'start': 7.0, 'duration': 1.0},
+]
+
+
+def reference_chunks(entries, max_chars):
+    """The string-concatenation loop the columnar chunker replaced."""
+    chunks, current, start = [], "", None
+    for entry in entries:
+        if start is None:
+            start = entry['start']
+        current += entry['text'].strip() + " "
+        if len(current) > max_chars:
+            chunks.append({'text': current.strip(), 'start': start})
+            current, start = "", None
+    if current:
+        chunks.append({'text': current.strip(), 'start': start})
+    return chunks
+
+
+def test_round_trip_and_zero_copy_slices():
+    transcript = ColumnarTranscript.from_entries(ENTRIES)
+    assert len(transcript) == 4
+    assert transcript.line_text(1) == 'café crème'
+    assert transcript.text() == 'hello there café crème naïve résumé the end'
+    assert transcript.to_entries()[2] == {'text': 'naïve résumé', 'start': 4.0, 'duration': 3.0}
+
+    part = transcript.slice(1, 3)
+    assert part.buffer is transcript.buffer
+    assert part.text() == 'café crème naïve résumé'
+    assert [e['start'] for e in part.to_entries()] == [2.0, 4.0]
+
+
+def test_character_lengths_count_characters_not_bytes():
+    transcript = ColumnarTranscript.from_entries(ENTRIES)
+    assert transcript.char_lengths().tolist() == [len(e['text'].strip()) + 1 for e in ENTRIES]
+
+
+@pytest.mark.parametrize('max_chars', [10, 20, 500])
+def test_chunks_match_the_original_loop(max_chars):
+    assert list(Chunks.build(as_columnar(ENTRIES), max_chars=max_chars)) == reference_chunks(ENTRIES, max_chars)
+
+
+def test_chunks_match_the_original_loop_on_a_long_transcript():
+    entries = make_transcript(500)
+    assert list(Chunks.build(as_columnar(entries))) == reference_chunks(entries, 500)
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (None, None, (0, 4)),
+    (3.0, None, (1, 4)),
+    (None, 4.0, (0, 3)),
+    (4.5, 6.0, (2, 3)),
+    (100.0, None, (3, 4)),
+    (None, -1.0, (0, 0)),
+])
+def test_range_indices(start, end, expected):
+    assert ColumnarTranscript.from_entries(ENTRIES).range_indices(start, end) == expected
+
+
+def test_chunk_slices_and_lookups():
+    chunks = Chunks.build(as_columnar(ENTRIES), max_chars=10)
+    assert len(chunks) == 4
+    assert chunks.chunk_at(5.0) == 2
+    assert chunks[1:3].texts() == ['café crème', 'naïve résumé']
+    assert chunks[-1] == {'text': 'the end', 'start': 7.0}
+    assert chunks.full_text(10) == 'hello ther'
+    with pytest.raises(ValueError):
+        chunks[::2]
+
+
+def test_empty_transcript():
+    chunks = Chunks.build(as_columnar([]))
+    assert len(chunks) == 0
+    assert chunks.full_text() == ""
+    assert as_columnar(None) is None
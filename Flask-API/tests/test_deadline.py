@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+import benchmark
+import deadline
+
+
+def test_scope_sets_and_restores_the_deadline():
+    assert deadline.remaining() is None
+    with deadline.scope(10):
+        assert 9 < deadline.remaining() <= 10
+        with deadline.scope(60):
+            # Nested scopes can only shorten the deadline
+            assert deadline.remaining() <= 10
+        assert deadline.timeout('stage', 30) <= 10
+        assert deadline.timeout('stage', 1) == 1
+    assert deadline.remaining() is None
+    assert deadline.timeout('stage', 30) == 30
+
+
+def test_check_raises_with_the_stage():
+    with deadline.scope(0.5):
+        deadline.check('retrieval')
+        with pytest.raises(deadline.DeadlineExceeded) as info:
+            deadline.check('llm_call', needed=1.0)
+    assert info.value.stage == 'llm_call'
+
+
+def test_bind_carries_the_deadline_to_another_thread():
+    seen = []
+    with deadline.scope(5):
+        worker = threading.Thread(target=deadline.bind(lambda: seen.append(deadline.remaining())))
+    worker.start()
+    worker.join()
+    assert seen[0] is not None and seen[0] <= 5
+    unbound = threading.Thread(target=deadline.bind(lambda: seen.append(deadline.remaining())))
+    unbound.start()
+    unbound.join()
+    assert seen[1] is None
+
+
+def test_header_can_only_shorten_the_budget(app_module):
+    with app_module.app.test_request_context(headers={deadline.HEADER: '5'}):
+        assert deadline.request_budget('ask') == 5.0
+    with app_module.app.test_request_context(headers={deadline.HEADER: '9999'}):
+        assert deadline.request_budget('ask') == deadline.budget('ask')
+    with app_module.app.test_request_context(headers={deadline.HEADER: 'soon'}):
+        assert deadline.request_budget('ask') == deadline.budget('ask')
+
+
+def test_route_returns_504_naming_the_stage(app_module, client, monkeypatch):
+    def slow_index(video_id):
+        raise deadline.DeadlineExceeded('index_build')
+
+    monkeypatch.setattr(app_module, 'ensure_index', slow_index)
+    resp = client.get('/api/transcript?v=late')
+
+    assert resp.status_code == 504
+    assert resp.get_json()['stage'] == 'index_build'
+    assert resp.headers['Cache-Control'] == 'no-store'
+
+
+def test_ask_returns_passages_when_the_llm_runs_out_of_time(client, transcript, slow_llm):
+    question = benchmark.make_questions(transcript, 1)[0]
+    client.get('/api/transcript?v=partial')
+
+    start = time.perf_counter()
+    resp = client.post('/api/ask', json={'video_id': 'partial', 'question': question},
+                       headers={deadline.HEADER: '0.5'})
+    body = resp.get_json()
+
+    assert time.perf_counter() - start < 1.5
+    assert resp.status_code == 200
+    assert body['partial'] is True
+    assert body['stage'] == 'llm_call'
+    assert body['chunks']
+    assert body['chunks'][0]['text'] in body['data']
+
@@ -0,0 +1,112 @@
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+import http_cache
+from artifact_store import ArtifactStore
+
+BIG = "point " * 1000
+
+
+@pytest.fixture
+def store():
+    return ArtifactStore()
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(store, calls):
+    app = Flask(__name__)
+    http_cache.init_app(app)
+
+    @app.route('/summary')
+    @http_cache.cached('summary', store, lambda: ['llm:summary:abc'])
+    def summary():
+        calls.append(1)
+        return jsonify({"error": False, "data": store.get('llm:summary:abc')})
+
+    @app.route('/degraded')
+    @http_cache.cached('summary', store, lambda: ['llm:summary:abc'])
+    def degraded():
+        return jsonify({"error": False, "data": BIG, "degraded": True})
+
+    @app.route('/plain')
+    def plain():
+        return jsonify({"error": False, "data": BIG})
+
+    return app.test_client()
+
+
+def test_matching_etag_gets_304_without_running_the_view(client, store, calls):
+    store.put('llm:summary:abc', "1. A point")
+    resp = client.get('/summary')
+    etag = resp.headers['ETag']
+    assert etag.startswith('W/"')
+    assert resp.headers['Cache-Control'] == http_cache.DEFAULT_CACHE_CONTROL['summary']
+
+    resp = client.get('/summary', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+    assert resp.headers['ETag'] == etag
+    assert calls == [1]
+
+
+def test_changed_artifact_changes_the_etag(client, store, calls):
+    store.put('llm:summary:abc', "1. A point")
+    etag = client.get('/summary').headers['ETag']
+    store.put('llm:summary:abc', "1. Another point")
+
+    resp = client.get('/summary', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+    assert len(calls) == 2
+
+
+def test_uncached_artifacts_and_degraded_bodies_are_not_stored(client, store):
+    resp = client.get('/summary')
+    assert 'ETag' not in resp.headers
+    assert resp.headers['Cache-Control'] == 'no-store'
+
+    store.put('llm:summary:abc', "1. A point")
+    resp = client.get('/degraded')
+    assert 'ETag' not in resp.headers
+    assert resp.headers['Cache-Control'] == 'no-store'
+
+
+def test_large_bodies_are_gzipped(client, store):
+    store.put('llm:summary:abc', BIG)
+    resp = client.get('/summary', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert gzip.decompress(resp.data).decode('utf-8').count('point') == 1000
+
+
+def test_brotli_is_preferred_when_installed(client, store, monkeypatch):
+    class Brotli:
+        @staticmethod
+        def compress(data, quality):
+            return b'br:' + data[:10]
+
+    monkeypatch.setattr(http_cache, 'brotli', Brotli)
+    store.put('llm:summary:abc', BIG)
+    resp = client.get('/summary', headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert resp.data.startswith(b'br:')
+
+    monkeypatch.setattr(http_cache, 'brotli', None)
+    resp = client.get('/summary', headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+
+
+def test_small_identity_and_uncached_route_bodies_are_sent_as_is(client, store):
+    store.put('llm:summary:abc', "1. A point")
+    assert 'Content-Encoding' not in client.get('/summary', headers={'Accept-Encoding': 'gzip'}).headers
+
+    store.put('llm:summary:abc', BIG)
+    assert 'Content-Encoding' not in client.get('/summary').headers
+    assert 'Content-Encoding' not in client.get('/plain', headers={'Accept-Encoding': 'gzip'}).headers
@@ -0,0 +1,70 @@
+import pytest
+
+import intent_router
+
+# Phrasings that are not in intent_samples.json
+ROUTES = {
+    'greeting': ["hey", "hello, good evening"],
+    'acknowledgement': ["thanks so much", "ok, thank you", "great, got it"],
+    'overview': ["what's this podcast about", "give me a short summary"],
+    'timestamp': ["when does she explain the results", "at what minute is the demo"],
+    'entity': ["where does he mention amazon", "is netflix mentioned anywhere"],
+    'question': ["what did she say about taxes", "how do I configure the router", "who is the speaker"],
+}
+
+
+@pytest.mark.parametrize('intent, question', [(i, q) for i, questions in ROUTES.items() for q in questions])
+def test_classify(intent, question):
+    assert intent_router.classify(question)[0] == intent
+
+
+# Content questions that look like small talk or overviews; the phrase rules sent them all to RAG
+NOT_CANNED = [
+    "what is attention", "what is backpropagation", "what is recursion", "what is docker", "what is inflation",
+    "hello kitty", "hello world program explanation", "hey jude lyrics meaning",
+    "summarize the part about inflation", "thanks for explaining, but what is docker",
+]
+
+
+@pytest.mark.parametrize('question', NOT_CANNED)
+def test_content_questions_go_to_rag(question):
+    assert intent_router.classify(question)[0] == 'question'
+
+
+def test_canned_intents_need_small_talk():
+    assert intent_router.is_small_talk("hey, thanks!")
+    assert not intent_router.is_small_talk("hello kitty")
+    assert not intent_router.is_small_talk("thanks " * 10)
+
+
+def test_thanks_with_a_question_goes_to_rag():
+    assert intent_router.classify("thanks! what does he say about taxes")[0] == 'question'
+
+
+def test_model_covers_every_intent():
+    assert sorted(intent_router.classifier.intents) == sorted(intent_router.INTENTS)
+
+
+def test_topic_drops_cue_words():
+    assert intent_router.topic("when does he talk about interest rates") == "interest rates"
+
+
+def test_match_entities():
+    index = {'barack obama': {'count': 3, 'times': [1.0]}, 'tesla': {'count': 1, 'times': [2.0]}}
+    assert intent_router.match_entities(index, "where is tesla mentioned")[0]['entity'] == 'tesla'
+    assert intent_router.match_entities(index, "does he mention obama")[0]['entity'] == 'barack obama'
+    assert intent_router.match_entities(index, "is google mentioned") == []
+
+
+def test_canned_replies(client):
+    hello = client.post('/api/ask', json={'video_id': 'intents', 'question': "hi"}).get_json()
+    thanks = client.post('/api/ask', json={'video_id': 'intents', 'question': "thank you!"}).get_json()
+
+    assert hello['intent'] == 'greeting'
+    assert thanks['intent'] == 'acknowledgement'
+    assert thanks['data'] != hello['data']
+    assert thanks['data'].startswith("You're welcome")
+
+    kitty = client.post('/api/ask', json={'video_id': 'intents', 'question': "hello kitty"}).get_json()
+    assert kitty['intent'] == 'question'
+    assert kitty['data'] != hello['data']
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+import benchmark
+from columnar import Chunks, as_columnar
+from live_index import LiveIndex, LiveRegistry, parse_segments
+
+
+@pytest.fixture(scope='module')
+def lines():
+    return benchmark.make_transcript(300)
+
+
+def ingest_in_batches(live, lines, size):
+    for i in range(0, len(lines), size):
+        live.ingest(lines[i:i + size])
+
+
+@pytest.mark.parametrize('batch', [1, 7, 50])
+def test_incremental_chunks_match_a_full_build(lines, batch):
+    live = LiveIndex('live')
+    ingest_in_batches(live, lines, batch)
+
+    expected = Chunks.build(as_columnar(lines))
+    chunks = live.index_data()['chunks']
+    assert np.array_equal(chunks.bounds, expected.bounds)
+    assert [chunks.text(k) for k in range(len(chunks))] == [expected.text(k) for k in range(len(expected))]
+    assert live.transcript().text() == as_columnar(lines).text()
+
+
+def test_resent_and_empty_segments_are_skipped(lines):
+    live = LiveIndex('live')
+    assert live.ingest(lines[:10]) == {'accepted': 10, 'skipped': 0}
+    # Overlapping resend: the first five are already in
+    assert live.ingest(lines[5:15]) == {'accepted': 5, 'skipped': 5}
+    assert live.ingest([{'text': '  ', 'start': 1e6}]) == {'accepted': 0, 'skipped': 1}
+    assert len(live) == 15
+    assert live.revision == 2
+
+
+def test_appends_only_touch_the_open_chunk(lines):
+    live = LiveIndex('live')
+    live.ingest(lines[:100])
+    before = live.index_data()
+    closed = live.closed_chunks
+    old_bounds = before['chunks'].bounds.copy()
+    old_rows = before['matrix'][:closed].toarray()
+
+    live.ingest(lines[100:200])
+    after = live.index_data()
+
+    assert live.closed_chunks > closed
+    assert np.array_equal(after['chunks'].bounds[:closed + 1], old_bounds[:closed + 1])
+    # The earlier snapshot is unchanged by the append
+    assert np.array_equal(before['chunks'].bounds, old_bounds)
+    assert np.array_equal(before['matrix'][:closed].toarray(), old_rows)
+    assert after['matrix'].shape[0] == len(after['chunks'])
+
+
+def test_index_data_is_reused_until_the_next_ingest(lines):
+    live = LiveIndex('live')
+    live.ingest(lines[:50])
+    assert live.index_data() is live.index_data()
+    snapshot = live.index_data()
+    live.ingest(lines[50:60])
+    assert live.index_data() is not snapshot
+
+
+def test_retrieval_agrees_with_the_regular_index(app_module, lines):
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    live = LiveIndex('live')
+    ingest_in_batches(live, lines, 20)
+    live_data = live.index_data()
+    regular = app_module.create_rag_index('regular', lines)
+
+    agree = 0
+    questions = benchmark.make_questions(lines, 20)
+    for question in questions:
+        best = [int(cosine_similarity(d['vectorizer'].transform([question]), d['matrix']).argmax())
+                for d in (live_data, regular)]
+        agree += best[0] == best[1]
+    assert agree >= 18
+
+
+def test_parse_segments_rejects_malformed_input():
+    assert parse_segments([{'text': 'hi', 'start': '1.5'}]) == [{'text': 'hi', 'start': 1.5, 'duration': 0.0}]
+    with pytest.raises(ValueError):
+        parse_segments([{'text': 'no start'}])
+    with pytest.raises(ValueError):
+        parse_segments([{'text': 'hi', 'start': 'soon'}])
+
+
+def test_registry_evicts_the_least_recently_updated_stream():
+    registry = LiveRegistry(max_streams=2)
+    first, _ = registry.touch('a')
+    registry.touch('b')
+    assert registry.touch('a') == (first, None)
+
+    _, evicted = registry.touch('c')
+    assert evicted.video_id == 'b'
+    assert 'b' not in registry and 'a' in registry
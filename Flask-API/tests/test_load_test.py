@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.serving import make_server
+
+from load_test import ServiceTimeMiddleware, drive, parse_mix, report
+
+
+def test_parse_mix():
+    assert parse_mix("ask=0.6,summary=0.4") == {'ask': 0.6, 'summary': 0.4}
+    with pytest.raises(ValueError):
+        parse_mix("ask=0.5,chapters=0.5")
+
+
+def test_report_splits_errors_and_routes():
+    records = [
+        {'route': 'ask', 'dispatch_lag': 0.0, 'latency': 0.1, 'queue_delay': 0.02, 'status': 200, 'ok': True},
+        {'route': 'ask', 'dispatch_lag': 0.0, 'latency': 0.3, 'status': 200, 'ok': True},
+        {'route': 'summary', 'dispatch_lag': 0.0, 'latency': 1.0, 'status': 503, 'ok': False},
+        {'route': 'summary', 'dispatch_lag': 0.0, 'latency': 2.0, 'status': 'ReadTimeout', 'ok': False},
+    ]
+    result = report(records, wall=2.0)
+    assert result['succeeded'] == 2
+    assert result['error_rate'] == 0.5
+    assert result['throughput_per_s'] == 1.0
+    assert result['errors'] == {'503': 1, 'ReadTimeout': 1}
+    assert list(result['routes']) == ['ask']
+    assert result['queue_delay']['n'] == 1
+
+
+@pytest.fixture
+def server(app_module):
+    original = app_module.app.wsgi_app
+    # As under waitress in serve(): trust the driver's X-Forwarded-For so each simulated user is its own client
+    app_module.app.wsgi_app = ServiceTimeMiddleware(ProxyFix(original, x_for=1))
+    httpd = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    app_module.app.wsgi_app = original
+
+
+def test_drive_sends_open_loop_requests_and_measures_queueing(server):
+    records, wall = drive(server, rate=40, duration=0.5, mix={'ask': 1.0}, videos=2,
+                          questions=["what does the video say about this"], timeout=10, users=5, max_clients=8)
+    assert 5 <= len(records) <= 60
+    assert wall > 0
+    assert all(r['route'] == 'ask' for r in records)
+    assert all(r['ok'] for r in records), [r['status'] for r in records if not r['ok']]
+    # X-Service-Time came back, so queueing delay could be derived
+    assert all(0 <= r['queue_delay'] <= r['latency'] for r in records)
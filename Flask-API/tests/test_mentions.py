@@ -0,0 +1,124 @@
+import importlib.util
+import sys
+import time
+import types
+
+import pytest
+
+from snapshot import SnapshotStore
+
+ENTITIES = {'Barack Obama': 'PERSON', 'Federal Reserve': 'ORG', 'YouTube': 'ORG'}
+
+
+class StubNLP:
+    """Stands in for the spaCy pipeline: recognizes the ENTITIES names verbatim."""
+
+    pipe_names = ['tok2vec', 'tagger', 'parser', 'ner']
+    max_length = 1000000
+
+    def pipe(self, texts, disable=(), batch_size=None):
+        assert 'ner' not in disable
+        for text in texts:
+            yield types.SimpleNamespace(ents=[types.SimpleNamespace(text=name, label_=label)
+                                              for name, label in ENTITIES.items() if name in text])
+
+
+def make_transcript():
+    lines = []
+    for i in range(200):
+        text = f"line {i} about nothing in particular"
+        if i in (5, 150):
+            text = "Barack Obama said hello on YouTube"
+        elif i == 80:
+            text = "the Federal Reserve raised rates"
+        lines.append({'text': text, 'start': i * 3.0, 'duration': 3.0})
+    return lines
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def ner(monkeypatch):
+    """ner_extractor with the stub pipeline, importable without spaCy installed."""
+    if importlib.util.find_spec('spacy') is None:
+        monkeypatch.setitem(sys.modules, 'spacy', types.ModuleType('spacy'))
+    monkeypatch.delitem(sys.modules, 'ner_extractor', raising=False)
+    import ner_extractor
+
+    monkeypatch.setattr(ner_extractor, 'nlp_model', StubNLP())
+    yield ner_extractor
+    sys.modules.pop('ner_extractor', None)
+
+
+@pytest.fixture
+def mentions_app(app_module, ner, monkeypatch):
+    fetches = []
+
+    def get_transcript(video_id):
+        fetches.append(video_id)
+        return make_transcript()
+
+    monkeypatch.setattr(app_module, 'get_transcript', get_transcript)
+    monkeypatch.setattr(app_module, 'MENTIONS_EAGER', True)
+    monkeypatch.setattr(app_module, '_ner_available', True)
+    app_module.fetches = fetches
+    return app_module
+
+
+def chunk_starts_containing(index_data, text):
+    chunks = index_data['chunks']
+    return [start for chunk, start in zip(chunks.texts(), chunks.starts.tolist()) if text in chunk]
+
+
+def built_mentions(app_module, video_id):
+    key = app_module.mention_key(video_id)
+    assert wait_for(lambda: app_module.store.get(key) is not None)
+    return app_module.store.get(key)
+
+
+def test_index_maps_entities_to_chunk_times(mentions_app):
+    index_data = mentions_app.ensure_index('ment1')
+    index = built_mentions(mentions_app, 'ment1')
+
+    assert index['barack obama']['label'] == 'PERSON'
+    assert index['barack obama']['times'] == chunk_starts_containing(index_data, 'Barack Obama')
+    assert index['federal reserve']['label'] == 'ORG'
+    # IGNORE_LIST entities are left out
+    assert 'youtube' not in index
+
+
+def test_snapshot_restored_video_gets_a_mention_index(mentions_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(mentions_app, 'snapshots', SnapshotStore(str(tmp_path)))
+    monkeypatch.setattr(mentions_app, 'MENTIONS_EAGER', False)
+    mentions_app.ensure_index('ment2')
+    assert 'ment2' in mentions_app.snapshots
+
+    # A restart: only the snapshot survives
+    mentions_app.CACHE.clear()
+    mentions_app.store.clear()
+    monkeypatch.setattr(mentions_app, 'MENTIONS_EAGER', True)
+    mentions_app.ensure_index('ment2')
+
+    assert mentions_app.fetches == ['ment2']
+    assert 'barack obama' in built_mentions(mentions_app, 'ment2')
+
+
+def test_entity_questions_are_answered_from_the_index(mentions_app, client):
+    index_data = mentions_app.ensure_index('ment3')
+    built_mentions(mentions_app, 'ment3')
+    times = chunk_starts_containing(index_data, 'Barack Obama')
+
+    body = client.post('/api/ask', json={'video_id': 'ment3', 'question': 'where is obama mentioned'}).get_json()
+    assert body['intent'] == 'entity'
+    assert body['times'] == times
+    assert body['data'].startswith("Barack Obama is mentioned at ")
+
+    answer = mentions_app.answer_entity('ment3', 'where is obama mentioned', start=times[0] + 1, end=times[-1] - 1)
+    assert answer['times'] == [] and "isn't mentioned in this part" in answer['data']
+    # Names nothing in the index: the caller falls back to a timestamp lookup
+    assert mentions_app.answer_entity('ment3', 'where is napoleon mentioned') is None
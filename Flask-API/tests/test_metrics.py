@@ -0,0 +1,65 @@
+import threading
+
+import metrics
+
+metrics.register('test_requests_total', 'counter', 'Test counter.')
+metrics.register('test_seconds', 'histogram', 'Test histogram.', buckets=(0.1, 1.0))
+
+
+def value(name, labels=None):
+    cell = metrics.snapshot().get((name, metrics._key(labels)))
+    return None if cell is None else cell[0]
+
+
+def test_counters_merge_shards_of_live_and_finished_threads():
+    before = value('test_requests_total', {'route': 'merge'}) or 0
+
+    def work():
+        for _ in range(100):
+            metrics.inc('test_requests_total', labels={'route': 'merge'})
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    metrics.inc('test_requests_total', 2, {'route': 'merge'})
+    assert value('test_requests_total', {'route': 'merge'}) == before + 402
+    # Finished threads' shards are folded in once, not counted again
+    assert value('test_requests_total', {'route': 'merge'}) == before + 402
+
+
+def test_histogram_renders_cumulative_buckets():
+    for seconds in (0.05, 0.5, 5.0):
+        metrics.observe('test_seconds', seconds, {'stage': 'render'})
+    text = metrics.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{stage="render",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="render",le="1"} 2' in text
+    assert 'test_seconds_bucket{stage="render",le="+Inf"} 3' in text
+    assert 'test_seconds_sum{stage="render"} 5.55' in text
+    assert 'test_seconds_count{stage="render"} 3' in text
+
+
+def test_timed_records_a_stage_even_when_the_block_raises():
+    labels = {'stage': 'test_timed'}
+    try:
+        with metrics.timed('test_timed'):
+            raise ValueError
+    except ValueError:
+        pass
+    cell = metrics.snapshot()[('vistify_stage_seconds', metrics._key(labels))]
+    assert cell[2] == 1
+
+
+def test_label_values_are_escaped():
+    metrics.inc('test_requests_total', labels={'route': 'say "hi"\\'})
+    assert 'test_requests_total{route="say \\"hi\\"\\\\"} 1' in metrics.render()
+
+
+def test_metrics_endpoint(client):
+    client.get('/api/transcript?v=abc')
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    assert 'vistify_stage_seconds_bucket{stage="index_build"' in resp.get_data(as_text=True)
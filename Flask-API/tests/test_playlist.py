@@ -0,0 +1,47 @@
+import deadline
+
+
+def fake_scores(app_module, monkeypatch, timed_out):
+    def score_video(video_id, query, top_k):
+        if video_id in timed_out:
+            raise deadline.DeadlineExceeded('transcript_fetch')
+        return [{'video_id': video_id, 'start': 60.0 * k, 'text': f"{video_id} passage {k}", 'score': 0.9 - 0.1 * k}
+                for k in range(2)]
+
+    monkeypatch.setattr(app_module, 'score_video', score_video)
+
+
+def test_timed_out_videos_are_skipped(app_module, client, monkeypatch):
+    fake_scores(app_module, monkeypatch, timed_out={'v1', 'v3'})
+
+    body = client.post('/api/ask', json={'video_ids': ['v1', 'v2', 'v3', 'v4'], 'question': 'what is said'}).get_json()
+
+    assert body['error'] is False
+    assert body['skipped_videos'] == ['v1', 'v3']
+    sources = [(s['video_id'], s['start']) for s in body['sources']]
+    assert len(sources) == len(set(sources))
+    assert {vid for vid, _ in sources} == {'v2', 'v4'}
+
+
+def test_partial_answer_reports_skipped_videos(app_module, client, monkeypatch):
+    fake_scores(app_module, monkeypatch, timed_out={'v1'})
+
+    def generate(prompt, *args, **kwargs):
+        raise deadline.DeadlineExceeded('llm')
+
+    monkeypatch.setattr(app_module, 'ollama_generate', generate)
+    body = client.post('/api/ask', json={'video_ids': ['v1', 'v2'], 'question': 'what is said'}).get_json()
+
+    assert body['partial'] is True
+    assert body['stage'] == 'llm'
+    assert body['skipped_videos'] == ['v1']
+    assert "v2 passage 0" in body['data']
+
+
+def test_all_videos_timed_out(app_module, client, monkeypatch):
+    fake_scores(app_module, monkeypatch, timed_out={'v1', 'v2'})
+
+    body = client.post('/api/ask', json={'video_ids': ['v1', 'v2'], 'question': 'what is said'}).get_json()
+
+    assert body['error'] is False
+    assert "couldn't find" in body['data']
@@ -0,0 +1,79 @@
+import threading
+
+import admission
+from prefetch import PrefetchEngine
+
+
+class BlockingRun:
+    """Stands in for the prefetch task: blocks until released, recording what it built."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+        self.built = []
+
+    def __call__(self, video_id, artifact, cancelled):
+        self.started.append((video_id, artifact))
+        self.release.wait(5)
+        if not cancelled.is_set():
+            self.built.append((video_id, artifact))
+
+
+def test_tasks_are_deduplicated_across_clients():
+    run = BlockingRun()
+    engine = PrefetchEngine(run, rules={'summary': ['insights']}, concurrency=1)
+    assert engine.touch('summary', 'abc', 'session:a') == ['insights']
+    assert engine.touch('summary', 'abc', 'session:b') == []
+    run.release.set()
+    engine._pool.shutdown(wait=True)
+    assert run.built == [('abc', 'insights')]
+
+
+def test_cancel_keeps_work_another_session_wants():
+    run = BlockingRun()
+    # One worker, so the second task stays queued behind the first
+    engine = PrefetchEngine(run, rules={'summary': ['insights', 'entities']}, concurrency=1)
+    engine.touch('summary', 'abc', 'session:a')
+    engine.touch('summary', 'abc', 'session:b')
+
+    assert engine.cancel('abc', 'session:a') == 0
+    assert engine.cancel('abc', 'session:b') == 2
+    run.release.set()
+    engine._pool.shutdown(wait=True)
+    assert run.built == []
+    assert engine.pending() == []
+
+
+def test_sessions_behind_one_address_do_not_cancel_each_other(app_module, client, monkeypatch):
+    engine = PrefetchEngine(lambda *args: None, rules={'summary': ['insights']}, concurrency=1)
+    monkeypatch.setattr(app_module, 'prefetcher', engine)
+    with app_module.app.test_request_context('/api/summary?v=abc&session=tab-1'):
+        engine.touch('summary', 'abc', app_module.prefetch_client())
+    with app_module.app.test_request_context('/api/summary?v=xyz&session=tab-2'):
+        engine.touch('summary', 'xyz', app_module.prefetch_client())
+
+    # Same remote address, different tabs: each keeps its own video
+    assert engine._client_video == {'session:tab-1': 'abc', 'session:tab-2': 'xyz'}
+    body = client.post('/api/prefetch/cancel?v=abc&session=tab-2').get_json()
+    assert body['data']['cancelled'] == 0
+
+
+def test_prefetch_skips_the_llm_when_the_route_is_busy(app_module, monkeypatch):
+    built = []
+    monkeypatch.setattr(app_module, 'OLLAMA_API_KEY', 'test')
+    monkeypatch.setattr(app_module, 'build_artifact', lambda video_id, name, index_data: built.append(name))
+    cancelled = threading.Event()
+
+    route = admission.controller.routes['insights']
+    for _ in range(route.concurrency):
+        assert route.acquire(admission.PRIORITY_HOT, 0) is None
+    try:
+        app_module.prefetch_artifact('abc', 'insights', cancelled)
+        assert built == []
+    finally:
+        for _ in range(route.concurrency):
+            route.release(0.0)
+
+    app_module.prefetch_artifact('abc', 'insights', cancelled)
+    assert built == ['insights']
+    assert route.active == 0
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import profiler
+from profiler import StackSampler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def test_sampler_counts_only_registered_threads():
+    sampler = StackSampler(interval=0.001)
+    sampler.add(threading.get_ident())
+    busy(0.1)
+    stacks = sampler.remove(threading.get_ident())
+
+    assert sum(stacks.values()) > 10
+    assert any('busy (test_profiler.py' in stack for stack in stacks)
+    assert not any('_run (profiler.py' in stack for stack in stacks)
+
+
+def test_removed_stacks_stop_changing():
+    sampler = StackSampler(interval=0)
+    for _ in range(50):
+        sampler.add(threading.get_ident())
+        busy(0.002)
+        stacks = sampler.remove(threading.get_ident())
+        total = sum(stacks.values())
+        busy(0.002)
+        assert sum(stacks.values()) == total
+
+
+def test_profiled_block_is_stored():
+    with profiler.profiled('unit test', video_id='abc'):
+        busy(0.05)
+    profile = profiler.profiles.get(profiler.profiles.list()[0]['id'])
+
+    assert profile['label'] == 'unit test'
+    assert profile['video_id'] == 'abc'
+    assert profile['samples'] == sum(profile['stacks'].values())
+    assert profiler.render_collapsed(profile).endswith("\n")
+
+
+def test_authorized_needs_a_configured_token(monkeypatch):
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    assert not profiler.authorized('anything')
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    assert profiler.authorized('secret')
+    assert not profiler.authorized('wrong')
+    assert not profiler.authorized(None)
+
+
+def test_profile_header_tags_the_response(client, monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    resp = client.get('/api/transcript?v=profiled', headers={profiler.HEADER: 'secret'})
+    profile_id = int(resp.headers['X-Profile-Id'])
+
+    listed = client.get('/admin/profiles', headers={'Authorization': 'Bearer secret'}).get_json()
+    assert profile_id in [p['id'] for p in listed['data']]
+    assert 'X-Profile-Id' not in client.get('/api/transcript?v=profiled').headers
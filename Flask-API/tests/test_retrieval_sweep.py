@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from retrieval_sweep import evaluate_group, load_dataset, mark_pareto, sweep, synthetic_dataset
+
+TOPICS = ['volcano', 'inflation', 'telescope', 'glacier', 'orchestra', 'vaccine']
+
+
+def topic_transcript():
+    """Twelve 10s lines, each pair about one topic, so the answer to a topic question is known."""
+    return [{'text': f"here we discuss the {TOPICS[i // 2]} in some detail", 'start': i * 10.0, 'duration': 10.0}
+            for i in range(12)]
+
+
+@pytest.fixture
+def labeled():
+    transcripts = {'vid': topic_transcript()}
+    items = [{'video_id': 'vid', 'question': f"what about the {topic}?", 'start': i * 20.0, 'end': i * 20.0 + 19}
+             for i, topic in enumerate(TOPICS)]
+    return transcripts, items
+
+
+def test_load_dataset_defaults_end_to_start(tmp_path):
+    path = os.path.join(tmp_path, 'labels.jsonl')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'video_id': 'a', 'question': 'q', 'start': '12'}) + "\n\n")
+        f.write(json.dumps({'video_id': 'b', 'question': 'q', 'start': 1, 'end': 5}) + "\n")
+    assert [(i['start'], i['end']) for i in load_dataset(path)] == [(12.0, 12.0), (1.0, 5.0)]
+
+
+def test_synthetic_questions_are_labeled_with_their_line():
+    transcripts, items = synthetic_dataset(20, n_videos=2, n_lines=50)
+    assert len(items) == 20
+    for item in items:
+        line = next(l for l in transcripts[item['video_id']] if l['start'] == item['start'])
+        assert item['end'] == line['start'] + line['duration']
+        assert all(word in line['text'].split() for word in item['question'].split()[6:])
+
+
+def test_group_scores_recall_mrr_and_tokens(labeled):
+    transcripts, items = labeled
+    results = evaluate_group(40, (1, 1), transcripts, items, [1, 3], [0.0, 0.99])
+    by_config = {(r['top_k'], r['threshold']): r for r in results}
+    assert len(results) == 4
+
+    # Each topic is named in its own chunks only, so the first hit is relevant
+    assert by_config[(1, 0.0)]['recall_at_k'] == 1.0
+    assert by_config[(1, 0.0)]['mrr'] == 1.0
+    assert by_config[(3, 0.0)]['prompt_tokens_mean'] > by_config[(1, 0.0)]['prompt_tokens_mean']
+    # Nothing clears the threshold: no context, no recall
+    assert by_config[(3, 0.99)]['recall_at_k'] == 0.0
+    assert by_config[(3, 0.99)]['prompt_tokens_mean'] == 0.0
+    assert all(r['questions'] == len(items) for r in results)
+
+
+def test_pareto_front_excludes_dominated_configs():
+    def result(recall, mrr, tokens, p50):
+        return {'recall_at_k': recall, 'mrr': mrr, 'prompt_tokens_mean': tokens, 'retrieval_p50_ms': p50}
+
+    best, cheap, dominated, twin = (result(0.9, 0.8, 300, 1.0), result(0.6, 0.5, 100, 1.0),
+                                    result(0.6, 0.5, 300, 1.0), result(0.9, 0.8, 300, 1.0))
+    mark_pareto([best, cheap, dominated, twin])
+    assert best['pareto'] and cheap['pareto'] and twin['pareto']
+    assert not dominated['pareto']
+
+
+def test_sweep_covers_the_grid_best_first(labeled):
+    transcripts, items = labeled
+    results = sweep(transcripts, items, [40, 200], [(1, 1), (1, 2)], [1, 3], [0.0], workers=1)
+    assert len(results) == 8
+    assert {(r['chunk_chars'], tuple(r['ngram']), r['top_k']) for r in results} == {
+        (c, n, k) for c in (40, 200) for n in ((1, 1), (1, 2)) for k in (1, 3)}
+    recalls = [r['recall_at_k'] for r in results]
+    assert recalls == sorted(recalls, reverse=True)
+    assert any(r['pareto'] for r in results)
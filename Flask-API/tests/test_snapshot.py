@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+from snapshot import SnapshotError, SnapshotStore, load_index, save_index
+
+
+@pytest.fixture
+def index_data(app_module, transcript):
+    return app_module.create_rag_index('snap', transcript[:100])
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_round_trip_requires_the_same_index_format(index_data, tmp_path):
+    path = os.path.join(tmp_path, 'a.vidx')
+    save_index(index_data, path, index_format='chars500')
+    loaded = load_index(path, index_format='chars500')
+    assert loaded['chunks'].texts() == index_data['chunks'].texts()
+    assert (loaded['matrix'] != index_data['matrix']).nnz == 0
+
+    with pytest.raises(SnapshotError):
+        load_index(path, index_format='chars1000')
+
+
+def test_truncated_files_are_rejected_before_mapping(index_data, tmp_path):
+    path = os.path.join(tmp_path, 'a.vidx')
+    save_index(index_data, path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 100)
+    with pytest.raises(SnapshotError, match='Truncated'):
+        load_index(path)
+
+
+def test_store_drops_snapshots_of_another_format(index_data, tmp_path):
+    old = SnapshotStore(str(tmp_path), index_format='old')
+    old.save('abc', index_data)
+
+    new = SnapshotStore(str(tmp_path), index_format='new')
+    assert new.load('abc') is None
+    assert 'abc' not in new
+    new.save('abc', index_data)
+    assert new.load('abc') is not None
+
+
+def test_prune_removes_stale_versions_temp_files_and_old_snapshots(index_data, tmp_path):
+    store = SnapshotStore(str(tmp_path), max_age=3600, prune_interval=3600)
+    store.save('fresh', index_data)
+    store.save('idle', index_data)
+    age(store.path('idle'), 7200)
+    for name in ('other.v0.vidx', 'crashed.tmp', 'saving.tmp'):
+        with open(os.path.join(tmp_path, name), 'wb') as f:
+            f.write(b"x")
+    age(os.path.join(tmp_path, 'crashed.tmp'), 7200)
+
+    assert store.prune() == 3
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(store.path('fresh')), 'saving.tmp'])
+
+
+def test_prune_keeps_recently_used_snapshots_within_the_size_cap(index_data, tmp_path):
+    store = SnapshotStore(str(tmp_path), prune_interval=3600)
+    for k, video_id in enumerate(('a', 'b', 'c')):
+        store.save(video_id, index_data)
+        age(store.path(video_id), 300 - k * 100)
+    # Loading counts as use
+    assert store.load('a') is not None
+
+    store.max_bytes = 2 * os.path.getsize(store.path('a'))
+    assert store.prune() == 1
+    assert 'b' not in store
+    assert 'a' in store and 'c' in store
+
+
+def test_saves_prune_at_most_once_per_interval(index_data, tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path), prune_interval=3600)
+    calls = []
+    monkeypatch.setattr(store, 'prune', lambda: calls.append(1))
+    store.save('a', index_data)
+    store._last_prune = time.monotonic()
+    store.save('b', index_data)
+    assert len(calls) == 1
@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+
+import startup_benchmark
+
+_LOADED = r"""
+import json, sys
+import app
+loaded = lambda name: any(m == name or m.startswith(name + '.') for m in sys.modules)
+before = {name: loaded(name) for name in ('sklearn', 'scipy', 'spacy')}
+app.preload()
+print(json.dumps({'before': before, 'after': loaded('sklearn')}))
+"""
+
+
+def test_import_app_defers_sklearn_until_preload():
+    out = subprocess.run(
+        [sys.executable, '-c', _LOADED], cwd=startup_benchmark.HERE,
+        env=startup_benchmark._child_env('http://127.0.0.1:9'), capture_output=True, text=True, check=True,
+    )
+    loaded = json.loads(out.stdout.strip().splitlines()[-1])
+    assert loaded['before'] == {'sklearn': False, 'scipy': False, 'spacy': False}
+    assert loaded['after'] is True
+
+
+def test_first_ask_pays_the_deferred_import_and_succeeds(llm):
+    timings = startup_benchmark.measure_cold_start(llm.base_url, 50)
+    assert set(timings) == {'import_app', 'first_request', 'first_ask'}
+    assert all(seconds > 0 for seconds in timings.values())
+
+
+def test_import_profile_lists_only_apps_direct_imports():
+    modules = [row['module'] for row in startup_benchmark.import_profile(top=100)]
+    assert 'metrics' in modules and 'flask' in modules
+    assert 'encodings' not in modules and 'site' not in modules
+    assert not any(m.startswith('sklearn') for m in modules)
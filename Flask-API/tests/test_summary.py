@@ -0,0 +1,101 @@
+import threading
+import time
+
+import admission
+
+
+class SlowLLM:
+    """Stands in for ollama_generate: blocks until released and tracks concurrent calls."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, prompt, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            self.release.wait(10)
+            return "1. An LLM summary"
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_slow_llm_serves_degraded_then_upgrades(app_module, client, monkeypatch):
+    llm = SlowLLM()
+    monkeypatch.setattr(app_module, 'ollama_generate', llm)
+    monkeypatch.setattr(app_module, 'SUMMARY_SLO', 0.05)
+
+    body = client.get('/api/summary?v=slow1').get_json()
+    assert body['degraded'] is True
+    assert body['reason'] == 'slo'
+    assert body['upgrade'] is True
+    assert body['data'].startswith("1. ")
+
+    llm.release.set()
+    assert wait_for(lambda: not app_module._summary_running)
+    body = client.get('/api/summary?v=slow1').get_json()
+    assert body == {'error': False, 'data': "1. An LLM summary"}
+
+
+def test_repeated_requests_join_the_running_generation(app_module, client, monkeypatch):
+    llm = SlowLLM()
+    monkeypatch.setattr(app_module, 'ollama_generate', llm)
+    monkeypatch.setattr(app_module, 'SUMMARY_SLO', 0.05)
+
+    for _ in range(4):
+        assert client.get('/api/summary?v=same').get_json()['degraded'] is True
+    assert llm.calls == 1
+
+    llm.release.set()
+    assert wait_for(lambda: not app_module._summary_running)
+
+
+def test_background_generations_stay_within_admission_limit(app_module, client, monkeypatch):
+    llm = SlowLLM()
+    monkeypatch.setattr(app_module, 'ollama_generate', llm)
+    monkeypatch.setattr(app_module, 'SUMMARY_SLO', 0.05)
+
+    for k in range(6):
+        assert client.get(f'/api/summary?v=video{k}').get_json()['degraded'] is True
+    limit = admission.controller.routes['summary'].concurrency
+    assert wait_for(lambda: llm.running == limit)
+    time.sleep(0.1)
+    assert llm.peak == limit
+
+    llm.release.set()
+    assert wait_for(lambda: not app_module._summary_running)
+    assert llm.calls == 6
+    assert llm.peak == limit
+
+
+def test_full_backlog_serves_extractive_without_queueing(app_module, client, monkeypatch):
+    llm = SlowLLM()
+    monkeypatch.setattr(app_module, 'ollama_generate', llm)
+    monkeypatch.setattr(app_module, 'SUMMARY_SLO', 0.05)
+    monkeypatch.setattr(app_module, 'SUMMARY_MAX_PENDING', 2)
+
+    for k in range(2):
+        assert client.get(f'/api/summary?v=queued{k}').get_json()['upgrade'] is True
+    body = client.get('/api/summary?v=queued2').get_json()
+    assert body['degraded'] is True
+    assert body['reason'] == 'backlog'
+    assert body['upgrade'] is False
+    assert len(app_module._summary_running) == 2
+
+    llm.release.set()
+    assert wait_for(lambda: not app_module._summary_running)
+    assert llm.calls == 2
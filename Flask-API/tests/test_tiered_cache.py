@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+from snapshot import load_index, save_index
+from tiered_cache import TieredCache, is_mapped
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_entries_are_compressed_and_promoted(app_module, transcript):
+    clock = Clock()
+    cache = TieredCache(idle_seconds=10, clock=clock)
+    index_data = app_module.create_rag_index('tiered', transcript)
+    cache['tiered'] = index_data
+
+    clock.now = 11
+    assert cache.sweep() == 1
+    assert cache.stats()['cold']['entries'] == 1
+    assert 'tiered' in cache
+
+    promoted = cache['tiered']
+    assert cache.stats()['hot']['entries'] == 1
+    assert (promoted['matrix'] != index_data['matrix']).nnz == 0
+    assert np.array_equal(promoted['chunks'].starts, index_data['chunks'].starts)
+
+
+def test_snapshot_backed_entries_stay_hot(app_module, transcript, tmp_path):
+    clock = Clock()
+    cache = TieredCache(idle_seconds=10, clock=clock)
+    path = os.path.join(tmp_path, 'mapped.vidx')
+    save_index(app_module.create_rag_index('mapped', transcript), path)
+    mapped = load_index(path)
+    assert is_mapped(mapped)
+    assert not is_mapped(load_index(path, mmap=False))
+
+    cache['mapped'] = mapped
+    clock.now = 11
+    assert cache.sweep() == 0
+    assert cache.demote('mapped') is False
+    assert cache['mapped'] is mapped
@@ -0,0 +1,238 @@
+import threading
+import time
+
+import pytest
+
+import transcript_fetcher
+from transcript_fetcher import TranscriptFetcher
+
+
+# Named like the youtube_transcript_api exceptions classify_error looks for
+class TranscriptsDisabled(Exception):
+    pass
+
+
+class VideoUnavailable(Exception):
+    pass
+
+
+class RequestBlocked(Exception):
+    pass
+
+
+class YouTubeRequestFailed(Exception):
+    pass
+
+
+LINES = [{'text': "hello there", 'start': 0.0, 'duration': 1.5}, {'text': "and welcome", 'start': 1.5, 'duration': 2.0}]
+
+
+class FakeTranscript:
+    def __init__(self, api):
+        self.api = api
+
+    def fetch(self):
+        return self.api.lines
+
+
+class FakeList:
+    def __init__(self, transcript):
+        self.transcript = transcript
+
+    def find_transcript(self, languages):
+        return self.transcript
+
+    def find_generated_transcript(self, languages):
+        return self.transcript
+
+    def __iter__(self):
+        return iter([self.transcript])
+
+
+class FakeApi:
+    """list() raises the queued errors in turn, then returns a transcript."""
+
+    def __init__(self, errors=(), lines=LINES):
+        self.errors = list(errors)
+        self.lines = lines
+        self.calls = 0
+        self.gate = None
+
+    def list(self, video_id):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeList(FakeTranscript(self))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_fetcher(api, **kwargs):
+    clock = Clock()
+    return TranscriptFetcher(api=api, clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+@pytest.mark.parametrize('error, outcome', [
+    (TranscriptsDisabled(), transcript_fetcher.NO_CAPTIONS),
+    (VideoUnavailable(), transcript_fetcher.UNAVAILABLE),
+    (RequestBlocked(), transcript_fetcher.BLOCKED),
+    (YouTubeRequestFailed(), transcript_fetcher.TRANSIENT),
+    (transcript_fetcher.requests.ConnectionError(), transcript_fetcher.TRANSIENT),
+    (KeyError('text'), transcript_fetcher.ERROR),
+])
+def test_classify_error(error, outcome):
+    assert transcript_fetcher.classify_error(error) == outcome
+
+
+def test_fetch_returns_lines():
+    fetcher, _ = make_fetcher(FakeApi())
+    assert fetcher.fetch('abc') == LINES
+
+
+def test_permanent_errors_are_not_retried_and_are_negatively_cached():
+    api = FakeApi([TranscriptsDisabled()])
+    fetcher, clock = make_fetcher(api, negative_ttls={transcript_fetcher.NO_CAPTIONS: 60})
+
+    assert fetcher.fetch('abc') is None
+    assert api.calls == 1
+    assert clock.slept == []
+    assert fetcher.negative_outcome('abc') == transcript_fetcher.NO_CAPTIONS
+
+    # Served from the negative cache until the TTL runs out
+    clock.now += 59
+    assert fetcher.fetch('abc') is None
+    assert api.calls == 1
+
+    clock.now += 1
+    assert fetcher.negative_outcome('abc') is None
+    assert fetcher.fetch('abc') == LINES
+    assert api.calls == 2
+
+
+def test_negative_ttls_differ_by_outcome():
+    fetcher, clock = make_fetcher(FakeApi([VideoUnavailable(), RequestBlocked()]))
+
+    assert fetcher.fetch('gone') is None
+    assert fetcher.fetch('blocked') is None
+    clock.now += transcript_fetcher.DEFAULT_NEGATIVE_TTLS[transcript_fetcher.BLOCKED]
+    assert fetcher.negative_outcome('blocked') is None
+    assert fetcher.negative_outcome('gone') == transcript_fetcher.UNAVAILABLE
+
+
+def test_transient_errors_are_retried_with_backoff():
+    api = FakeApi([YouTubeRequestFailed(), YouTubeRequestFailed()])
+    fetcher, clock = make_fetcher(api, backoff=0.5)
+
+    assert fetcher.fetch('abc') == LINES
+    assert api.calls == 3
+    assert clock.slept == [0.5, 1.0]
+    assert fetcher.negative_outcome('abc') is None
+
+
+def test_retry_budget_is_per_error_class():
+    api = FakeApi([YouTubeRequestFailed(), KeyError('x'), YouTubeRequestFailed(), KeyError('x')])
+    fetcher, clock = make_fetcher(api, retry_budgets={transcript_fetcher.TRANSIENT: 2, transcript_fetcher.ERROR: 1})
+
+    # Two transient failures and one error are within budget; the second error is not
+    assert fetcher.fetch('abc') is None
+    assert api.calls == 4
+    assert clock.slept == [0.5, 0.5, 1.0]
+
+
+def test_exhausted_transient_errors_are_not_negatively_cached():
+    api = FakeApi([YouTubeRequestFailed()] * 3)
+    fetcher, _ = make_fetcher(api)
+
+    assert fetcher.fetch('abc') is None
+    assert api.calls == 3
+    assert fetcher.negative_outcome('abc') is None
+    assert fetcher.fetch('abc') == LINES
+
+
+def test_concurrent_fetches_of_a_video_share_one_call():
+    api = FakeApi()
+    api.gate = threading.Event()
+    fetcher, _ = make_fetcher(api)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fetcher.fetch('abc'))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    # Let every thread reach the fetch before the first call returns
+    while api.calls < 1:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    api.gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == [LINES] * 5
+    assert api.calls == 1
+    assert fetcher._running == {}
+
+
+def test_concurrent_fetch_errors_reach_every_caller():
+    api = FakeApi([TranscriptsDisabled()])
+    api.gate = threading.Event()
+    fetcher, _ = make_fetcher(api)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fetcher.fetch('abc'))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while api.calls < 1:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    api.gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == [None] * 3
+    assert api.calls == 1
+
+
+def test_waiter_retries_once_after_the_leader_runs_out_of_time():
+    api = FakeApi([transcript_fetcher.deadline.DeadlineExceeded('transcript_fetch')])
+    api.gate = threading.Event()
+    fetcher, _ = make_fetcher(api)
+    listed_when_done = []
+
+    leader_errors, results = [], []
+
+    def leader():
+        try:
+            fetcher.fetch('abc')
+        except transcript_fetcher.deadline.DeadlineExceeded as e:
+            leader_errors.append(e)
+
+    first = threading.Thread(target=leader)
+    first.start()
+    while api.calls < 1:
+        time.sleep(0.01)
+    fetcher._running['abc'].add_done_callback(lambda f: listed_when_done.append('abc' in fetcher._running))
+    second = threading.Thread(target=lambda: results.append(fetcher.fetch('abc')))
+    second.start()
+    time.sleep(0.2)
+    api.gate.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(leader_errors) == 1
+    # Already unlisted when waiters wake, so the retry starts a fresh fetch
+    assert listed_when_done == [False]
+    assert results == [LINES]
+    assert api.calls == 2
+    assert fetcher._running == {}
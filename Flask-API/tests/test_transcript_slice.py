@@ -0,0 +1,54 @@
+import pytest
+
+from app import parse_seconds, parse_time_range
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    (12, 12.0),
+    ('754.5', 754.5),
+    ('12:34', 754.0),
+    ('1:02:03', 3723.0),
+])
+def test_parse_seconds(value, expected):
+    assert parse_seconds(value) == expected
+
+
+@pytest.mark.parametrize('value', ['abc', '1::2', '-5', 'nan', 'inf', '-inf', float('nan'), float('inf')])
+def test_parse_seconds_rejects_malformed_values(value):
+    with pytest.raises(ValueError):
+        parse_seconds(value)
+
+
+def test_parse_time_range():
+    assert parse_time_range({'from': '1:00', 'to': '90'}) == (60.0, 90.0)
+    assert parse_time_range({}) == (None, None)
+    with pytest.raises(ValueError):
+        parse_time_range({'from': '90', 'to': '60'})
+    with pytest.raises(ValueError):
+        parse_time_range({'from': 'nan'})
+
+
+def test_slice_returns_lines_overlapping_the_range(client):
+    data = client.get('/api/transcript?v=abc&from=0:30&to=45').get_json()
+    assert data['error'] is False
+    starts = [line['start'] for line in data['data']['lines']]
+    # Synthetic lines are 3s long, so 30..45s covers lines starting at 30..45
+    assert starts[0] == 30.0 and starts[-1] == 45.0
+    assert data['data']['truncated'] is False
+
+
+def test_slice_limit_truncates_and_is_clamped(app_module, client, monkeypatch):
+    data = client.get('/api/transcript?v=abc&limit=5').get_json()['data']
+    assert len(data['lines']) == 5 and data['truncated'] is True
+
+    monkeypatch.setattr(app_module, 'TRANSCRIPT_MAX_LINES', 10)
+    data = client.get('/api/transcript?v=abc&limit=100000').get_json()['data']
+    assert len(data['lines']) == 10 and data['truncated'] is True
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-5', 'limit=ten', 'from=nan', 'from=60&to=30'])
+def test_slice_rejects_bad_parameters(client, query):
+    data = client.get(f'/api/transcript?v=abc&{query}').get_json()
+    assert data['error'] is True
@@ -0,0 +1,108 @@
+import atexit
+import json
+import os
+
+import pytest
+
+from warmer import CacheWarmer, LatencyGuard, PopularityTracker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_scores_halve_every_half_life(clock):
+    tracker = PopularityTracker(half_life=100, clock=clock)
+    for _ in range(4):
+        tracker.record('old')
+    clock.now += 100
+    assert tracker.top(1) == [('old', pytest.approx(2.0))]
+    clock.now += 200
+    assert tracker.top(1) == [('old', pytest.approx(0.5))]
+
+
+def test_recent_visits_outrank_decayed_ones(clock):
+    tracker = PopularityTracker(half_life=100, clock=clock)
+    for _ in range(3):
+        tracker.record('old')
+    clock.now += 100
+    tracker.record('new')
+    tracker.record('new')
+    # old: 3 halved to 1.5, new: 2
+    assert [vid for vid, _ in tracker.top(2)] == ['new', 'old']
+    # A new visit adds to the decayed score, not the original one
+    tracker.record('old')
+    assert tracker.top(1) == [('old', pytest.approx(2.5))]
+
+
+def test_overflow_drops_the_least_popular_half(clock):
+    tracker = PopularityTracker(half_life=100, max_entries=4, clock=clock)
+    for rank, vid in enumerate(['a', 'b', 'c', 'd']):
+        for _ in range(rank + 2):
+            tracker.record(vid)
+    # A one-off visit is the tail, along with the weakest regular
+    tracker.record('e')
+    assert sorted(vid for vid, _ in tracker.top(10)) == ['b', 'c', 'd']
+
+
+def test_saved_state_round_trips_with_decay(clock, tmp_path):
+    path = os.path.join(tmp_path, 'warm.json')
+    tracker = PopularityTracker(half_life=100, clock=clock)
+    for vid, visits in (('a', 4), ('b', 2), ('c', 1)):
+        for _ in range(visits):
+            tracker.record(vid)
+    tracker.save(path, 2)
+    with open(path) as f:
+        assert [item['video_id'] for item in json.load(f)['videos']] == ['a', 'b']
+
+    restored = PopularityTracker(half_life=100, clock=clock)
+    restored.record('b')
+    clock.now += 100
+    assert restored.load(path) == ['a', 'b']
+    # Loaded scores keep decaying from when they were saved; live ones are kept
+    assert dict(restored.top(2)) == {'a': pytest.approx(2.0), 'b': pytest.approx(0.5)}
+
+
+def test_guard_flags_routes_well_above_their_baseline():
+    guard = LatencyGuard(ratio=2.0, min_samples=5)
+    for _ in range(10):
+        guard.observe('/api/ask', 0.1)
+    assert guard.degraded() is None
+    for _ in range(5):
+        guard.observe('/api/ask', 1.0)
+    assert guard.degraded() == '/api/ask'
+
+
+def test_warming_pauses_while_latency_is_elevated():
+    warmed = []
+    warmer = CacheWarmer(lambda vid: warmed.append(vid) or True, guard=LatencyGuard(min_samples=1))
+    assert warmer.run_once(['a', 'b']) == {'warmed': 2}
+
+    warmer.guard.observe('/api/ask', 0.1)
+    warmer.guard.observe('/api/ask', 10.0)
+    assert warmer.run_once(['c']) == {'paused': 1}
+    assert warmed == ['a', 'b']
+
+
+def test_state_is_flushed_at_exit(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    path = os.path.join(tmp_path, 'warm.json')
+    warmer = CacheWarmer(lambda vid: True, top_n=5, interval=3600, state_path=path)
+    warmer.start()
+    warmer.tracker.record('abc')
+
+    for fn in registered:
+        fn()
+    warmer._thread.join(5)
+    with open(path) as f:
+        assert [item['video_id'] for item in json.load(f)['videos']] == ['abc']
@@ -0,0 +1,249 @@
+"""
+Two-tier in-memory cache for video indexes.
+
+Entries in use stay fully materialized (hot). An entry left idle longer than
+idle_seconds is demoted (cold): the whole index, meaning the transcript text
+buffer, the sparse TF-IDF matrix arrays and the vectorizer vocabulary, is
+pickled and zlib-compressed into one bytes object. The next access promotes
+it back transparently. Requests already holding the materialized index keep
+using it; demotion only swaps what the cache itself keeps alive.
+
+Indexes mapped from a snapshot file (snapshot.py) are never demoted: their
+arrays live in the OS page cache, and compressing them would copy them back
+onto the heap.
+"""
+
+import pickle
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import metrics
+
+metrics.register('vistify_cache_tier_seconds', 'histogram',
+                 'Time to demote (compress) or promote (decompress) a cache entry.')
+metrics.register('vistify_cache_tier_total', 'counter',
+                 'Cache entry demotions and promotions.')
+
+
+def approx_nbytes(value, _depth=0) -> int:
+    """
+    Rough resident size of an index entry: numpy/columnar objects report
+    nbytes, sparse matrices their three arrays, vectorizers their vocabulary.
+    """
+    if _depth > 4 or value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_nbytes(k, _depth + 1) + approx_nbytes(v, _depth + 1) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_nbytes(v, _depth + 1) for v in value)
+    if hasattr(value, 'indptr'):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if hasattr(value, 'vocabulary_'):
+        size = approx_nbytes(value.vocabulary_, _depth + 1)
+        idf = getattr(value, 'idf_', None)
+        return size + (idf.nbytes if idf is not None else 0)
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+def is_mapped(value) -> bool:
+    """True for an index whose matrix is a view of a memory-mapped file."""
+    array = getattr(value.get('matrix'), 'data', None) if isinstance(value, dict) else None
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+class _Entry:
+    __slots__ = ('value', 'blob', 'last_used', 'nbytes', 'mapped')
+
+    def __init__(self, value, nbytes, now, mapped=False):
+        self.value = value
+        self.blob = None
+        self.last_used = now
+        self.nbytes = nbytes
+        self.mapped = mapped
+
+
+class TieredCache:
+    """
+    Dict-like cache (get / [] / in / pop / clear) with hot and cold tiers.
+    `in` never promotes an entry, so it is cheap for priority checks.
+    """
+
+    def __init__(self, idle_seconds=600.0, level=1, sweep_interval=60.0,
+                 sizeof=approx_nbytes, mapped=is_mapped, clock=time.monotonic):
+        """
+        idle_seconds: idle time before an entry is compressed; 0 disables demotion.
+        level: zlib level. 1 compresses text-heavy indexes ~3-4x at a few ms per MB.
+        sweep_interval: seconds between background demotion sweeps.
+        mapped: predicate for file-backed values, which stay hot.
+        """
+        self.idle_seconds = idle_seconds
+        self.level = level
+        self.sweep_interval = sweep_interval
+        self.sizeof = sizeof
+        self.mapped = mapped
+        self.clock = clock
+
+        self._entries: Dict[Any, _Entry] = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    # --- Dict interface ---
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            entry.last_used = self.clock()
+            if entry.blob is None:
+                return entry.value
+            blob = entry.blob
+
+        start = time.perf_counter()
+        value = pickle.loads(zlib.decompress(blob))
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            current = self._entries.get(key)
+            if current is entry and entry.blob is blob:
+                entry.value = value
+                entry.blob = None
+            elif current is not None and current.blob is None:
+                # Promoted or replaced concurrently; share that copy
+                value = current.value
+        metrics.observe('vistify_cache_tier_seconds', elapsed, {'op': 'promote'})
+        metrics.inc('vistify_cache_tier_total', labels={'op': 'promote'})
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        entry = _Entry(value, self.sizeof(value), self.clock(), self.mapped(value))
+        with self._lock:
+            self._entries[key] = entry
+        self._ensure_sweeper()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        if entry.blob is None:
+            return entry.value
+        return pickle.loads(zlib.decompress(entry.blob))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- Tiering ---
+
+    def demote(self, key) -> bool:
+        """Compresses one hot entry now. Returns False if it is missing, already cold or file-backed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.blob is not None or entry.mapped:
+                return False
+            value, last_used = entry.value, entry.last_used
+
+        # Serialize outside the lock; readers keep using the hot value meanwhile
+        start = time.perf_counter()
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.level)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            if self._entries.get(key) is not entry or entry.blob is not None or entry.last_used != last_used:
+                # Used or replaced while compressing; it is not idle any more
+                return False
+            entry.blob = blob
+            entry.value = None
+        metrics.observe('vistify_cache_tier_seconds', elapsed, {'op': 'demote'})
+        metrics.inc('vistify_cache_tier_total', labels={'op': 'demote'})
+        return True
+
+    def sweep(self) -> int:
+        """Demotes every hot entry idle past idle_seconds. Returns how many were demoted."""
+        if not self.idle_seconds:
+            return 0
+        cutoff = self.clock() - self.idle_seconds
+        with self._lock:
+            idle = [k for k, e in self._entries.items()
+                    if e.blob is None and not e.mapped and e.last_used <= cutoff]
+        return sum(1 for key in idle if self.demote(key))
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or not self.idle_seconds:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Cache sweep failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Entry and byte counts per tier. cold.raw_bytes is the hot size of the cold entries."""
+        hot = {'entries': 0, 'bytes': 0}
+        cold = {'entries': 0, 'bytes': 0, 'raw_bytes': 0}
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.blob is None:
+                    hot['entries'] += 1
+                    hot['bytes'] += entry.nbytes
+                else:
+                    cold['entries'] += 1
+                    cold['bytes'] += len(entry.blob)
+                    cold['raw_bytes'] += entry.nbytes
+        cold['ratio'] = round(cold['raw_bytes'] / cold['bytes'], 2) if cold['bytes'] else None
+        return {'hot': hot, 'cold': cold}
+
+    def register_metrics(self, prefix='vistify_cache'):
+        """Exposes per-tier entry and byte counts as scrape-time gauges."""
+        def collect(field):
+            def values():
+                stats = self.stats()
+                return [({'tier': tier}, stats[tier][field]) for tier in ('hot', 'cold')]
+            return values
+
+        metrics.register_gauge(f'{prefix}_entries', 'Cached video indexes per tier.', collect('entries'))
+        metrics.register_gauge(f'{prefix}_bytes', 'Approximate resident bytes per cache tier.', collect('bytes'))
@@ -0,0 +1,261 @@
+"""
+Transcript fetching service.
+
+Wraps youtube_transcript_api with a pooled HTTP session shared across calls,
+a short-lived cache of transcript-list metadata, negative caching of
+"no captions" / "unavailable" outcomes, and per-error-class retry budgets.
+Concurrent fetches of the same video share one round trip. The API object,
+clock and sleep are injectable so the fetcher can be exercised with a fake.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import deadline
+import metrics
+
+metrics.register('vistify_transcript_fetch_total', 'counter',
+                 'Transcript fetch outcomes (including negative-cache hits).')
+
+# Outcome classes. Retry budgets and negative TTLs are keyed by these.
+OK = 'ok'
+NO_CAPTIONS = 'no_captions'
+UNAVAILABLE = 'unavailable'
+BLOCKED = 'blocked'
+TRANSIENT = 'transient'
+ERROR = 'error'
+
+# Seconds an outcome is remembered before YouTube is asked again
+DEFAULT_NEGATIVE_TTLS = {
+    NO_CAPTIONS: 6 * 3600,
+    UNAVAILABLE: 24 * 3600,
+    # Retrying a blocked IP right away only makes the block last longer
+    BLOCKED: 60,
+}
+
+# Per-call HTTP timeout, capped by the request's deadline
+HTTP_TIMEOUT = 30.0
+
+# A retry is not started with less time than this left
+MIN_ATTEMPT_SECONDS = 2.0
+
+# Extra attempts allowed after the first failure, per outcome class
+DEFAULT_RETRY_BUDGETS = {
+    TRANSIENT: 2,
+    ERROR: 1,
+}
+
+
+def classify_error(exc):
+    """Maps a youtube_transcript_api / requests exception to an outcome class."""
+    name = type(exc).__name__
+    if name in ('TranscriptsDisabled', 'NoTranscriptFound'):
+        return NO_CAPTIONS
+    if name in ('VideoUnavailable', 'VideoUnplayable', 'InvalidVideoId', 'AgeRestricted'):
+        return UNAVAILABLE
+    if name in ('RequestBlocked', 'IpBlocked', 'PoTokenRequired'):
+        return BLOCKED
+    if name in ('YouTubeRequestFailed', 'YouTubeDataUnparsable') or isinstance(exc, requests.RequestException):
+        return TRANSIENT
+    return ERROR
+
+
+class _TimeoutSession(requests.Session):
+    """youtube_transcript_api passes no timeout; apply HTTP_TIMEOUT, capped by the deadline."""
+
+    def request(self, method, url, **kwargs):
+        kwargs['timeout'] = deadline.timeout('transcript_fetch', kwargs.get('timeout') or HTTP_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+
+def make_session(pool_size=32):
+    """A requests session whose connection pool is shared by all fetches."""
+    session = _TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class TranscriptFetcher:
+    def __init__(self, api=None, list_ttl=600.0, negative_ttls=None, retry_budgets=None,
+                 backoff=0.5, max_negative_entries=10000, clock=time.monotonic, sleep=time.sleep):
+        """
+        api: object with .list(video_id) returning a TranscriptList-like object.
+             Defaults to a YouTubeTranscriptApi using a pooled session.
+        list_ttl: seconds transcript-list metadata is reused. Kept short since
+             the caption URLs it contains are signed and expire.
+        """
+        self._api = api
+        self._api_lock = threading.Lock()
+        self.list_ttl = list_ttl
+        self.negative_ttls = dict(DEFAULT_NEGATIVE_TTLS, **(negative_ttls or {}))
+        self.retry_budgets = dict(DEFAULT_RETRY_BUDGETS, **(retry_budgets or {}))
+        self.backoff = backoff
+        self.max_negative_entries = max_negative_entries
+        self.clock = clock
+        self.sleep = sleep
+
+        self._lock = threading.Lock()
+        # video_id -> (transcript object, expires)
+        self._lists: Dict[str, Any] = {}
+        # video_id -> (outcome, expires)
+        self._negative: Dict[str, Any] = {}
+        # video_id -> Future of the fetch in progress
+        self._running: Dict[str, Future] = {}
+
+    @property
+    def api(self):
+        if self._api is None:
+            with self._api_lock:
+                if self._api is None:
+                    from youtube_transcript_api import YouTubeTranscriptApi
+                    self._api = YouTubeTranscriptApi(http_client=make_session())
+        return self._api
+
+    def negative_outcome(self, video_id) -> Optional[str]:
+        """The cached failure outcome for a video, if one is still live."""
+        with self._lock:
+            entry = self._negative.get(video_id)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del self._negative[video_id]
+                return None
+            return entry[0]
+
+    def _remember_failure(self, video_id, outcome):
+        ttl = self.negative_ttls.get(outcome)
+        if not ttl:
+            return
+        with self._lock:
+            if len(self._negative) >= self.max_negative_entries:
+                now = self.clock()
+                for key in [k for k, (_, expires) in self._negative.items() if expires <= now]:
+                    del self._negative[key]
+                if len(self._negative) >= self.max_negative_entries:
+                    # Still full: drop the oldest insertion
+                    del self._negative[next(iter(self._negative))]
+            self._negative[video_id] = (outcome, self.clock() + ttl)
+
+    def _pick_transcript(self, video_id):
+        """Chooses English (manual, then generated), else the first available transcript."""
+        with self._lock:
+            cached = self._lists.get(video_id)
+            if cached is not None and cached[1] > self.clock():
+                return cached[0]
+
+        transcript_list = self.api.list(video_id)
+        transcript = None
+        try:
+            transcript = transcript_list.find_transcript(['en'])
+        except Exception:
+            pass
+        if transcript is None:
+            try:
+                transcript = transcript_list.find_generated_transcript(['en'])
+            except Exception:
+                pass
+        if transcript is None:
+            for t in transcript_list:
+                transcript = t
+                break
+
+        if transcript is not None:
+            with self._lock:
+                now = self.clock()
+                if len(self._lists) >= 1024:
+                    for key in [k for k, (_, expires) in self._lists.items() if expires <= now]:
+                        del self._lists[key]
+                self._lists[video_id] = (transcript, now + self.list_ttl)
+        return transcript
+
+    def _attempt(self, video_id):
+        transcript = self._pick_transcript(video_id)
+        if transcript is None:
+            return NO_CAPTIONS, None
+        try:
+            transcript_data = transcript.fetch()
+        except Exception:
+            # Signed caption URLs may have expired; re-list on the next attempt
+            with self._lock:
+                self._lists.pop(video_id, None)
+            raise
+        return OK, [
+            {
+                'text': entry.text if hasattr(entry, 'text') else entry['text'],
+                'start': entry.start if hasattr(entry, 'start') else entry['start'],
+                'duration': entry.duration if hasattr(entry, 'duration') else entry['duration']
+            }
+            for entry in transcript_data
+        ]
+
+    def fetch(self, video_id) -> Optional[List[Dict[str, Any]]]:
+        """Returns the transcript as a list of {'text', 'start', 'duration'} dicts, or None."""
+        cached = self.negative_outcome(video_id)
+        if cached is not None:
+            metrics.inc('vistify_transcript_fetch_total', labels={'outcome': cached, 'cached': 'true'})
+            return None
+
+        while True:
+            with self._lock:
+                running = self._running.get(video_id)
+                if running is None:
+                    future = self._running[video_id] = Future()
+            if running is None:
+                break
+            try:
+                return running.result(timeout=deadline.remaining())
+            except FutureTimeout:
+                raise deadline.DeadlineExceeded('transcript_fetch')
+            except deadline.DeadlineExceeded:
+                # The other request ran out of time, not necessarily this one
+                deadline.check('transcript_fetch', MIN_ATTEMPT_SECONDS)
+
+        try:
+            data = self._fetch(video_id)
+        except BaseException as e:
+            self._unlist(video_id)
+            future.set_exception(e)
+            raise
+        self._unlist(video_id)
+        future.set_result(data)
+        return data
+
+    def _unlist(self, video_id):
+        # Before the future completes, so a waiter retrying after a failure
+        # joins a newer fetch or starts one, never spinning on this one
+        with self._lock:
+            del self._running[video_id]
+
+    def _fetch(self, video_id):
+        attempts = {}
+        while True:
+            try:
+                outcome, data = self._attempt(video_id)
+            except deadline.DeadlineExceeded:
+                raise
+            except Exception as e:
+                outcome, data = classify_error(e), None
+                print(f"Transcript Error ({outcome}) for {video_id}: {e}")
+
+            metrics.inc('vistify_transcript_fetch_total', labels={'outcome': outcome, 'cached': 'false'})
+            if outcome == OK:
+                return data
+
+            attempts[outcome] = attempts.get(outcome, 0) + 1
+            if attempts[outcome] > self.retry_budgets.get(outcome, 0):
+                self._remember_failure(video_id, outcome)
+                return None
+            delay = self.backoff * (2 ** (attempts[outcome] - 1))
+            # Not a verdict on the video, so nothing is negatively cached
+            deadline.check('transcript_fetch', delay + MIN_ATTEMPT_SECONDS)
+            self.sleep(delay)
+
+
+fetcher = TranscriptFetcher()
@@ -0,0 +1,208 @@
+"""
+Popularity-driven cache warming.
+
+Every request for a video bumps a decaying counter (half-life WARM_HALF_LIFE
+seconds). The top-N videos are persisted to WARM_STATE_PATH every round and
+at interpreter exit. On startup, and then every WARM_INTERVAL seconds, a
+background thread re-warms them through a callback: transcript, index and
+LLM artifacts, each a no-op when already cached. Warming uses at most
+WARM_CONCURRENCY threads, and it pauses while live request latency is
+running well above its own baseline.
+
+Enabled when WARM_TOP_N > 0.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+metrics.register('vistify_warm_total', 'counter',
+                 'Cache warming attempts by result.')
+
+
+class PopularityTracker:
+    """Exponentially decaying access counts per video_id."""
+
+    def __init__(self, half_life=6 * 3600.0, max_entries=10000, clock=time.time):
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        # video_id -> (score, as of timestamp)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+
+    def _decayed(self, score, since, now):
+        return score * math.pow(0.5, (now - since) / self.half_life)
+
+    def record(self, video_id, weight=1.0):
+        now = self.clock()
+        with self._lock:
+            entry = self._scores.get(video_id)
+            score = weight if entry is None else self._decayed(entry[0], entry[1], now) + weight
+            self._scores[video_id] = (score, now)
+            if len(self._scores) > self.max_entries:
+                self._prune(now)
+
+    def _prune(self, now):
+        # Keep the better-scoring half; the tail is one-off visits
+        ranked = sorted(self._scores.items(), key=lambda kv: self._decayed(kv[1][0], kv[1][1], now))
+        for video_id, _ in ranked[:len(ranked) // 2]:
+            del self._scores[video_id]
+
+    def top(self, n) -> List[Tuple[str, float]]:
+        now = self.clock()
+        with self._lock:
+            scored = [(vid, self._decayed(score, since, now)) for vid, (score, since) in self._scores.items()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:n]
+
+    def save(self, path, n):
+        """Writes the top-n list atomically."""
+        state = {
+            'saved_at': self.clock(),
+            'half_life': self.half_life,
+            'videos': [{'video_id': vid, 'score': round(score, 4)} for vid, score in self.top(n)],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load(self, path) -> List[str]:
+        """Merges a saved top-N list into the counters; returns its video ids in rank order."""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return []
+        saved_at = state.get('saved_at', self.clock())
+        with self._lock:
+            for item in state.get('videos', []):
+                if item['video_id'] not in self._scores:
+                    self._scores[item['video_id']] = (float(item['score']), saved_at)
+        return [item['video_id'] for item in state.get('videos', [])]
+
+
+class LatencyGuard:
+    """
+    Per-route latency EWMAs: a fast one tracking current traffic and a slow
+    baseline. Warming pauses while any route's fast EWMA exceeds
+    ratio x baseline.
+    """
+
+    def __init__(self, ratio=1.5, min_samples=20, fast_alpha=0.3, slow_alpha=0.02):
+        self.ratio = ratio
+        self.min_samples = min_samples
+        self.fast_alpha = fast_alpha
+        self.slow_alpha = slow_alpha
+        self._lock = threading.Lock()
+        # route -> [fast, slow, samples]
+        self._routes: Dict[str, list] = {}
+
+    def observe(self, route, seconds):
+        with self._lock:
+            state = self._routes.get(route)
+            if state is None:
+                self._routes[route] = [seconds, seconds, 1]
+                return
+            state[0] += self.fast_alpha * (seconds - state[0])
+            state[1] += self.slow_alpha * (seconds - state[1])
+            state[2] += 1
+
+    def degraded(self) -> Optional[str]:
+        """Name of a route whose latency is elevated, or None."""
+        with self._lock:
+            for route, (fast, slow, samples) in self._routes.items():
+                if samples >= self.min_samples and fast > slow * self.ratio:
+                    return route
+        return None
+
+
+class CacheWarmer:
+    def __init__(self, warm_fn: Callable[[str], bool], tracker=None, guard=None, top_n=20,
+                 interval=900.0, concurrency=2, state_path=None, pause_seconds=30.0):
+        """
+        warm_fn(video_id): builds whatever is missing for a video, returning
+        False if it could not (e.g. no transcript). It should check paused()
+        between expensive steps.
+        """
+        self.warm_fn = warm_fn
+        self.tracker = tracker or PopularityTracker()
+        self.guard = guard or LatencyGuard()
+        self.top_n = top_n
+        self.interval = interval
+        self.concurrency = concurrency
+        self.state_path = state_path
+        self.pause_seconds = pause_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run: Dict[str, object] = {}
+
+    def paused(self) -> bool:
+        return self._stop.is_set() or self.guard.degraded() is not None
+
+    def _warm_one(self, video_id):
+        if self._stop.is_set():
+            return 'stopped'
+        route = self.guard.degraded()
+        if route is not None:
+            print(f"Warming paused: {route} latency is elevated")
+            return 'paused'
+        try:
+            with metrics.timed('warm'):
+                return 'warmed' if self.warm_fn(video_id) else 'skipped'
+        except Exception as e:
+            print(f"Warm Error for {video_id}: {e}")
+            return 'error'
+
+    def run_once(self, video_ids=None) -> Dict[str, int]:
+        """Warms the given videos (default: current top-N) and returns result counts."""
+        if video_ids is None:
+            video_ids = [vid for vid, _ in self.tracker.top(self.top_n)]
+        counts: Dict[str, int] = {}
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='warmer') as pool:
+            for result in pool.map(self._warm_one, video_ids):
+                counts[result] = counts.get(result, 0) + 1
+                metrics.inc('vistify_warm_total', labels={'result': result})
+        self.last_run = {'started': started, 'seconds': round(time.time() - started, 3), 'results': counts}
+        print(f"Cache warming: {counts}")
+        return counts
+
+    def _loop(self):
+        # Startup: whatever was popular before the restart
+        if self.state_path:
+            saved = self.tracker.load(self.state_path)
+            if saved:
+                self.run_once(saved[:self.top_n])
+        while not self._stop.wait(self.interval):
+            self.save_state()
+            counts = self.run_once()
+            if counts.get('paused'):
+                # Let live traffic recover before the next round
+                self._stop.wait(self.pause_seconds)
+
+    def save_state(self):
+        if self.state_path:
+            try:
+                self.tracker.save(self.state_path, self.top_n)
+            except OSError as e:
+                print(f"Warm state save failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='cache-warmer', daemon=True)
+            self._thread.start()
+            # Keep the popularity gathered since the last round across a restart
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self.save_state()
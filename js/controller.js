@@ -20,6 +20,9 @@ const controlSummary = async function (summaryType = 'short') {
         if (!videoId) throw new Error("Please Enter a valid YouTube URL!");
 
         // 2. Update state
+        if (model.state.videoId && model.state.videoId !== videoId) {
+            model.cancelPrefetch(model.state.videoId);
+        }
         model.state.videoId = videoId;
         model.clearConversation(); // Clear previous Q&A
 
@@ -53,12 +56,33 @@ const controlSummary = async function (summaryType = 'short') {
         // 12. scroll to summary again when loaded
         view.scrollToSummary();
 
+        // 13. Swap in the LLM summary once it is ready
+        if (model.state.summaryDegraded) scheduleSummaryUpgrade(videoId, summaryType);
+
     } catch (error) {
         console.log(error);
         view.renderError(error.message);
     }
 };
 
+const SUMMARY_UPGRADE_DELAYS = [15000, 30000, 60000];
+
+const scheduleSummaryUpgrade = function (videoId, summaryType, attempt = 0) {
+    if (attempt >= SUMMARY_UPGRADE_DELAYS.length) return;
+    setTimeout(async () => {
+        if (model.state.videoId !== videoId) return;
+        try {
+            if (await model.upgradeSummary(videoId, summaryType)) {
+                view.updateSummaryText();
+                return;
+            }
+        } catch (error) {
+            console.log(error);
+        }
+        scheduleSummaryUpgrade(videoId, summaryType, attempt + 1);
+    }, SUMMARY_UPGRADE_DELAYS[attempt]);
+};
+
 const controlAskQuestion = async function (question) {
     try {
         // Render the question immediately
@@ -120,6 +144,7 @@ const controlExtractEntities = async function () {
 
 const init = function () {
     view.addHandlerSearch(controlSummary);
+    window.addEventListener("pagehide", () => model.cancelPrefetch(model.state.videoId));
 };
 
 init();
\ No newline at end of file
@@ -2,9 +2,14 @@ import axios from "axios";
 import { API_URL } from "./config";
 import { getJSON } from "./helper";
 
+// Identifies this tab to the server's prefetcher, so users sharing an address
+// do not cancel each other's background work
+const SESSION_ID = Math.random().toString(36).slice(2, 14);
+
 export const state = {
     videoId: "",
     summary: "",
+    summaryDegraded: false,
     title: "",
     thumbnailUrl: "",
     conversationHistory: [],
@@ -14,7 +19,7 @@ export const state = {
 
 export const loadSummary = async function (summaryType = 'short') {
     try {
-        const data = await getJSON(`${API_URL}/summary?v=${state.videoId}&type=${summaryType}`);
+        const data = await getJSON(`${API_URL}/summary?v=${state.videoId}&type=${summaryType}&session=${SESSION_ID}`);
 
         // Check if the response has an error
         if (data.error) {
@@ -22,11 +27,22 @@ export const loadSummary = async function (summaryType = 'short') {
         }
 
         state.summary = data.data;
+        // A quick extractive summary, served while the LLM is slow or down
+        state.summaryDegraded = Boolean(data.degraded && data.upgrade);
     } catch (err) {
         throw err;
     }
 };
 
+// Re-requests a degraded summary; true once the LLM version has replaced it
+export const upgradeSummary = async function (videoId, summaryType = 'short') {
+    const data = await getJSON(`${API_URL}/summary?v=${videoId}&type=${summaryType}&session=${SESSION_ID}`);
+    if (data.error || data.degraded || state.videoId !== videoId) return false;
+    state.summary = data.data;
+    state.summaryDegraded = false;
+    return true;
+};
+
 export const loadMetaData = async function (videoId) {
     try {
         const requestUrl = `https://youtube.com/oembed?url=https://www.youtube.com/watch?v=${videoId}&format=json`;
@@ -90,6 +106,13 @@ export const extractEntities = async function () {
     }
 };
 
+// Tell the server to drop background work for a video the user has left.
+// keepalive lets the request outlive the page on unload.
+export const cancelPrefetch = function (videoId) {
+    if (!videoId) return;
+    fetch(`${API_URL}/prefetch/cancel?v=${videoId}&session=${SESSION_ID}`, { method: "POST", keepalive: true }).catch(() => {});
+};
+
 export const clearConversation = function () {
     state.conversationHistory = [];
 };
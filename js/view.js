@@ -41,12 +41,10 @@ export const renderSpinnerSummary = function () {
     summaryParent.insertAdjacentHTML("afterbegin", markup);
 };
 
-export const renderSummary = function () {
-    clear(summaryParent);
-
+const formatSummary = function (summaryText) {
     // Better formatting for summary text
     // Note: Summary comes from our trusted backend, so we can safely format it
-    let formattedSummary = state.summary;
+    let formattedSummary = summaryText;
 
     // Handle headings (lines that are all caps or start with ## or are short and bold-looking)
     formattedSummary = formattedSummary.replace(/^##\s*(.+)$/gm, '<h3 class="summary-heading">$1</h3>');
@@ -190,7 +188,13 @@ export const renderSummary = function () {
         processedLines.push('</ul>');
     }
 
-    formattedSummary = processedLines.join('');
+    return processedLines.join('');
+};
+
+export const renderSummary = function () {
+    clear(summaryParent);
+
+    const formattedSummary = formatSummary(state.summary);
 
     const markup = `
         <div class="summary">
@@ -259,6 +263,12 @@ export const renderSummary = function () {
     summaryParent.insertAdjacentHTML("afterbegin", markup);
 };
 
+// Swaps in a new summary text without touching the Q&A or NER sections
+export const updateSummaryText = function () {
+    const summaryText = summaryParent.querySelector(".summary-text");
+    if (summaryText) summaryText.innerHTML = formatSummary(state.summary);
+};
+
 export const renderQAToggle = function (handler) {
     const toggleBtn = document.querySelector("#qa-toggle");
     const qaContainer = document.querySelector("#qa-container");